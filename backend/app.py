@@ -1,30 +1,89 @@
 import sqlite3
 import json
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, Response
 from flask_cors import CORS
 from services.ddl import generate_ddl_metadata_from_schema
 from services.term import generate_term_metadata_from_schema
 from services.freeshot import generate_freeshot_metadata_from_schema
-from initial.data import init_data, get_table_data, get_table_count
-from initial.metadata import init_metadata
-from config.constants import DATA_DB_PATH
-from initial.config import init_config_db
+from services.context import generate_context_metadata_from_schema
+from initial.data import get_table_data, get_table_count
+from initial.bootstrap import bootstrap
+from config.constants import DATA_DB_PATH, PROFILE_PATHS
 import random
 import time
 from flasgger import Swagger
-from services.logger import socketio, handle_log_post, broadcast_log, broadcast_stream_log
+from services.logger import socketio, handle_log_post, handle_log_payload_get, broadcast_log, broadcast_stream_log, is_admin_token
+from services.log_context import set_session_id, reset_session_id
+from services.tracing import start_trace, end_trace, get_trace, get_request_id, metrics
+from services.profiler import start_profile, finish_profile, parse_profile_paths, profile_store
+from services.socketio_queue import get_socketio_options
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:8001"}})
 Swagger(app)
-socketio.init_app(app, cors_allowed_origins="*")
+# 运行模式和消息队列由环境变量决定（见serve.py），导入本模块不做任何初始化
+socketio.init_app(app, cors_allowed_origins="*", **get_socketio_options())
 
-from utils.mock_data_generator import generate_mock_data
+# 请求中的日志只推送到前端通过X-Session-Id指定的会话
+@app.before_request
+def bind_log_session():
+    g.log_session_token = set_session_id(request.headers.get('X-Session-Id'))
 
-generate_mock_data()
-init_metadata()
-init_data()
-init_config_db()  # 初始化配置数据库
+@app.teardown_request
+def unbind_log_session(exc):
+    token = g.pop('log_session_token', None)
+    if token is not None:
+        reset_session_id(token)
+
+# 请求追踪：请求ID取自X-Request-Id请求头（没有则生成），随响应头返回
+@app.before_request
+def start_request_trace():
+    g.request_started = time.perf_counter()
+    g.trace_token = start_trace(request.headers.get('X-Request-Id'), request.path)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe("chatbi_http_request_duration_seconds", time.perf_counter() - started,
+                        method=request.method, endpoint=endpoint, status=response.status_code)
+    request_id = get_request_id()
+    if request_id:
+        response.headers['X-Request-Id'] = request_id
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        end_trace(token)
+
+# 按需性能分析：管理员通过请求头X-Profile: 1开启（需携带X-Admin-Token），或由环境变量CHATBI_PROFILE_PATHS指定自动分析的接口路径
+# （不放在配置项中，/config/update没有鉴权）
+_auto_profile_paths = frozenset(parse_profile_paths(PROFILE_PATHS))
+
+@app.before_request
+def start_request_profile():
+    requested = request.headers.get('X-Profile') == '1' and is_admin_token(request.headers.get('X-Admin-Token'))
+    if requested or request.path in _auto_profile_paths:
+        g.profile_session = start_profile(request.path, get_request_id())
+
+@app.after_request
+def finish_request_profile(response):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        profile_id = finish_profile(session)
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.teardown_request
+def abort_request_profile(exc):
+    # 请求异常结束时after_request不会执行
+    session = g.pop('profile_session', None)
+    if session is not None:
+        finish_profile(session)
 
 
 # 获取数据库列表
@@ -374,6 +433,40 @@ def ddl():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# 上下文召回接口
+@app.route('/context', methods=['POST'])
+def context_api():
+    """
+    并行获取DDL、相似查询示例和业务术语
+    ---
+    tags:
+      - 智能建议
+    responses:
+      200:
+        description: 合并后的元数据
+        schema:
+          type: object
+          properties:
+            metadata:
+              type: object
+              properties:
+                ddl: {type: array, items: {}}
+                freeshot: {type: array, items: {}}
+                term: {type: array, items: {}}
+    """
+    try:
+        data = request.get_json()
+        if not data or 'schema' not in data:
+            return jsonify({'error': 'Missing schema data'}), 400
+
+        metadata = generate_context_metadata_from_schema(data)
+        return jsonify({
+            'metadata': metadata,
+            'count': {key: len(value) for key, value in metadata.items()}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Freeshot API接口
 @app.route('/freeshot', methods=['POST'])
 def freeshot_api():
@@ -385,8 +478,6 @@ def freeshot_api():
     """
     try:
         data = request.get_json()
-        import time
-        time.sleep(1)
         metadata = generate_freeshot_metadata_from_schema(data)
         return jsonify({
                 'metadata': metadata,
@@ -406,8 +497,6 @@ def term_api():
     """
     try:
         data = request.get_json()
-        import time
-        time.sleep(1)
         metadata = generate_term_metadata_from_schema(data)
         return jsonify({
                 'metadata': metadata,
@@ -445,22 +534,92 @@ def sql_agent_api():
     ---
     tags:
       - 智能建议
+    description: |
+      提供conversation_id时使用服务端会话：首次请求或会话过期后提交metadata和完整messages，
+      后续只需提交新的用户问题message，metadata有变化时才需提交。
+      未提供conversation_id时按完整metadata和messages无状态执行。
+    responses:
+      404:
+        description: 会话不存在或已过期，需要重新提交metadata和完整messages
     """
     data = request.get_json()
+    conversation_id = data.get('conversation_id')
+    
+    # 导入SQLAgent服务
+    from services.sql_agent_generator import generate_sql_with_react_agent, generate_sql_in_session
+    from services.session_store import SessionNotFoundError
+    
+    if conversation_id:
+        message = data.get('message')
+        broadcast_log('system', message or json.dumps(data.get('messages', []), ensure_ascii=False, indent=2), "SQLAgent-开始执行")
+        try:
+            response_data = generate_sql_in_session(conversation_id, message, data.get('metadata'), data.get('messages'))
+        except SessionNotFoundError:
+            return jsonify({'error': f'会话不存在或已过期: {conversation_id}', 'code': 'session_not_found'}), 404
+        return jsonify(response_data)
+    
     ddl = data['metadata'].get('ddl', [])
     freeshot = data['metadata'].get('freeshot', [])
     term = data['metadata'].get('term', [])
     messages = data.get('messages', [])
     
-    # 导入SQLAgent服务
-    from services.sql_agent_generator import generate_sql_with_react_agent
-    
     # 调用SQLAgent生成并执行SQL
     broadcast_log('system', json.dumps(messages, ensure_ascii=False, indent=2), "SQLAgent-开始执行")
     response_data = generate_sql_with_react_agent(ddl, freeshot, term, messages)
-    
+
     return jsonify(response_data)
 
+# SQLAgent异步运行API接口
+@app.route('/sql-agent/runs', methods=['POST'])
+def sql_agent_run_api():
+    """
+    在异步运行时中后台启动SQLAgent，立即返回运行ID
+    ---
+    tags:
+      - 智能建议
+    responses:
+      202:
+        description: 已启动，返回 {"run_id": ""}
+    """
+    data = request.get_json()
+    ddl = data['metadata'].get('ddl', [])
+    freeshot = data['metadata'].get('freeshot', [])
+    term = data['metadata'].get('term', [])
+    messages = data.get('messages', [])
+
+    from services.async_sql_agent import start_sql_agent_run
+
+    broadcast_log('system', json.dumps(messages, ensure_ascii=False, indent=2), "SQLAgent-开始执行")
+    run_id = start_sql_agent_run(ddl, freeshot, term, messages)
+
+    return jsonify({'run_id': run_id}), 202
+
+@app.route('/sql-agent/runs/<run_id>', methods=['GET'])
+def sql_agent_run_status_api(run_id):
+    """
+    查询SQLAgent异步运行的状态和结果
+    ---
+    tags:
+      - 智能建议
+    parameters:
+      - name: run_id
+        in: path
+        type: string
+        required: true
+        description: 运行ID
+    responses:
+      200:
+        description: 运行状态，status为running、done或error，done时result与/sql-agent返回格式相同
+      404:
+        description: 运行ID不存在或已过期
+    """
+    from services.agent_runtime import agent_runtime
+
+    run = agent_runtime.get_run(run_id)
+    if run is None:
+        return jsonify({'error': f'运行不存在: {run_id}'}), 404
+    return jsonify(run)
+
 # 用户点赞反馈API接口
 @app.route('/feedback_good', methods=['POST'])
 def feedback_good_api():
@@ -469,16 +628,28 @@ def feedback_good_api():
     ---
     tags:
       - 智能建议
+    description: 提供conversation_id时使用服务端会话中的历史对话和元数据，会话不存在时返回404
     """
     data = request.get_json()
+    conversation_id = data.get('conversation_id')
+    
+    # 导入FeedbackAgent服务
+    from services.feedback_agent_generator import generate_feedback_with_agent, generate_feedback_in_session
+    from services.session_store import SessionNotFoundError
+    
+    if conversation_id and 'messages' not in data:
+        broadcast_log('system', conversation_id, "FeedbackAgent-开始分析用户反馈")
+        try:
+            response_data = generate_feedback_in_session(conversation_id, data.get('metadata'))
+        except SessionNotFoundError:
+            return jsonify({'error': f'会话不存在或已过期: {conversation_id}', 'code': 'session_not_found'}), 404
+        return jsonify(response_data)
+    
     ddl = data['metadata'].get('ddl', [])
     freeshot = data['metadata'].get('freeshot', [])
     term = data['metadata'].get('term', [])
     messages = data.get('messages', [])
     
-    # 导入FeedbackAgent服务
-    from services.feedback_agent_generator import generate_feedback_with_agent
-    
     # 调用FeedbackAgent处理用户反馈
     broadcast_log('system', json.dumps(messages, ensure_ascii=False, indent=2), "FeedbackAgent-开始分析用户反馈")
     response_data = generate_feedback_with_agent(ddl, freeshot, term, messages)
@@ -629,6 +800,8 @@ def update_config():
             "success": result,
             "message": "配置更新成功" if result else "配置更新失败"
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -665,6 +838,133 @@ def log_api():
     """
     return handle_log_post()
 
+# Prometheus指标
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    """
+    Prometheus文本格式的延迟直方图（HTTP请求、SQLite、向量嵌入、大模型首token与总耗时、工具调用、处理阶段）
+    ---
+    tags:
+      - 监控
+    responses:
+      200:
+        description: Prometheus文本格式指标
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# 请求追踪详情
+@app.route('/traces/<request_id>', methods=['GET'])
+def trace_api(request_id):
+    """
+    查询最近请求的追踪span
+    ---
+    tags:
+      - 监控
+    parameters:
+      - name: request_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: 请求追踪，包含嵌套的span及耗时
+      404:
+        description: 追踪不存在或已淘汰
+    """
+    trace = get_trace(request_id)
+    if trace is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return jsonify(trace)
+
+# 性能分析记录（仅管理员）
+@app.route('/profiles', methods=['GET'])
+def list_profiles_api():
+    """
+    最近的请求性能分析记录
+    ---
+    tags:
+      - 监控
+    parameters:
+      - name: X-Admin-Token
+        in: header
+        type: string
+        required: true
+    responses:
+      200:
+        description: 分析记录摘要列表，包含profile_id、接口、请求ID、耗时和内存峰值
+      403:
+        description: 管理员令牌无效
+    """
+    if not is_admin_token(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(profile_store.list())
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile_api(profile_id):
+    """
+    性能分析详情，stats为按累计耗时排序的pstats文本；format=pstats时下载pstats文件
+    ---
+    tags:
+      - 监控
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+      - name: format
+        in: query
+        type: string
+        required: false
+        description: json（默认）或pstats
+      - name: X-Admin-Token
+        in: header
+        type: string
+        required: true
+    responses:
+      200:
+        description: 分析详情
+      403:
+        description: 管理员令牌无效
+      404:
+        description: 分析记录不存在或已淘汰
+    """
+    if not is_admin_token(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    record = profile_store.get(profile_id)
+    if record is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get('format') == 'pstats':
+        return Response(record["pstats"], mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename={profile_id}.pstats'})
+    return jsonify({key: value for key, value in record.items() if key != "pstats"})
+
+# 被截断日志的完整内容
+@app.route('/api/log/payload/<payload_id>', methods=['GET'])
+def log_payload_api(payload_id):
+    """
+    获取被截断日志的完整内容
+    ---
+    tags:
+      - 日志
+    parameters:
+      - name: payload_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: 完整日志内容
+        schema:
+          type: object
+          properties:
+            payload_id: {type: string}
+            message: {type: string}
+      404:
+        description: 内容不存在或已淘汰
+    """
+    return handle_log_payload_get(payload_id)
+
 if __name__ == '__main__':    
-    # 使用socketio运行应用
+    # 开发模式：初始化数据后使用socketio运行应用；生产环境使用serve.py
+    bootstrap()
     socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -21,9 +21,125 @@ METADATA_DB_PATH = os.path.join(ROOT_DIR, 'metadata.db')
 # 数据数据库文件路径
 DATA_DB_PATH = os.path.join(ROOT_DIR, 'data.db')
 
+# data.db来源指纹文件路径，元数据和数据文件未变化时启动直接复用data.db
+DATA_DB_FINGERPRINT_PATH = DATA_DB_PATH + '.fingerprint'
+
+# 批量导入data.db：每次executemany的行数、每个事务的行数、导入期间的页缓存大小（KB）
+BULK_LOAD_BATCH_SIZE = 5000
+BULK_LOAD_COMMIT_ROWS = 500000
+BULK_LOAD_CACHE_KB = 256 * 1024
+
 # 配置数据库文件路径
 CONFIG_DB_PATH = os.path.join(ROOT_DIR, 'config.db')
 
+# 检查config.db配置版本号的最小间隔（秒），多进程部署时其他进程修改的配置在该时间内生效
+CONFIG_VERSION_CHECK_INTERVAL = 1.0
+
 # ChromaDB持久化目录
 CHROMA_PERSIST_DIR = os.path.join(ROOT_DIR, 'chroma_db')
 
+
+# 示例/术语召回数量
+FREESHOT_TOP_K = 5
+TERM_TOP_K = 8
+
+# 召回排序时点赞数的权重（相关度已归一化到0-1）
+RETRIEVAL_LIKES_WEIGHT = 0.3
+
+# 上下文召回（ddl、freeshot、term）并行线程数
+CONTEXT_WORKERS = 8
+
+# 大模型表筛选结果缓存
+TABLE_SELECT_CACHE_SIZE = 1024
+TABLE_SELECT_CACHE_TTL = 600
+
+# 向量召回分数最高的表超过第二名的倍数时，直接选中该表，跳过大模型表筛选
+TABLE_SELECT_SCORE_MARGIN = 2.0
+
+# 提示词中元数据上下文（ddl、freeshot、term）的token预算
+CONTEXT_TOKEN_BUDGET = 6000
+
+# 超出预算时，每个ENUM字段保留的枚举值数量
+CONTEXT_MAX_ENUM_VALUES = 10
+
+# 大模型HTTP连接池配置
+LLM_HTTP_MAX_CONNECTIONS = 100
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_HTTP_KEEPALIVE_EXPIRY = 60
+
+# 异步Agent运行时：执行工具调用（访问SQLite）的线程数
+AGENT_TOOL_WORKERS = 8
+# 异步Agent运行结果的保留数量和时间（秒）
+AGENT_RUN_CACHE_SIZE = 1000
+AGENT_RUN_TTL = 3600
+
+# 同一轮中只读工具调用并行执行的线程数
+TOOL_CALL_WORKERS = 4
+# 是否在模型仍在流式输出时提前执行参数已完整的只读工具调用（可被配置项agent_speculative_tools覆盖）
+AGENT_SPECULATIVE_TOOLS = False
+
+# 会话存储：内存中保留的会话数量和闲置时间（秒）
+SESSION_CACHE_SIZE = 200
+SESSION_TTL = 1800
+# 从内存淘汰的会话是否写入SQLite，以及SQLite中会话的保留时间（秒）
+SESSION_SPILL_ENABLED = True
+SESSION_SPILL_DB_PATH = os.path.join(ROOT_DIR, 'sessions.db')
+SESSION_SPILL_TTL = 7 * 24 * 3600
+
+# 对话历史超过该token数时，压缩较早轮次的工具调用结果
+HISTORY_COMPACT_TOKEN_THRESHOLD = 8000
+
+# 大模型响应缓存模式（可通过环境变量CHATBI_LLM_CACHE_MODE覆盖）：
+# off 关闭；auto 命中则回放，未命中则调用并记录；record 总是调用并记录；replay 只回放，未命中报错（离线可重复测试）
+LLM_CACHE_MODE = os.environ.get('CHATBI_LLM_CACHE_MODE', 'off')
+# 大模型响应缓存数据库文件路径
+LLM_CACHE_DB_PATH = os.environ.get('CHATBI_LLM_CACHE_DB', os.path.join(ROOT_DIR, 'llm_cache.db'))
+# 大模型接口地址覆盖（环境变量CHATBI_LLM_BASE_URL），设置时优先于配置项llm_base_url且不写入config.db，
+# 用于压测等临时指向模拟服务的场景
+LLM_BASE_URL_OVERRIDE = os.environ.get('CHATBI_LLM_BASE_URL') or None
+
+# 流式日志合并：同一个流的token在时间窗口（秒）内或达到字符数阈值时合并为一条消息发送
+STREAM_LOG_FLUSH_INTERVAL = 0.04
+STREAM_LOG_FLUSH_CHARS = 256
+# 开始后超过该时间（秒）没有新token也没有结束的流（如出错中断）被清理
+STREAM_LOG_IDLE_TIMEOUT = 300
+
+# 日志分发：队列容量、单条消息最大长度（超出截断，完整内容按需获取）和保留的完整消息数量
+LOG_QUEUE_SIZE = 10000
+LOG_MAX_MESSAGE_CHARS = 4000
+LOG_PAYLOAD_CACHE_SIZE = 200
+# 队列占用超过该比例时，普通日志每LOG_SAMPLE_RATE条保留1条
+LOG_SAMPLE_WATERMARK = 0.8
+LOG_SAMPLE_RATE = 10
+
+# 管理员令牌（环境变量CHATBI_ADMIN_TOKEN），用于订阅所有会话的日志；为空时不开放
+ADMIN_TOKEN = os.environ.get('CHATBI_ADMIN_TOKEN', '')
+
+# 日志历史：每个会话在内存中保留的事件数和会话数，订阅时回放
+LOG_HISTORY_SIZE = 200
+LOG_HISTORY_SESSIONS = 500
+# 超出内存的日志事件是否写入SQLite，以及文件路径、保留时间（秒）和批量写入的事件数
+LOG_SPILL_ENABLED = True
+LOG_SPILL_DB_PATH = os.path.join(ROOT_DIR, 'log_history.db')
+LOG_SPILL_TTL = 24 * 3600
+LOG_SPILL_BATCH_SIZE = 50
+# 一次订阅最多回放的事件数
+LOG_REPLAY_LIMIT = 500
+
+# 保留最近结束的请求追踪数量，可通过/traces/<request_id>查询
+TRACE_HISTORY_SIZE = 500
+
+# 保留的请求性能分析记录数量，以及文本统计中输出的函数数
+PROFILE_HISTORY_SIZE = 50
+PROFILE_STATS_LIMIT = 50
+# 自动性能分析的接口路径（环境变量CHATBI_PROFILE_PATHS，逗号分隔，如/sql-agent,/ddl），只能由部署方在启动时设置
+PROFILE_PATHS = os.environ.get('CHATBI_PROFILE_PATHS', '')
+
+# Socket.IO运行模式（环境变量CHATBI_ASYNC_MODE：threading、gevent或eventlet，为空时自动选择）
+SOCKETIO_ASYNC_MODE = os.environ.get('CHATBI_ASYNC_MODE') or None
+# 多进程部署时Socket.IO的消息队列（环境变量CHATBI_MESSAGE_QUEUE：file:///path 使用本地文件队列，或redis://等）
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('CHATBI_MESSAGE_QUEUE') or None
+# Socket.IO允许的传输方式（环境变量CHATBI_SOCKETIO_TRANSPORTS，逗号分隔，如websocket），为空时允许长轮询和WebSocket
+SOCKETIO_TRANSPORTS = os.environ.get('CHATBI_SOCKETIO_TRANSPORTS') or None
+# 本地文件队列超过该大小（字节）时轮转，旧文件保留为<文件名>.1
+SOCKETIO_QUEUE_MAX_BYTES = 16 * 1024 * 1024
@@ -0,0 +1,19 @@
+from initial.data import init_data
+from initial.metadata import init_metadata
+from initial.config import init_config_db
+
+
+def bootstrap(rebuild_data=False):
+    """
+    初始化服务依赖的数据：元数据库、业务数据库和配置数据库
+
+    导入app.py不再执行初始化，由启动入口在启动服务前调用一次；多进程部署时只在主进程中调用，
+    避免各worker同时重建SQLite文件。数据库已存在且来源未变化时直接复用，
+    mock数据需通过 python utils/mock_data_generator.py 显式生成
+
+    Args:
+        rebuild_data: 忽略指纹强制重建data.db
+    """
+    init_metadata()
+    init_data(force=rebuild_data)
+    init_config_db()  # 初始化配置数据库
@@ -0,0 +1,150 @@
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config.constants import BULK_LOAD_BATCH_SIZE, BULK_LOAD_CACHE_KB, BULK_LOAD_COMMIT_ROWS
+
+
+class BulkLoader:
+    """
+    批量导入SQLite：记录按(表, 列集合)分组后用executemany写入
+
+    导入期间关闭日志和同步并加大页缓存，只适用于可整体重建的数据库文件（如临时文件中的data.db）；
+    二级索引在数据导入完成后创建。用法：
+
+        loader = BulkLoader(db_path, table_schemas, table_indexes)
+        loader.add_records("video_play_logs", records)
+        stats = loader.finish()
+    """
+
+    def __init__(self, db_path: str, table_schemas: Dict[str, str],
+                 table_indexes: Optional[Dict[str, List[str]]] = None,
+                 batch_size: int = BULK_LOAD_BATCH_SIZE, commit_rows: int = BULK_LOAD_COMMIT_ROWS,
+                 cache_kb: int = BULK_LOAD_CACHE_KB):
+        self.table_schemas = table_schemas
+        self.table_indexes = table_indexes or {}
+        self.batch_size = batch_size
+        self.commit_rows = commit_rows
+        # (表名, 列名元组) -> 待写入的行
+        self._buffers: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[Any, ...]]] = {}
+        self._uncommitted = 0
+        # 表名 -> {"rows": 尝试写入行数, "inserted": 实际写入行数, "seconds": 耗时}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._start = time.perf_counter()
+
+        # 手动管理事务
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute(f"PRAGMA cache_size=-{int(cache_kb)}")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        for table_name, create_sql in table_schemas.items():
+            try:
+                self.conn.execute(create_sql)
+            except Exception as e:
+                print(f"Error creating table {table_name}: {e}")
+        self.conn.execute("BEGIN")
+
+    def add_records(self, table_name: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        添加一张表的记录，缓冲区满时写入
+
+        Returns:
+            int: 接收的记录数；未知表的记录被忽略，返回0
+        """
+        if table_name not in self.table_schemas:
+            return 0
+        count = 0
+        for record in records:
+            key = (table_name, tuple(record))
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = []
+            buffer.append(tuple(record.values()))
+            count += 1
+            if len(buffer) >= self.batch_size:
+                self._flush(key)
+        return count
+
+    def _flush(self, key: Tuple[str, Tuple[str, ...]]):
+        rows = self._buffers.pop(key, None)
+        if not rows:
+            return
+        table_name, columns = key
+        # 重复主键等冲突记录跳过，与逐行导入时打印错误后继续的行为一致
+        insert_sql = (f"INSERT OR IGNORE INTO {table_name} ({', '.join(columns)}) "
+                      f"VALUES ({', '.join(['?'] * len(columns))})")
+        start = time.perf_counter()
+        before = self.conn.total_changes
+        remaining = rows
+        while remaining:
+            # 记录executemany正在处理的行，出错时跳过该行后继续写入其余记录
+            # （journal_mode=OFF时不能回滚，因此不使用SAVEPOINT重试整组）
+            current = [0]
+
+            def iterate(batch):
+                for index, row in enumerate(batch):
+                    current[0] = index
+                    yield row
+
+            try:
+                self.conn.executemany(insert_sql, iterate(remaining))
+                break
+            except sqlite3.OperationalError as e:
+                # 列不存在等语句错误，整组记录都无法写入
+                print(f"Error inserting data into {table_name}: {e}")
+                break
+            except Exception as e:
+                print(f"Error inserting data into {table_name}: {e}")
+                remaining = remaining[current[0] + 1:]
+        stats = self._stats.setdefault(table_name, {"rows": 0, "inserted": 0, "seconds": 0.0})
+        stats["rows"] += len(rows)
+        stats["inserted"] += self.conn.total_changes - before
+        stats["seconds"] += time.perf_counter() - start
+
+        self._uncommitted += len(rows)
+        if self._uncommitted >= self.commit_rows:
+            self.conn.execute("COMMIT")
+            self.conn.execute("BEGIN")
+            self._uncommitted = 0
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        写入剩余记录、创建索引并关闭连接
+
+        Returns:
+            Dict[str, Any]: 导入统计，包含各表和总计的行数、耗时和rows/sec
+        """
+        try:
+            for key in list(self._buffers):
+                self._flush(key)
+            self.conn.execute("COMMIT")
+
+            index_start = time.perf_counter()
+            for table_name, index_sqls in self.table_indexes.items():
+                for index_sql in index_sqls:
+                    try:
+                        self.conn.execute(index_sql)
+                    except Exception as e:
+                        print(f"Error creating index on {table_name}: {e}")
+            index_seconds = time.perf_counter() - index_start
+            self.conn.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            self.conn.close()
+
+        total_rows = sum(stats["rows"] for stats in self._stats.values())
+        seconds = time.perf_counter() - self._start
+        for table_name, stats in self._stats.items():
+            stats["rows_per_sec"] = round(stats["rows"] / stats["seconds"]) if stats["seconds"] else 0
+            print(f"Loaded {stats['inserted']}/{stats['rows']} rows into {table_name} "
+                  f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']} rows/sec)")
+        rows_per_sec = round(total_rows / seconds) if seconds else 0
+        print(f"Bulk load finished: {total_rows} rows in {seconds:.2f}s ({rows_per_sec} rows/sec), "
+              f"indexes {index_seconds:.2f}s")
+        return {
+            "tables": self._stats,
+            "rows": total_rows,
+            "seconds": round(seconds, 3),
+            "index_seconds": round(index_seconds, 3),
+            "rows_per_sec": rows_per_sec
+        }
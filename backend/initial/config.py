@@ -1,13 +1,43 @@
 import sqlite3
 import json
 import os
-from typing import List, Dict, Any, Union, Optional
-from config.constants import CONFIG_DB_PATH, INITIAL_DIR
+import threading
+import time
+from types import MappingProxyType
+from typing import List, Dict, Any, Union, Optional, Callable, Set
+from config.constants import CONFIG_DB_PATH, INITIAL_DIR, CONFIG_VERSION_CHECK_INTERVAL, LLM_BASE_URL_OVERRIDE
 from services.db_service import DatabaseError
 
 # 配置文件路径
 CONFIG_JSON_PATH = os.path.join(INITIAL_DIR, 'config', 'config.json')
 
+
+class ConfigSnapshot:
+    """配置的不可变快照，version在每次配置更新后递增"""
+
+    __slots__ = ("version", "values", "names")
+
+    def __init__(self, version: int, configs: List[Dict[str, str]]):
+        self.version = version
+        self.values = MappingProxyType({config["key"]: config["value"] for config in configs})
+        self.names = MappingProxyType({config["key"]: config["name"] for config in configs})
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return [{"key": key, "value": value, "name": self.names[key]} for key, value in self.values.items()]
+
+
+# 当前配置快照，首次访问时从config.db加载，之后在update_configs时或发现其他进程修改了配置时整体替换
+_snapshot: Optional[ConfigSnapshot] = None
+_snapshot_lock = threading.Lock()
+# 当前快照对应的config_version版本号，以及上次检查版本号的时间
+_snapshot_db_version = 0
+_last_version_check = 0.0
+# 配置变更订阅者，回调参数为(新快照, 变更的key集合)
+_subscribers: List[Callable[[ConfigSnapshot, Set[str]], None]] = []
+
 def load_default_configs() -> List[Dict[str, str]]:
     """
     从config.json文件加载默认配置
@@ -21,14 +51,27 @@ def load_default_configs() -> List[Dict[str, str]]:
     except Exception as e:
         print(f"加载配置文件失败: {str(e)}")
 
+def _ensure_schema(cursor: sqlite3.Cursor):
+    """创建配置表和版本号表，版本号在每次配置变更时递增，供其他进程发现变更"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS configs (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        name TEXT NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS config_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO config_version (id, version) VALUES (1, 0)")
+
 def init_config_db():
     """
-    初始化配置数据库，如果不存在则创建并写入默认配置
+    初始化配置数据库：不存在时创建，并补充config.json中新增的默认配置（已有配置的值保持不变）
     """
-    # 检查数据库文件是否存在
-    if os.path.exists(CONFIG_DB_PATH):
-        return
-    
     # 创建数据库连接
     conn = None
     try:
@@ -36,23 +79,21 @@ def init_config_db():
         cursor = conn.cursor()
         
         # 创建配置表
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS configs (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL,
-            name TEXT NOT NULL
-        )
-        """)
+        _ensure_schema(cursor)
         
         # 从配置文件加载默认配置
-        default_configs = load_default_configs()
+        default_configs = load_default_configs() or []
         
-        # 插入默认配置
+        # 插入缺少的默认配置
+        inserted = 0
         for config in default_configs:
             cursor.execute(
-                "INSERT INTO configs (key, value, name) VALUES (?, ?, ?)",
+                "INSERT OR IGNORE INTO configs (key, value, name) VALUES (?, ?, ?)",
                 (config["key"], config["value"], config["name"])
             )
+            inserted += cursor.rowcount
+        if inserted:
+            cursor.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
         
         conn.commit()
     except sqlite3.Error as e:
@@ -63,12 +104,24 @@ def init_config_db():
         if conn:
             conn.close()
 
-def get_all_configs() -> List[Dict[str, str]]:
+def _read_db_version(cursor: sqlite3.Cursor) -> int:
+    try:
+        cursor.execute("SELECT version FROM config_version WHERE id = 1")
+    except sqlite3.OperationalError:
+        # 旧的config.db在init_config_db之前没有版本号表
+        return 0
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def _load_configs_from_db(version_only: bool = False):
     """
-    获取所有配置项
+    从config.db读取配置版本号和所有配置项
+    
+    Args:
+        version_only (bool): 只读取版本号
     
     Returns:
-        List[Dict[str, str]]: 配置项列表，每项包含key, value, name
+        tuple: (版本号, 配置项列表)，配置项每项包含key, value, name；version_only时配置项为None
     """
     conn = None
     try:
@@ -76,18 +129,111 @@ def get_all_configs() -> List[Dict[str, str]]:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
+        version = _read_db_version(cursor)
+        if version_only:
+            return version, None
         cursor.execute("SELECT key, value, name FROM configs")
         rows = cursor.fetchall()
         
         # 转换为字典列表
         configs = [{"key": row["key"], "value": row["value"], "name": row["name"]} for row in rows]
-        return configs
+        return version, configs
     except sqlite3.Error as e:
         raise DatabaseError(f"获取配置失败: {str(e)}")
     finally:
         if conn:
             conn.close()
 
+def get_config_snapshot() -> ConfigSnapshot:
+    """
+    获取当前配置快照，首次调用时读取config.db；之后每隔CONFIG_VERSION_CHECK_INTERVAL秒检查一次版本号，
+    其他进程（如serve.py的其他worker）修改配置后重新加载并通知订阅者
+    
+    Returns:
+        ConfigSnapshot: 不可变的配置快照
+    """
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _last_version_check < CONFIG_VERSION_CHECK_INTERVAL:
+        return snapshot
+    snapshot, changed_keys = _refresh_snapshot()
+    _notify_subscribers(snapshot, changed_keys)
+    return snapshot
+
+def _refresh_snapshot(force: bool = False):
+    """
+    版本号变化（或force）时重新加载配置快照
+    
+    Returns:
+        tuple: (当前快照, 值发生变化的key集合)
+    """
+    global _last_version_check
+    with _snapshot_lock:
+        if (not force and _snapshot is not None
+                and time.monotonic() - _last_version_check < CONFIG_VERSION_CHECK_INTERVAL):
+            return _snapshot, set()
+        _last_version_check = time.monotonic()
+        if _snapshot is None or force:
+            version, configs = _load_configs_from_db()
+            return _snapshot_after_swap(configs, version)
+        try:
+            version, _ = _load_configs_from_db(version_only=True)
+            if version == _snapshot_db_version:
+                return _snapshot, set()
+            version, configs = _load_configs_from_db()
+        except DatabaseError as e:
+            print(f"检查配置版本失败: {str(e)}")
+            return _snapshot, set()
+        return _snapshot_after_swap(configs, version)
+
+def _snapshot_after_swap(configs: List[Dict[str, str]], version: int):
+    global _snapshot_db_version
+    changed_keys = _swap_snapshot(configs)
+    _snapshot_db_version = version
+    return _snapshot, changed_keys
+
+def _swap_snapshot(configs: List[Dict[str, str]]) -> Set[str]:
+    """
+    用新的配置替换当前快照，调用方需持有_snapshot_lock
+    
+    Returns:
+        Set[str]: 值发生变化的key集合
+    """
+    global _snapshot
+    old = _snapshot
+    new = ConfigSnapshot((old.version + 1) if old else 1, configs)
+    _snapshot = new
+    if old is None:
+        return set()
+    keys = set(old.values) | set(new.values)
+    return {key for key in keys if old.values.get(key) != new.values.get(key)}
+
+def _notify_subscribers(snapshot: ConfigSnapshot, changed_keys: Set[str]):
+    if not changed_keys:
+        return
+    for callback in list(_subscribers):
+        try:
+            callback(snapshot, changed_keys)
+        except Exception as e:
+            print(f"配置变更通知失败: {str(e)}")
+
+def subscribe_config_changes(callback: Callable[[ConfigSnapshot, Set[str]], None]):
+    """
+    订阅配置变更，配置更新后以(新快照, 变更的key集合)调用callback
+    
+    Args:
+        callback: 回调函数
+    """
+    _subscribers.append(callback)
+
+def get_all_configs() -> List[Dict[str, str]]:
+    """
+    获取所有配置项
+    
+    Returns:
+        List[Dict[str, str]]: 配置项列表，每项包含key, value, name
+    """
+    return get_config_snapshot().to_list()
+
 def get_config(key: str) -> Optional[Dict[str, str]]:
     """
     获取指定key的配置项
@@ -98,47 +244,41 @@ def get_config(key: str) -> Optional[Dict[str, str]]:
     Returns:
         Optional[Dict[str, str]]: 配置项，包含key, value, name，如果不存在则返回None
     """
-    conn = None
-    try:
-        conn = sqlite3.connect(CONFIG_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT key, value, name FROM configs WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        
-        if row:
-            return {"key": row["key"], "value": row["value"], "name": row["name"]}
-        return None
-    except sqlite3.Error as e:
-        raise DatabaseError(f"获取配置失败: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+    snapshot = get_config_snapshot()
+    if key in snapshot.values:
+        return {"key": key, "value": snapshot.values[key], "name": snapshot.names[key]}
+    return None
 
 def update_configs(configs: List[Dict[str, str]]) -> bool:
     """
-    更新配置项
+    更新配置项，写入config.db并递增版本号后替换配置快照并通知订阅者；其他进程在下次检查版本号时生效
     
     Args:
         configs (List[Dict[str, str]]): 要更新的配置项列表，每项包含key和value
         
     Returns:
         bool: 更新是否成功
+    
+    Raises:
+        ValueError: 配置项不存在，此时不更新任何配置
     """
     conn = None
     try:
         conn = sqlite3.connect(CONFIG_DB_PATH)
         cursor = conn.cursor()
+        _ensure_schema(cursor)
         
         for config in configs:
             cursor.execute(
                 "UPDATE configs SET value = ? WHERE key = ?",
                 (config["value"], config["key"])
             )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                raise ValueError(f"配置项不存在: {config['key']}")
+        cursor.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
         
         conn.commit()
-        return True
     except sqlite3.Error as e:
         if conn:
             conn.rollback()
@@ -146,6 +286,11 @@ def update_configs(configs: List[Dict[str, str]]) -> bool:
     finally:
         if conn:
             conn.close()
+    
+    # 整体替换配置快照，并通知订阅者
+    snapshot, changed_keys = _refresh_snapshot(force=True)
+    _notify_subscribers(snapshot, changed_keys)
+    return True
 
 def get_llm_config() -> Dict[str, Any]:
     """
@@ -155,19 +300,20 @@ def get_llm_config() -> Dict[str, Any]:
         Dict[str, Any]: LLM配置字典
     """
     try:
-        configs = get_all_configs()
+        values = get_config_snapshot().values
         llm_config = {}
         
         # 提取LLM相关配置
-        for config in configs:
-            if config["key"] == "llm_api_key":
-                llm_config["api_key"] = config["value"]
-            elif config["key"] == "llm_base_url":
-                llm_config["base_url"] = config["value"]
-            elif config["key"] == "llm_model":
-                llm_config["model"] = config["value"]
-            elif config["key"] == "llm_timeout":
-                llm_config["timeout"] = int(config["value"])
+        if "llm_api_key" in values:
+            llm_config["api_key"] = values["llm_api_key"]
+        if "llm_base_url" in values:
+            llm_config["base_url"] = values["llm_base_url"]
+        if LLM_BASE_URL_OVERRIDE:
+            llm_config["base_url"] = LLM_BASE_URL_OVERRIDE
+        if "llm_model" in values:
+            llm_config["model"] = values["llm_model"]
+        if "llm_timeout" in values:
+            llm_config["timeout"] = int(values["llm_timeout"])
         return llm_config
     except Exception as e:
         # 出错时返回默认配置
@@ -181,18 +327,16 @@ def get_embedding_config() -> Dict[str, Any]:
         Dict[str, Any]: 向量嵌入配置字典
     """
     try:
-        configs = get_all_configs()
+        values = get_config_snapshot().values
         embedding_config = {}
         
         # 提取向量嵌入相关配置
-        for config in configs:
-            if config["key"] == "embedding_api_key":
-                embedding_config["api_key"] = config["value"]
-            elif config["key"] == "embedding_api_url":
-                embedding_config["api_url"] = config["value"]
-            elif config["key"] == "embedding_model":
-                embedding_config["model"] = config["value"]
-
+        if "embedding_api_key" in values:
+            embedding_config["api_key"] = values["embedding_api_key"]
+        if "embedding_api_url" in values:
+            embedding_config["api_url"] = values["embedding_api_url"]
+        if "embedding_model" in values:
+            embedding_config["model"] = values["embedding_model"]
         
         return embedding_config
     except Exception as e:
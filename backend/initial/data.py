@@ -2,22 +2,30 @@ import sqlite3
 import json
 import os
 import glob
-from config.constants import DATA_DB_PATH, INITIAL_DATA_DIR, INITIAL_METADATA_DIR
+import hashlib
+from config.constants import DATA_DB_PATH, DATA_DB_FINGERPRINT_PATH, INITIAL_DATA_DIR, INITIAL_METADATA_DIR
+from initial.bulk_loader import BulkLoader
+from initial.data_files import is_data_file, iter_data_file
 
-def init_data():    
-    # 每次初始化时先删除数据库文件
-    if os.path.exists(DATA_DB_PATH):
-        os.remove(DATA_DB_PATH)
-    
-    # Connect to SQLite database
-    conn = sqlite3.connect(DATA_DB_PATH)
-    cursor = conn.cursor()
-    
+# 导入逻辑变化（类型映射、加载方式等）时递增，使已有的data.db失效
+DATA_LOADER_VERSION = 2
+
+
+def build_table_schemas():
+    """
+    根据元数据文件生成业务表的建表语句和索引语句
+
+    表的indexes字段为索引列列表，如 [["start_time"], ["video_id", "dt"]]，索引在数据导入完成后创建
+
+    Returns:
+        tuple: (表名 -> CREATE TABLE语句, 表名 -> CREATE INDEX语句列表)
+    """
     # Dictionary to store table schemas
     table_schemas = {}
+    table_indexes = {}
     
-    # First pass: read metadata files to create table schemas
-    for filename in os.listdir(INITIAL_METADATA_DIR):
+    # Read metadata files to create table schemas
+    for filename in sorted(os.listdir(INITIAL_METADATA_DIR)):
         if filename.endswith('.json') and filename != 'template.json':
             file_path = os.path.join(INITIAL_METADATA_DIR, filename)
             db_name = os.path.splitext(filename)[0]  # Get database name without extension
@@ -74,45 +82,97 @@ def init_data():
                     
                     # Store the create table SQL
                     table_schemas[table_name] = create_table_sql
+                    table_indexes[table_name] = [
+                        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{'_'.join(index_columns)} "
+                        f"ON {table_name} ({', '.join(index_columns)})"
+                        for index_columns in table.get('indexes', [])
+                    ]
             except Exception as e:
                 print(f"Error processing metadata file {filename}: {e}")
     
-    # Create tables in the database
-    for table_name, create_sql in table_schemas.items():
-        try:
-            cursor.execute(create_sql)
-        except Exception as e:
-            print(f"Error creating table {table_name}: {e}")
-    
-    # Second pass: load data from data files
-    data_files = glob.glob(os.path.join(INITIAL_DATA_DIR, "*.json"))
-    
+    return table_schemas, table_indexes
+
+
+def get_data_files():
+    """数据目录下的数据文件：.json、.jsonl、.csv及其gzip压缩文件"""
+    return sorted(path for path in glob.glob(os.path.join(INITIAL_DATA_DIR, "*")) if is_data_file(path))
+
+
+def compute_data_fingerprint(table_schemas, table_indexes, data_files):
+    """
+    计算data.db的来源指纹：建表和索引语句、数据文件的路径/大小/修改时间和导入逻辑版本
+
+    只读取文件元信息，不读取数据文件内容，启动时检查只需几毫秒
+    """
+    digest = hashlib.sha256(f"loader:{DATA_LOADER_VERSION}\n".encode("utf-8"))
+    for table_name in sorted(table_schemas):
+        digest.update(table_schemas[table_name].encode("utf-8"))
+        for index_sql in table_indexes.get(table_name, []):
+            digest.update(index_sql.encode("utf-8"))
     for data_file in data_files:
-                try:
-                    with open(data_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                    # Process each table in the data file
-                    for table_name, records in data.items():
-                        if table_name in table_schemas and isinstance(records, list):
-                            for record in records:
-                                # Prepare insert statement
-                                columns = list(record.keys())
-                                placeholders = ['?'] * len(columns)
-                                values = [record[col] for col in columns]
-                                
-                                insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-                                
-                                try:
-                                    cursor.execute(insert_sql, values)
-                                except Exception as e:
-                                    print(f"Error inserting data into {table_name}: {e}")
-                except Exception as e:
-                    print(f"Error processing data file {data_file}: {e}")
+        stat = os.stat(data_file)
+        digest.update(f"{os.path.basename(data_file)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_fingerprint():
+    try:
+        with open(DATA_DB_FINGERPRINT_PATH, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def init_data(force=False):
+    """
+    初始化业务数据库data.db
+
+    元数据和数据文件都没有变化时直接复用已有的data.db；否则在临时文件中重建后整体替换，
+    重建过程中其他进程读到的仍是旧文件。有数据文件读取或导入失败时不写入指纹，下次启动重新导入
+
+    Args:
+        force (bool): 忽略指纹强制重建
+
+    Returns:
+        bool: 是否重建了数据库
+    """
+    table_schemas, table_indexes = build_table_schemas()
+    data_files = get_data_files()
+    fingerprint = compute_data_fingerprint(table_schemas, table_indexes, data_files)
+    if not force and os.path.exists(DATA_DB_PATH) and _read_fingerprint() == fingerprint:
+        print(f"Data database is up to date: {DATA_DB_PATH}")
+        return False
+
+    tmp_path = DATA_DB_PATH + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
     
-    conn.commit()
-    conn.close()
+    loader = BulkLoader(tmp_path, table_schemas, table_indexes)
+    failed_files = []
+    try:
+        # Load data from data files; JSON Lines and CSV records are streamed into the loader
+        for data_file in data_files:
+            try:
+                for table_name, records in iter_data_file(data_file, table_schemas):
+                    loader.add_records(table_name, records)
+            except Exception as e:
+                failed_files.append(data_file)
+                print(f"Error processing data file {data_file}: {e}")
+    finally:
+        loader.finish()
+
+    os.replace(tmp_path, DATA_DB_PATH)
+    if failed_files:
+        # 数据不完整，删除旧指纹使下次启动重新导入
+        if os.path.exists(DATA_DB_FINGERPRINT_PATH):
+            os.remove(DATA_DB_FINGERPRINT_PATH)
+        print(f"Data database initialized with {len(failed_files)} failed data file(s), "
+              f"it will be rebuilt on next start: {DATA_DB_PATH}")
+        return True
+    with open(DATA_DB_FINGERPRINT_PATH, 'w', encoding='utf-8') as f:
+        f.write(fingerprint)
     print(f"Data database initialized successfully: {DATA_DB_PATH}")
+    return True
 
 def get_table_data(table_name, limit=100, offset=0, filters=None):
     """
@@ -0,0 +1,148 @@
+import csv
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# 支持的数据文件格式：
+#   .json             {"表名": [记录, ...]}，整体读入内存，兼容已有数据文件
+#   .jsonl[.gz]       每行一条记录
+#   .csv[.gz]         首行为列名，空值读取为NULL
+# JSON Lines和CSV文件只包含一张表的记录，按文件名确定表名（文件名等于表名或以"_表名"结尾），逐行读取
+DATA_FILE_SUFFIXES = ('.json', '.jsonl', '.jsonl.gz', '.csv', '.csv.gz')
+DATA_FORMATS = ('json', 'jsonl', 'csv')
+
+
+def split_data_file_name(path: str) -> Tuple[str, str, bool]:
+    """
+    拆分数据文件名
+
+    Returns:
+        Tuple[str, str, bool]: (不含扩展名的文件名, 格式, 是否gzip压缩)
+    """
+    name = os.path.basename(path)
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    stem, ext = os.path.splitext(name)
+    return stem, ext.lstrip('.'), compressed
+
+
+def is_data_file(path: str) -> bool:
+    return os.path.basename(path).endswith(DATA_FILE_SUFFIXES)
+
+
+def open_text(path: str, mode: str = 'r'):
+    """以UTF-8文本方式打开文件，.gz文件自动解压/压缩"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def resolve_table_name(stem: str, table_names: Iterable[str]) -> Optional[str]:
+    """根据文件名确定表名：文件名等于表名，或以"_表名"结尾（如iqiyi_data_video_play_logs）"""
+    matched = None
+    for table_name in table_names:
+        if stem == table_name:
+            return table_name
+        if stem.endswith('_' + table_name) and (matched is None or len(table_name) > len(matched)):
+            matched = table_name
+    return matched
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing {path} line {line_number}: {e}")
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open_text(path) as f:
+        for row in csv.DictReader(f):
+            # 列类型由SQLite的类型亲和性转换，空值作为NULL
+            yield {key: (value if value != '' else None) for key, value in row.items()}
+
+
+def iter_data_file(path: str, table_names: Iterable[str]) -> Iterator[Tuple[str, Iterable[Dict[str, Any]]]]:
+    """
+    读取数据文件
+
+    Yields:
+        Tuple[str, Iterable[Dict[str, Any]]]: (表名, 记录)，JSON Lines和CSV文件的记录逐行读取
+    """
+    stem, data_format, compressed = split_data_file_name(path)
+    if data_format == 'json' and not compressed:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for table_name, records in data.items():
+            if isinstance(records, list):
+                yield table_name, records
+        return
+
+    table_name = resolve_table_name(stem, table_names)
+    if table_name is None:
+        print(f"Skipping data file {path}: no table matches its name")
+        return
+    if data_format == 'jsonl':
+        yield table_name, iter_jsonl(path)
+    elif data_format == 'csv':
+        yield table_name, iter_csv(path)
+    else:
+        print(f"Skipping data file {path}: unsupported format")
+
+
+def write_data_file(directory: str, prefix: str, table_name: str, records: Iterable[Dict[str, Any]],
+                    data_format: str = 'json', compress: bool = False) -> Tuple[str, int]:
+    """
+    把一张表的记录写入数据文件 <directory>/<prefix><table_name>.<格式>[.gz]
+
+    JSON Lines和CSV逐条写入，records可以是生成器；同一张表其他格式的旧文件会被删除，避免重复导入
+
+    Returns:
+        Tuple[str, int]: (文件路径, 记录数)
+    """
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"不支持的数据文件格式: {data_format}")
+    if data_format == 'json' and compress:
+        raise ValueError("json格式不支持压缩，请使用jsonl或csv")
+
+    stem = prefix + table_name
+    path = os.path.join(directory, stem + '.' + data_format + ('.gz' if compress else ''))
+    for suffix in DATA_FILE_SUFFIXES:
+        old_path = os.path.join(directory, stem + suffix)
+        if old_path != path and os.path.exists(old_path):
+            os.remove(old_path)
+
+    count = 0
+    if data_format == 'json':
+        records = list(records)
+        count = len(records)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({table_name: records}, f, ensure_ascii=False, indent=2)
+        return path, count
+
+    with open_text(path, 'w') as f:
+        if data_format == 'jsonl':
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                count += 1
+        else:
+            writer = None
+            for record in records:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(record))
+                    writer.writeheader()
+                # 布尔值写为0/1，与SQLite中的存储一致
+                writer.writerow({key: int(value) if isinstance(value, bool) else value
+                                 for key, value in record.items()})
+                count += 1
+    return path, count
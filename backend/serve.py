@@ -0,0 +1,196 @@
+"""
+生产环境启动入口
+
+    python serve.py --async-mode threading --threads 32
+    python serve.py --async-mode gevent --threads 1000 --workers 4
+
+主进程只执行一次数据初始化并监听端口，然后派生worker进程共享同一个监听socket；
+多个worker时通过消息队列（默认本地文件队列，可用 --message-queue redis://... 替换）转发Socket.IO推送
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ChatBI后端生产环境启动入口")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--async-mode", choices=["threading", "gevent", "eventlet"], default="threading",
+                        help="并发模式：线程池或协程")
+    parser.add_argument("--threads", type=int, default=32,
+                        help="每个worker的并发数：threading模式为线程数，gevent/eventlet模式为协程数")
+    parser.add_argument("--workers", type=int, default=1, help="worker进程数")
+    parser.add_argument("--message-queue", help="Socket.IO消息队列地址，多个worker时默认使用本地文件队列")
+    parser.add_argument("--transports",
+                        help="Socket.IO允许的传输方式（逗号分隔），多个worker时默认只允许websocket，"
+                             "反向代理按sid粘滞路由时可设为polling,websocket")
+    parser.add_argument("--backlog", type=int, default=1024, help="监听队列长度")
+    parser.add_argument("--skip-bootstrap", action="store_true", help="不执行数据初始化")
+    parser.add_argument("--rebuild-data", action="store_true", help="忽略指纹强制重建data.db")
+    return parser.parse_args()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_threading(app, sock: socket.socket, threads: int):
+    """werkzeug服务器 + 固定大小的线程池"""
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        multithread = True
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi-worker")
+
+        def process_request(self, request, client_address):
+            self._pool.submit(self._handle_request, request, client_address)
+
+        def _handle_request(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, fd=sock.fileno())
+    server.serve_forever()
+
+
+def serve_gevent(app, sock: socket.socket, threads: int):
+    from gevent import pywsgi
+    from gevent.pool import Pool
+    try:
+        from geventwebsocket.handler import WebSocketHandler
+        handler_class = WebSocketHandler
+    except ImportError:
+        # 未安装gevent-websocket时只支持长轮询
+        handler_class = pywsgi.WSGIHandler
+    pywsgi.WSGIServer(sock, app, spawn=Pool(threads), handler_class=handler_class).serve_forever()
+
+
+def serve_eventlet(app, sock: socket.socket, threads: int):
+    import eventlet.wsgi
+    eventlet.wsgi.server(sock, app, max_size=threads)
+
+
+SERVERS = {
+    "threading": serve_threading,
+    "gevent": serve_gevent,
+    "eventlet": serve_eventlet,
+}
+
+
+def run_worker(args, sock: socket.socket):
+    # 环境变量已在主进程中设置，app导入时据此选择运行模式和消息队列
+    from app import app
+    print(f"worker {os.getpid()} 已启动（{args.async_mode}，并发数 {args.threads}）")
+    SERVERS[args.async_mode](app, sock, args.threads)
+
+
+def run_master(args, sock: socket.socket):
+    """派生worker进程，worker异常退出时重新派生，收到SIGTERM/SIGINT时结束所有worker"""
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(args, sock)
+            finally:
+                os._exit(1)
+        children[pid] = time.time()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started_at = children.pop(pid, None)
+        if started_at is None or stopping:
+            continue
+        print(f"worker {pid} 已退出（状态 {status}），重新启动")
+        # 启动即退出时稍作等待，避免反复派生
+        if time.time() - started_at < 1:
+            time.sleep(1)
+        spawn()
+
+
+def main():
+    args = parse_args()
+
+    # 协程模式必须在导入其他模块之前打补丁
+    if args.async_mode == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+    elif args.async_mode == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+
+    if args.workers > 1 and not args.message_queue:
+        from config.constants import ROOT_DIR
+        queue_path = os.path.join(ROOT_DIR, "socketio_queue.log")
+        # 每次启动清空文件队列，worker只读取启动之后的消息
+        open(queue_path, "wb").close()
+        if os.path.exists(queue_path + ".1"):
+            os.remove(queue_path + ".1")
+        args.message_queue = f"file://{queue_path}"
+    if args.workers > 1 and not args.transports:
+        # 共享监听端口时没有按sid的粘滞路由，长轮询的后续请求可能落到其他worker
+        args.transports = "websocket"
+
+    os.environ["CHATBI_ASYNC_MODE"] = args.async_mode
+    if args.message_queue:
+        os.environ["CHATBI_MESSAGE_QUEUE"] = args.message_queue
+    if args.transports:
+        os.environ["CHATBI_SOCKETIO_TRANSPORTS"] = args.transports
+
+    if not args.skip_bootstrap:
+        from initial.bootstrap import bootstrap
+        bootstrap(rebuild_data=args.rebuild_data)
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    print(f"服务已在 http://{args.host}:{args.port} 启动，worker数 {args.workers}")
+    if args.workers > 1:
+        print(f"Socket.IO传输方式: {args.transports}；会话、日志历史和负载缓存、追踪及/metrics按worker进程保存")
+    if args.workers > 1:
+        run_master(args, sock)
+    else:
+        run_worker(args, sock)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
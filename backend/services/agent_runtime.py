@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, Optional
+from services.ttl_cache import TTLCache
+from config.constants import AGENT_TOOL_WORKERS, AGENT_RUN_CACHE_SIZE, AGENT_RUN_TTL
+
+
+class AgentRuntime:
+    """异步Agent运行时
+
+    在一个后台线程中运行asyncio事件循环，所有Agent会话的LLM流式对话都在该循环上多路复用；
+    访问SQLite等阻塞操作的工具调用分发到线程池执行，不阻塞事件循环。
+    """
+
+    def __init__(self, tool_workers: int = AGENT_TOOL_WORKERS):
+        self.tool_workers = tool_workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tool_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._runs = TTLCache(maxsize=AGENT_RUN_CACHE_SIZE, ttl=AGENT_RUN_TTL)
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """首次使用时启动事件循环线程"""
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._tool_executor = ThreadPoolExecutor(max_workers=self.tool_workers, thread_name_prefix="agent-tool")
+                self._thread = threading.Thread(target=loop.run_forever, name="agent-runtime", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """将协程提交到运行时事件循环
+
+        协程在提交时上下文的副本中运行（事件循环回调会复制调用线程的上下文），日志会话ID随之传递
+
+        Returns:
+            Future: 可在任意线程中等待的结果
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    async def run_in_thread(self, func: Callable, *args) -> Any:
+        """在工具线程池中执行阻塞函数，只能在运行时事件循环中调用；函数在当前上下文的副本中执行"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._tool_executor, context.run, func, *args)
+
+    def start_run(self, coro: Coroutine) -> str:
+        """后台启动一次Agent运行，立即返回运行ID
+
+        Returns:
+            str: 运行ID，用于查询结果
+        """
+        run_id = uuid.uuid4().hex
+        self._runs.set(run_id, self.submit(coro))
+        return run_id
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """查询运行状态
+
+        Returns:
+            Optional[Dict[str, Any]]: {"status": "running"}、{"status": "done", "result": {...}} 或 {"status": "error", "error": ""}，运行ID不存在时返回None
+        """
+        future = self._runs.get(run_id)
+        if future is None:
+            return None
+        if not future.done():
+            return {"status": "running"}
+        error = future.exception()
+        if error is not None:
+            return {"status": "error", "error": str(error)}
+        return {"status": "done", "result": future.result()}
+
+
+agent_runtime = AgentRuntime()
@@ -0,0 +1,72 @@
+from typing import Dict, List
+from services.logger import broadcast_log
+from services.llm_config import get_async_client
+from services.tool_registry import ToolRegistry
+from services.sql_agent import SQLAgent
+from services.agent_runtime import agent_runtime
+
+
+class AsyncSQLAgent(SQLAgent):
+    """SQLAgent的异步版本
+
+    LLM流式对话在运行时事件循环上以协程执行，等待模型输出时不占用线程；
+    工具调用（访问SQLite）在运行时的工具线程池中执行。
+    """
+
+    async def agenerate(self) -> Dict:
+        """异步生成SQL并执行
+
+        Returns:
+            Dict: 包含思考过程、SQL和执行结果的字典
+        """
+        try:
+            # 获取注册的工具函数
+            functions = ToolRegistry.get_tools()
+
+            # 调用API
+            client = get_async_client()
+            broadcast_log("ai", "", "SQLAgent-推理中...")
+
+            current_turn = 0
+            final_response = None
+
+            while current_turn < self.max_turns:
+                current_turn += 1
+
+                # 调用模型（流式输出）
+                stream = await client.chat.completions.create(**self._completion_kwargs(functions))
+
+                # 用于累积完整响应的变量
+                state = self._new_turn_state(current_turn)
+
+                # 处理流式响应
+                async for chunk in stream:
+                    self._process_chunk(state, chunk, current_turn)
+
+                tool_calls = self._finish_turn(state, current_turn)
+                if not tool_calls:
+                    final_response = state["final_response"]
+                    break
+
+                await agent_runtime.run_in_thread(self._execute_tool_calls, tool_calls, current_turn)
+
+            return self._build_result(final_response)
+
+        except Exception as e:
+            return self._build_error_result(e)
+
+
+def start_sql_agent_run(ddl: List = None, freeshot: List = None, term: List = None, messages: List = None) -> str:
+    """在异步运行时中后台启动SQLAgent
+
+    Args:
+        ddl: 数据库定义信息
+        freeshot: 相似查询示例
+        term: 术语解释
+        messages: 历史对话消息
+
+    Returns:
+        str: 运行ID，通过agent_runtime.get_run查询结果
+    """
+    agent = AsyncSQLAgent(ddl, freeshot, term, messages)
+    return agent_runtime.start_run(agent.agenerate())
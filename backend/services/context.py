@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+from services.ddl import generate_ddl_metadata_from_schema
+from services.freeshot import generate_freeshot_metadata_from_schema
+from services.term import generate_term_metadata_from_schema
+from services.log_context import submit_with_context
+from config.constants import CONTEXT_WORKERS
+
+# 共享线程池，用于并行召回freeshot和term
+_executor = ThreadPoolExecutor(max_workers=CONTEXT_WORKERS, thread_name_prefix="context")
+
+def generate_context_metadata_from_schema(schema_data):
+    """
+    并行生成DDL、召回相关示例和业务术语，合并为一次返回
+
+    DDL生成包含一次大模型表筛选调用，耗时最长，直接在当前线程执行；
+    freeshot和term提交到线程池与之并行，总耗时取决于最慢的分支。
+
+    Args:
+        schema_data (dict): 包含用户问题和高亮元数据的字典
+
+    Returns:
+        dict: 格式为 {"ddl": [...], "freeshot": [...], "term": [...]}
+    """
+    freeshot_future = submit_with_context(_executor, generate_freeshot_metadata_from_schema, schema_data)
+    term_future = submit_with_context(_executor, generate_term_metadata_from_schema, schema_data)
+
+    ddl = generate_ddl_metadata_from_schema(schema_data)
+
+    return {
+        "ddl": ddl,
+        "freeshot": freeshot_future.result(),
+        "term": term_future.result()
+    }
@@ -0,0 +1,267 @@
+import math
+import re
+from typing import Dict, List, Any, Optional, Tuple
+from config.constants import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_ENUM_VALUES
+
+_CJK_PATTERN = re.compile(r"[　-〿一-鿿＀-￯]")
+_ENUM_START = "ENUM("
+_ENUM_VALUE_PATTERN = re.compile(r"'((?:[^']|'')*)'")
+_ENUM_DESC_PATTERN = re.compile(r" \[(.*)\]'$")
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算文本的token数：中文字符约1个token，其余字符约4个字符1个token
+
+    Args:
+        text: 待估算文本
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+
+def format_ddl_item(item: Dict[str, Any]) -> str:
+    """DDL项在提示词中的格式"""
+    return f"表名: {item['name']}\n{item['content']}"
+
+
+def format_freeshot_item(item: Dict[str, Any]) -> str:
+    """相似查询示例在提示词中的格式"""
+    return f"查询: {item['name']}\nSQL: {item['content']}"
+
+
+def format_term_item(item: Dict[str, Any]) -> str:
+    """术语解释在提示词中的格式"""
+    return f"{item['name']}: {item['content']}"
+
+
+_FORMATTERS = {
+    "ddl": format_ddl_item,
+    "freeshot": format_freeshot_item,
+    "term": format_term_item
+}
+
+
+def _split_ddl(ddl: str) -> Optional[Tuple[str, List[str], str]]:
+    """将DDL拆分为表头、列定义和表尾，格式不符合时返回None"""
+    lines = ddl.split("\n")
+    if len(lines) < 3 or not lines[0].startswith("CREATE TABLE") or not lines[-1].startswith(")"):
+        return None
+    columns = [line[:-1] if line.endswith(",") else line for line in lines[1:-1]]
+    return lines[0], columns, lines[-1]
+
+
+def _join_ddl(header: str, columns: List[str], footer: str) -> str:
+    return header + "\n" + ",\n".join(columns) + "\n" + footer
+
+
+def _find_enum(column: str) -> Optional[Tuple[int, int, str]]:
+    """查找列定义中的ENUM类型，跳过引号内的括号（枚举值可能包含括号，如'付费(会员)'）
+
+    Returns:
+        Optional[Tuple[int, int, str]]: (起始位置, 结束位置, 括号内的枚举值列表)，没有ENUM类型时返回None
+    """
+    start = column.find(_ENUM_START)
+    if start < 0:
+        return None
+    in_quote = False
+    i = start + len(_ENUM_START)
+    while i < len(column):
+        char = column[i]
+        if char == "'":
+            # 引号内两个连续单引号表示转义的单引号
+            if in_quote and column[i + 1:i + 2] == "'":
+                i += 1
+            else:
+                in_quote = not in_quote
+        elif char == ")" and not in_quote:
+            return start, i + 1, column[start + len(_ENUM_START):i]
+        i += 1
+    return None
+
+
+def _trim_enum_column(column: str, max_values: int) -> Tuple[str, int, int]:
+    """保留列定义中前max_values个枚举值及其描述
+
+    Returns:
+        Tuple[str, int, int]: (新的列定义, 原枚举值数量, 保留数量)
+    """
+    enum = _find_enum(column)
+    if enum is None:
+        return column, 0, 0
+    enum_start, enum_end, enum_body = enum
+    values = _ENUM_VALUE_PATTERN.findall(enum_body)
+    max_values = max(1, max_values)
+    if len(values) <= max_values:
+        return column, len(values), len(values)
+
+    kept = values[:max_values]
+    enum_type = "ENUM(" + ", ".join(f"'{value}'" for value in kept) + ")"
+    column = column[:enum_start] + enum_type + column[enum_end:]
+
+    # 同步裁剪注释中的枚举值描述，格式为 "描述 [v1: d1, v2: d2]"
+    desc_match = _ENUM_DESC_PATTERN.search(column)
+    if desc_match:
+        value_alternatives = "|".join(re.escape(value) for value in values)
+        entries = re.split(rf", (?=(?:{value_alternatives}): )", desc_match.group(1))
+        kept_prefixes = tuple(f"{value}: " for value in kept)
+        kept_entries = [entry for entry in entries if entry.startswith(kept_prefixes)]
+        replacement = f" [{', '.join(kept_entries)}]'" if kept_entries else "'"
+        column = column[:desc_match.start()] + replacement
+    return column, len(values), len(kept)
+
+
+def _is_low_value_column(column: str) -> bool:
+    """没有注释的普通列（非主键、非dt分区字段）视为低价值列"""
+    stripped = column.strip()
+    return ("PRIMARY KEY" not in stripped
+            and " COMMENT '" not in stripped
+            and not stripped.startswith("dt "))
+
+
+class _Entry:
+    """待打包的上下文项"""
+
+    def __init__(self, kind: str, position: int, item: Dict[str, Any]):
+        self.kind = kind
+        self.position = position
+        self.item = dict(item)
+        self.dropped = False
+        self.tokens = 0
+        self.refresh()
+
+    @property
+    def relevance(self) -> Tuple[float, int]:
+        # 没有分数的项按原有顺序，越靠前越相关
+        score = self.item.get("score")
+        return (score if score is not None else 0.0, -self.position)
+
+    def refresh(self):
+        self.tokens = estimate_tokens(_FORMATTERS[self.kind](self.item))
+
+
+def pack_context(ddl: List[Dict[str, Any]] = None,
+                 freeshot: List[Dict[str, Any]] = None,
+                 term: List[Dict[str, Any]] = None,
+                 token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 max_enum_values: int = CONTEXT_MAX_ENUM_VALUES) -> Dict[str, Any]:
+    """按相关度将DDL、示例和术语装入token预算
+
+    超出预算时依次：
+    1. 裁剪DDL中过长的枚举值列表（相关度低的表优先）
+    2. 删除DDL中没有注释的普通列（相关度低的表优先）
+    3. 删除相关度最低的示例和术语
+    4. 删除相关度最低的表（至少保留一张）
+
+    Args:
+        ddl: DDL列表，格式为 [{"name": "", "content": "", "score": 0.0}]
+        freeshot: 相似查询示例列表
+        term: 术语解释列表
+        token_budget: token预算
+        max_enum_values: 裁剪时每个ENUM字段保留的枚举值数量
+
+    Returns:
+        Dict[str, Any]: {"ddl": [...], "freeshot": [...], "term": [...], "tokens": 估算token数,
+            "dropped": [{"type": "ddl", "name": "", "action": "trim_enum|drop_column|drop", "detail": ""}]}
+    """
+    entries = {
+        kind: [_Entry(kind, position, item) for position, item in enumerate(items or [])]
+        for kind, items in (("ddl", ddl), ("freeshot", freeshot), ("term", term))
+    }
+    dropped = []
+
+    def total_tokens():
+        return sum(entry.tokens for kind_entries in entries.values() for entry in kind_entries if not entry.dropped)
+
+    def result():
+        packed = {kind: [entry.item for entry in kind_entries if not entry.dropped]
+                  for kind, kind_entries in entries.items()}
+        packed["tokens"] = total_tokens()
+        packed["dropped"] = dropped
+        return packed
+
+    if total_tokens() <= token_budget:
+        return result()
+
+    ddl_by_relevance = sorted(entries["ddl"], key=lambda entry: entry.relevance)
+
+    # 1. 裁剪枚举值列表
+    for entry in ddl_by_relevance:
+        parts = _split_ddl(entry.item["content"])
+        if not parts:
+            continue
+        header, columns, footer = parts
+        changed = False
+        for i, column in enumerate(columns):
+            new_column, original_count, kept_count = _trim_enum_column(column, max_enum_values)
+            if kept_count < original_count:
+                columns[i] = new_column
+                changed = True
+                dropped.append({
+                    "type": "ddl",
+                    "name": entry.item.get("table_name") or entry.item["name"],
+                    "action": "trim_enum",
+                    "detail": f"{column.split()[0]}: 保留 {kept_count}/{original_count} 个枚举值"
+                })
+        if changed:
+            entry.item["content"] = _join_ddl(header, columns, footer)
+            entry.refresh()
+            if total_tokens() <= token_budget:
+                return result()
+
+    # 2. 删除低价值列
+    for entry in ddl_by_relevance:
+        parts = _split_ddl(entry.item["content"])
+        if not parts:
+            continue
+        header, columns, footer = parts
+        kept_columns = [column for column in columns if not _is_low_value_column(column)]
+        if kept_columns and len(kept_columns) < len(columns):
+            for column in columns:
+                if _is_low_value_column(column):
+                    dropped.append({
+                        "type": "ddl",
+                        "name": entry.item.get("table_name") or entry.item["name"],
+                        "action": "drop_column",
+                        "detail": column.split()[0]
+                    })
+            entry.item["content"] = _join_ddl(header, kept_columns, footer)
+            entry.refresh()
+            if total_tokens() <= token_budget:
+                return result()
+
+    # 3. 删除相关度最低的示例和术语
+    for entry in sorted(entries["freeshot"] + entries["term"], key=lambda entry: entry.relevance):
+        entry.dropped = True
+        dropped.append({"type": entry.kind, "name": entry.item["name"], "action": "drop", "detail": ""})
+        if total_tokens() <= token_budget:
+            return result()
+
+    # 4. 删除相关度最低的表，至少保留一张
+    for entry in ddl_by_relevance[:-1]:
+        entry.dropped = True
+        dropped.append({
+            "type": "ddl",
+            "name": entry.item.get("table_name") or entry.item["name"],
+            "action": "drop",
+            "detail": ""
+        })
+        if total_tokens() <= token_budget:
+            break
+
+    return result()
+
+
+def format_pack_report(packed: Dict[str, Any]) -> str:
+    """将裁剪记录格式化为日志文本"""
+    lines = [f"估算token数: {packed['tokens']}"]
+    for item in packed["dropped"]:
+        line = f"[{item['type']}] {item['name']} {item['action']}"
+        if item["detail"]:
+            line += f" ({item['detail']})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -1,14 +1,34 @@
 import sqlite3
 import os
+import re
 from typing import List, Dict, Any, Union, Tuple, Optional
 from config.constants import METADATA_DB_PATH, DATA_DB_PATH
+from services.tracing import span
 
 class DatabaseError(Exception):
     """Custom exception for database operations"""
     pass
 
 
-def execute_query(db: str, sql: str, params: Optional[Union[Tuple, List, Dict]] = None, fetch_all: bool = True) -> Union[List[Dict[str, Any]], Dict[str, Any], int]:
+# SQL开头的空白和注释
+_LEADING_COMMENTS = re.compile(r"^(\s+|--[^\n]*(\n|$)|/\*.*?\*/)*", re.S)
+
+
+def is_select_sql(sql: str) -> bool:
+    """
+    Check whether a statement is a query (starts with SELECT or WITH, ignoring leading comments)
+
+    WITH can also prefix INSERT/UPDATE/DELETE, so callers that must not write should
+    additionally run the statement with execute_query(..., read_only=True)
+    """
+    if not isinstance(sql, str):
+        return False
+    head = _LEADING_COMMENTS.sub("", sql, count=1)
+    return re.match(r"(SELECT|WITH)\b", head, re.I) is not None
+
+
+def execute_query(db: str, sql: str, params: Optional[Union[Tuple, List, Dict]] = None, fetch_all: bool = True,
+                  read_only: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any], int]:
     """
     Execute a SQL query on the specified database and return the results
     
@@ -17,6 +37,7 @@ def execute_query(db: str, sql: str, params: Optional[Union[Tuple, List, Dict]]
         sql (str): SQL query to execute
         params (Optional[Union[Tuple, List, Dict]]): Parameters for the SQL query
         fetch_all (bool): Whether to fetch all results or just one row
+        read_only (bool): Reject any statement that would modify the database (PRAGMA query_only)
     
     Returns:
         Union[List[Dict[str, Any]], Dict[str, Any], int]: Query results as a list of dictionaries,
@@ -25,66 +46,69 @@ def execute_query(db: str, sql: str, params: Optional[Union[Tuple, List, Dict]]
     Raises:
         DatabaseError: If there's an error connecting to the database or executing the query
     """
-    # Determine which database file to use
-    if db.lower() == 'data':
-        db_file = DATA_DB_PATH
-    elif db.lower() == 'metadata':
-        db_file = METADATA_DB_PATH
-    else:
-        raise DatabaseError(f"Unknown database: {db}. Use 'data' or 'metadata'.")
-    
-    # Check if the database file exists
-    if not os.path.exists(db_file):
-        raise DatabaseError(f"Database file not found: {db_file}")
-    
-    # Initialize connection and cursor
-    conn = None
-    cursor = None
-    
-    try:
-        # Connect to the database
-        conn = sqlite3.connect(db_file)
-        # Enable dictionary cursor
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Execute the query
-        if params is not None:
-            cursor.execute(sql, params)
+    with span("db.query", "chatbi_db_query_duration_seconds", db=db.lower()):
+        # Determine which database file to use
+        if db.lower() == 'data':
+            db_file = DATA_DB_PATH
+        elif db.lower() == 'metadata':
+            db_file = METADATA_DB_PATH
         else:
-            cursor.execute(sql)
+            raise DatabaseError(f"Unknown database: {db}. Use 'data' or 'metadata'.")
+        
+        # Check if the database file exists
+        if not os.path.exists(db_file):
+            raise DatabaseError(f"Database file not found: {db_file}")
+        
+        # Initialize connection and cursor
+        conn = None
+        cursor = None
         
-        # Determine the type of query
-        if sql.strip().upper().startswith(('SELECT', 'PRAGMA', 'WITH')):
-            # For SELECT queries, return the results
-            if fetch_all:
-                rows = cursor.fetchall()
-                # Convert rows to dictionaries
-                result = [{k: row[k] for k in row.keys()} for row in rows]
-                return result
+        try:
+            # Connect to the database
+            conn = sqlite3.connect(db_file)
+            # Enable dictionary cursor
+            conn.row_factory = sqlite3.Row
+            if read_only:
+                conn.execute("PRAGMA query_only = ON")
+            cursor = conn.cursor()
+            
+            # Execute the query
+            if params is not None:
+                cursor.execute(sql, params)
             else:
-                row = cursor.fetchone()
-                if row:
-                    # Convert row to dictionary
-                    return {k: row[k] for k in row.keys()}
-                return {}
-        else:
-            # For INSERT, UPDATE, DELETE queries, commit changes and return affected rows
-            conn.commit()
-            return cursor.rowcount
-    
-    except sqlite3.Error as e:
-        # Rollback transaction if an error occurred
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Database error: {str(e)}")
-    
-    finally:
-        # Close cursor and connection
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+                cursor.execute(sql)
+            
+            # Determine the type of query
+            if sql.strip().upper().startswith(('SELECT', 'PRAGMA', 'WITH')):
+                # For SELECT queries, return the results
+                if fetch_all:
+                    rows = cursor.fetchall()
+                    # Convert rows to dictionaries
+                    result = [{k: row[k] for k in row.keys()} for row in rows]
+                    return result
+                else:
+                    row = cursor.fetchone()
+                    if row:
+                        # Convert row to dictionary
+                        return {k: row[k] for k in row.keys()}
+                    return {}
+            else:
+                # For INSERT, UPDATE, DELETE queries, commit changes and return affected rows
+                conn.commit()
+                return cursor.rowcount
+        
+        except sqlite3.Error as e:
+            # Rollback transaction if an error occurred
+            if conn:
+                conn.rollback()
+            raise DatabaseError(f"Database error: {str(e)}")
+        
+        finally:
+            # Close cursor and connection
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
 
 
 def execute_script(db: str, sql_script: str) -> bool:
@@ -101,42 +125,43 @@ def execute_script(db: str, sql_script: str) -> bool:
     Raises:
         DatabaseError: If there's an error connecting to the database or executing the script
     """
-    # Determine which database file to use
-    if db.lower() == 'data':
-        db_file = DATA_DB_PATH
-    elif db.lower() == 'metadata':
-        db_file = METADATA_DB_PATH
-    else:
-        raise DatabaseError(f"Unknown database: {db}. Use 'data' or 'metadata'.")
-    
-    # Check if the database file exists
-    if not os.path.exists(db_file):
-        raise DatabaseError(f"Database file not found: {db_file}")
-    
-    # Initialize connection
-    conn = None
-    
-    try:
-        # Connect to the database
-        conn = sqlite3.connect(db_file)
+    with span("db.script", "chatbi_db_query_duration_seconds", db=db.lower()):
+        # Determine which database file to use
+        if db.lower() == 'data':
+            db_file = DATA_DB_PATH
+        elif db.lower() == 'metadata':
+            db_file = METADATA_DB_PATH
+        else:
+            raise DatabaseError(f"Unknown database: {db}. Use 'data' or 'metadata'.")
         
-        # Execute the script
-        conn.executescript(sql_script)
+        # Check if the database file exists
+        if not os.path.exists(db_file):
+            raise DatabaseError(f"Database file not found: {db_file}")
         
-        # Commit changes
-        conn.commit()
-        return True
-    
-    except sqlite3.Error as e:
-        # Rollback transaction if an error occurred
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Database error: {str(e)}")
-    
-    finally:
-        # Close connection
-        if conn:
-            conn.close()
+        # Initialize connection
+        conn = None
+        
+        try:
+            # Connect to the database
+            conn = sqlite3.connect(db_file)
+            
+            # Execute the script
+            conn.executescript(sql_script)
+            
+            # Commit changes
+            conn.commit()
+            return True
+        
+        except sqlite3.Error as e:
+            # Rollback transaction if an error occurred
+            if conn:
+                conn.rollback()
+            raise DatabaseError(f"Database error: {str(e)}")
+        
+        finally:
+            # Close connection
+            if conn:
+                conn.close()
 
 
 def get_tables(db: str) -> List[str]:
@@ -1,147 +1,207 @@
+from functools import lru_cache
 from services.logger import broadcast_log
+from services.tracing import traced
+
+# 单条查询中绑定的表数量上限，避免超过SQLite的参数个数限制（每张表2个参数）
+_TABLE_LOOKUP_BATCH_SIZE = 400
+
+# 表类型说明
+_TABLE_TYPE_DESCRIPTIONS = {
+    "fact": "行为实时表，dt字段代表行为发生的日期",
+    "dim": "维度表，一般不会发生变化",
+    "dim_dt": "有日期分区的维度表，dt代表当日更新了全量的维度信息"
+}
+
+
+def _fetch_table_key_columns(table_keys):
+    """
+    批量查询表ID及其主键字段和dt字段，每批只执行一次SQL
+
+    Args:
+        table_keys (list): (db_id, table_name) 元组列表
+
+    Returns:
+        dict: {(db_id, table_name): [列信息字典, ...]}，不存在的表不会出现在结果中
+    """
+    from services.db_service import execute_query
+
+    result = {}
+    for start in range(0, len(table_keys), _TABLE_LOOKUP_BATCH_SIZE):
+        batch = table_keys[start:start + _TABLE_LOOKUP_BATCH_SIZE]
+        values_clause = ", ".join(["(?, ?)"] * len(batch))
+        params = [value for key in batch for value in key]
+        rows = execute_query('metadata', f"""
+            WITH requested(db_id, name) AS (VALUES {values_clause})
+            SELECT t.db_id, t.name AS table_name, c.name, c.type, c.is_primary, c.description
+            FROM requested r
+            JOIN tables_view t ON t.db_id = r.db_id AND t.name = r.name
+            LEFT JOIN columns_view c ON c.table_id = t.id AND (c.is_primary OR c.name = 'dt')
+            ORDER BY t.id, (SELECT rowid FROM columns WHERE columns.id = c.id)
+        """, params)
+        for row in rows:
+            key_columns = result.setdefault((row["db_id"], row["table_name"]), [])
+            if row["name"] is not None:
+                key_columns.append(row)
+    return result
+
+
+@lru_cache(maxsize=4096)
+def _column_definition(col_name, col_type, col_desc, col_is_primary, enum_values):
+    """
+    生成单个列定义片段，相同的列定义直接复用缓存结果
+
+    Args:
+        col_name (str): 列名
+        col_type (str): 列类型
+        col_desc (str): 列描述
+        col_is_primary (bool): 是否主键
+        enum_values (tuple): ENUM值及其描述，格式为 ((value, desc), ...)
+
+    Returns:
+        str: 列定义，如 "    status ENUM('a', 'b') COMMENT '状态 [a: 描述]'"
+    """
+    # 处理ENUM类型
+    if col_type == "ENUM":
+        if enum_values:
+            values = [f"'{value}'" for value, _ in enum_values]
+            col_type = f"ENUM({', '.join(values)})"
+        else:
+            col_type = "VARCHAR(50)"  # 如果没有提供枚举值，使用VARCHAR作为默认
+
+        # 添加每个ENUM值的描述到列描述中
+        if enum_values and col_desc:
+            enum_descriptions = [f"{value}: {desc}" for value, desc in enum_values if desc]
+            if enum_descriptions:
+                col_desc += f" [{', '.join(enum_descriptions)}]"
+
+    parts = [f"    {col_name} {col_type}"]
+
+    # 添加主键标识
+    if col_is_primary:
+        parts.append(" PRIMARY KEY")
+
+    # 添加注释，转义单引号，避免SQL语法错误
+    if col_desc:
+        col_desc = col_desc.replace("'", "''")
+        parts.append(f" COMMENT '{col_desc}'")
+
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def _table_comment(table_desc, table_type):
+    """
+    生成表注释片段，包含表描述和表类型信息
+
+    Returns:
+        str: 如 " COMMENT = '视频表 | 类型: dim (维度表，一般不会发生变化)'"，无注释时为空字符串
+    """
+    comment_parts = []
+    if table_desc:
+        comment_parts.append(table_desc)
+
+    type_desc = _TABLE_TYPE_DESCRIPTIONS.get(table_type, "")
+    if type_desc:
+        comment_parts.append(f"类型: {table_type} ({type_desc})")
+
+    if not comment_parts:
+        return ""
+    # 转义单引号，避免SQL语法错误
+    full_comment = " | ".join(comment_parts).replace("'", "''")
+    return f" COMMENT = '{full_comment}'"
+
+
+@traced("ddl.generate", "chatbi_stage_duration_seconds", stage="ddl_generate")
 def generate_ddl_from_schema(schema_data):
     """
     从API请求中的schema数据生成CREATE TABLE DDL语句，包含列描述和ENUM值描述作为注释
-    同时从数据库中获取主键字段和dt字段（如果存在）
+    同时从数据库中获取主键字段和dt字段（如果存在），所有表只需一次批量查询
     
     Args:
         schema_data (dict): 包含数据库和表结构信息的字典
     
     Returns:
-        list: 包含表名和DDL语句的字典列表，格式为 [{"table_name": "", "table_desc": "", "ddl":""}]
+        list: 包含表名和DDL语句的字典列表，格式为 [{"table_name": "", "table_desc": "", "ddl":"", "score": None}]，
+            score为前端传入的向量召回分数（没有则为None）
     """
-    from services.db_service import execute_query
-    
+    requested_tables = [
+        (db.get("id"), table)
+        for db in schema_data.get("schema", [])
+        for table in db.get("tables", [])
+    ]
+    if not requested_tables:
+        return []
+
+    table_keys = list(dict.fromkeys((db_id, table.get("table")) for db_id, table in requested_tables))
+    key_columns_by_table = _fetch_table_key_columns(table_keys)
+
     result = []
-    
-    for db in schema_data.get("schema", []):
-        db_id = db.get("id")
-        for table in db.get("tables", []):
-            table_name = table.get("table")
-            table_desc = table.get("description", "")
-            table_type = table.get("type", "")
-            columns = table.get("columns", [])
-            
-            # 获取表的ID
-            table_rows = execute_query('metadata', 'SELECT id FROM tables_view WHERE db_id = ? AND name = ?', (db_id, table_name))
-            if not table_rows:
+    for db_id, table in requested_tables:
+        table_name = table.get("table")
+        table_desc = table.get("description", "")
+        table_type = table.get("type", "")
+        columns = table.get("columns", [])
+
+        # 表不存在则跳过
+        db_columns = key_columns_by_table.get((db_id, table_name))
+        if db_columns is None:
+            continue
+
+        # 创建一个集合来存储schema_data中已有的列名
+        existing_column_names = {col.get("column") for col in columns}
+
+        # 查找主键字段和dt字段
+        primary_key_columns = []
+        dt_column = None
+        for col_row in db_columns:
+            col_name = col_row["name"]
+            if col_name in existing_column_names:
                 continue
-            table_id = table_rows[0]['id']
-            
-            # 获取表的所有列，包括主键和dt字段
-            db_columns = execute_query('metadata', 'SELECT id, name, type, is_primary, description FROM columns_view WHERE table_id = ?', (table_id,))
-            
-            # 创建一个集合来存储schema_data中已有的列名
-            existing_column_names = {col.get("column") for col in columns}
-            
-            # 查找主键字段和dt字段
-            primary_key_columns = []
-            dt_column = None
-            for col_row in db_columns:
-                col_name = col_row["name"]
-                is_primary = col_row["is_primary"]
-                
-                # 如果是主键且不在现有列中，添加到主键列表
-                if is_primary and col_name not in existing_column_names:
-                    primary_key_columns.append({
-                        "column": col_name,
-                        "type": col_row['type'],
-                        "description": col_row['description'] or "",
-                        "is_primary": True
-                    })
-                
-                # 如果是dt字段且不在现有列中，记录下来
-                if col_name == "dt" and col_name not in existing_column_names:
-                    dt_column = {
-                        "column": "dt",
-                        "type": col_row['type'],
-                        "description": col_row['description'] or "日期分区字段",
-                        "is_primary": False
-                    }
-            
-            # 将主键和dt字段添加到columns列表中
-            if primary_key_columns:
-                columns = primary_key_columns + columns
-            if dt_column:
-                columns.append(dt_column)
-            
-            # 开始构建CREATE TABLE语句
-            ddl = f"CREATE TABLE {table_name} (\n"
-            
-            # 添加列定义
-            column_definitions = []
-            for col in columns:
-                col_name = col.get("column")
-                col_type = col.get("type")
-                col_desc = col.get("description", "")
-                col_is_primary = col.get("is_primary", False)
-
-                
-                # 处理ENUM类型
-                if col_type == "ENUM":
-                    values = [f"'{val['value']}'" for val in col.get("values", [])]
-                    if values:
-                        col_type = f"ENUM({', '.join(values)})"
-                    else:
-                        col_type = "VARCHAR(50)"  # 如果没有提供枚举值，使用VARCHAR作为默认
-                    
-                    # 处理ENUM值的描述
-                    enum_values = col.get("values", [])
-                    if enum_values and col_desc:
-                        # 添加每个ENUM值的描述到列描述中
-                        enum_descriptions = []
-                        for val in enum_values:
-                            if val.get("desc"):
-                                enum_descriptions.append(f"{val['value']}: {val['desc']}")
-                        
-                        if enum_descriptions:
-                            col_desc += f" [{', '.join(enum_descriptions)}]"
-                
-                # 添加列定义、主键标识和注释
-                column_def = f"    {col_name} {col_type}"
-                
-                # 添加主键标识
-                if col_is_primary:
-                    column_def += " PRIMARY KEY"
-                    
-                # 添加注释
-                if col_desc:
-                    # 转义单引号，避免SQL语法错误
-                    col_desc = col_desc.replace("'", "''")
-                    column_def += f" COMMENT '{col_desc}'"
-                    
-                column_definitions.append(column_def)
-            
-            ddl += ",\n".join(column_definitions)
-            
-            # 添加表注释
-            ddl += "\n)"
-            
-            # 构建表注释，包含表类型信息
-            comment_parts = []
-            if table_desc:
-                comment_parts.append(table_desc)
-            
-            if table_type:
-                type_desc = ""
-                if table_type == "fact":
-                    type_desc = "行为实时表，dt字段代表行为发生的日期"
-                elif table_type == "dim":
-                    type_desc = "维度表，一般不会发生变化"
-                elif table_type == "dim_dt":
-                    type_desc = "有日期分区的维度表，dt代表当日更新了全量的维度信息"
-                
-                if type_desc:
-                    comment_parts.append(f"类型: {table_type} ({type_desc})")
-            
-            if comment_parts:
-                # 转义单引号，避免SQL语法错误
-                full_comment = " | ".join(comment_parts).replace("'", "''")
-                ddl += f" COMMENT = '{full_comment}'"
-            
-            ddl += ";"
-            
-            result.append({"table_name": table_name, "table_desc": table_desc, "ddl": ddl})
+
+            # 如果是主键且不在现有列中，添加到主键列表
+            if col_row["is_primary"]:
+                primary_key_columns.append({
+                    "column": col_name,
+                    "type": col_row['type'],
+                    "description": col_row['description'] or "",
+                    "is_primary": True
+                })
+
+            # 如果是dt字段且不在现有列中，记录下来
+            if col_name == "dt":
+                dt_column = {
+                    "column": "dt",
+                    "type": col_row['type'],
+                    "description": col_row['description'] or "日期分区字段",
+                    "is_primary": False
+                }
+
+        # 将主键和dt字段添加到columns列表中
+        columns = primary_key_columns + columns
+        if dt_column:
+            columns = columns + [dt_column]
+
+        # 添加列定义
+        column_definitions = [
+            _column_definition(
+                col.get("column"),
+                col.get("type"),
+                col.get("description", ""),
+                bool(col.get("is_primary", False)),
+                tuple((val['value'], val.get("desc") or "") for val in col.get("values", []))
+            )
+            for col in columns
+        ]
+
+        ddl = "".join([
+            f"CREATE TABLE {table_name} (\n",
+            ",\n".join(column_definitions),
+            "\n)",
+            _table_comment(table_desc, table_type),
+            ";"
+        ])
+
+        result.append({"table_name": table_name, "table_desc": table_desc, "ddl": ddl, "score": table.get("score")})
     
     return result
 
@@ -169,7 +229,8 @@ def generate_ddl_metadata_from_schema(schema_data):
         metadata_list.append({
             "table_name": item["table_name"],
             "name": item["table_desc"],
-            "content": item["ddl"]
+            "content": item["ddl"],
+            "score": item.get("score")
         })
         ddls_content += item["ddl"] + "\n"
     broadcast_log("system", ddls_content, "已将元数据解析为DDL")
@@ -1,18 +1,21 @@
 import json
 import traceback
 from typing import Dict, List, Any, Optional, Union
-from services.logger import broadcast_log,broadcast_stream_log
+from services.logger import broadcast_log,broadcast_stream_log,end_stream_log
 from services.llm_service import get_client
 from services.llm_config import get_model
 from services.prompt_manager import PromptManager
+from services.context_packer import pack_context, format_pack_report
 from services.tool_registry import ToolRegistry
+from services.tool_executor import execute_tool_calls
+from services.stream_assembler import StreamAssembler
 from services.sql_tools import SQLTools
 
 
 class FeedbackAgent:
     """处理用户反馈的智能体，根据用户点赞和历史对话更新元数据描述"""
     
-    def __init__(self, ddl: List = None, freeshot: List = None, term: List = None, messages: List = None):
+    def __init__(self, ddl: List = None, freeshot: List = None, term: List = None, messages: List = None, system_prompt: str = None):
         """初始化FeedbackAgent
         
         Args:
@@ -20,10 +23,12 @@ class FeedbackAgent:
             freeshot: 相似查询示例
             term: 术语解释
             messages: 历史对话消息
+            system_prompt: 已构建的系统提示词（来自会话缓存），提供时不再裁剪元数据和构建提示词
         """
         self.ddl = ddl or []
         self.freeshot = freeshot or []
         self.term = term or []
+        self.system_prompt = system_prompt
         self.messages = messages or []
         
         # 初始化系统消息
@@ -32,6 +37,18 @@ class FeedbackAgent:
     def _init_messages(self):
         """初始化消息列表，添加系统提示和历史消息"""
 
+        if self.system_prompt:
+            # 会话缓存的提示词可能是几天前构建的，刷新其中的当前日期和时间
+            self.system_prompt = PromptManager.refresh_time_info(self.system_prompt)
+            self.messages.insert(0, {"role": "system", "content": self.system_prompt})
+            return
+
+        # 按token预算和相关度裁剪元数据
+        packed = pack_context(self.ddl, self.freeshot, self.term)
+        self.ddl, self.freeshot, self.term = packed["ddl"], packed["freeshot"], packed["term"]
+        if packed["dropped"]:
+            broadcast_log("ai", format_pack_report(packed), "FeedbackAgent-元数据超出预算，已裁剪")
+
         # 添加元数据信息（ddl、freeshot、term）
         metadata_parts = []
         
@@ -69,6 +86,8 @@ class FeedbackAgent:
         system_content = PromptManager.build_feedback_agent_prompt(metadata_content)
         broadcast_log("ai", "", "FeedbackAgent-构建Agent角色提示词")
         
+        self.system_prompt = system_content
+        
         # 添加系统提示
         self.messages.insert(0, {
             "role": "system",
@@ -103,6 +122,56 @@ class FeedbackAgent:
             
         self.messages.append(message)
     
+    def _run_tool_call(self, tool_call, current_turn: int) -> Optional[Dict]:
+        """执行单个工具调用，不修改消息列表
+        
+        Args:
+            tool_call: 模型返回的工具调用
+            current_turn: 当前轮次
+            
+        Returns:
+            Optional[Dict]: {"name": 函数名称, "result": 返回内容, "update": 成功时的更新记录或None}，未知工具返回None
+        """
+        function_name = tool_call.function.name
+        function_args = json.loads(tool_call.function.arguments)
+        
+        # 执行函数
+        if function_name == "tool_update_metadata_description":
+            table_name = function_args.get("table_name", "")
+            column_name = function_args.get("column_name", "")
+            enum_value = function_args.get("enum_value", "")
+            description = function_args.get("description", "")
+            result = SQLTools.tool_update_metadata_description(table_name, column_name, enum_value, description)
+            broadcast_log("ai", result, f"FeedbackAgent-R{current_turn}:已更新表信息")
+            update = {
+                "table_name": table_name,
+                "column_name": column_name,
+                "enum_value": enum_value,
+                "description": description
+            }
+        elif function_name == "tool_update_business_term":
+            term_type = function_args.get("term_type", "")
+            term_name = function_args.get("term_name", "")
+            result = SQLTools.tool_update_business_term(term_type, term_name)
+            broadcast_log("ai", result, f"FeedbackAgent-R{current_turn}:已更新{term_type}点赞数")
+            update = {
+                "term_type": term_type,
+                "term_name": term_name
+            }
+        else:
+            return None
+        
+        # 记录更新结果
+        try:
+            result_json = json.loads(result)
+            if result_json.get("success"):
+                update["message"] = result_json.get("message")
+            else:
+                update = None
+        except:
+            update = None
+        return {"name": function_name, "result": result, "update": update}
+    
     def process_feedback(self) -> Dict:
         """处理用户点赞反馈，分析历史对话并更新元数据描述
         
@@ -135,124 +204,42 @@ class FeedbackAgent:
                     stream=True
                 )
                 
-                # 用于累积完整响应的变量
-                collected_message = None
-                collected_content = ""
+                # 用于累积完整响应的组装器
+                assembler = StreamAssembler()
                 
                 # 处理流式响应
                 for chunk in stream:
-                    delta = chunk.choices[0].delta
-                    
-                    # 如果是第一个包含消息的块，初始化message对象
-                    if not collected_message and hasattr(delta, 'role'):
-                        collected_message = delta
-                    
-                    # 累积内容
-                    if hasattr(delta, 'content') and delta.content:
-                        collected_content += delta.content
+                    content = assembler.feed(chunk)
+                    if content:
                         # 实时广播每个token（使用流式日志）
-                        broadcast_stream_log("ai", delta.content, f"FeedbackAgent-R{current_turn}:流式输出", is_first=(len(collected_content) == len(delta.content)))
-                    
-                    # 处理工具调用
-                    try:
-                        if hasattr(delta, 'tool_calls') and delta.tool_calls and hasattr(delta.tool_calls, '__iter__'):
-                            # 确保collected_message有tool_calls属性
-                            if not hasattr(collected_message, 'tool_calls'):
-                                collected_message.tool_calls = []
-                            
-                            for tool_call in delta.tool_calls:
-                                # 确保collected_message.tool_calls不为None
-                                if collected_message.tool_calls is None:
-                                    collected_message.tool_calls = []
-                                
-                                # 查找或创建对应的工具调用
-                                existing_call = next((t for t in collected_message.tool_calls if t.index == tool_call.index), None)
-                                if not existing_call:
-                                    collected_message.tool_calls.append(tool_call)
-                                else:
-                                    # 更新现有工具调用
-                                    if hasattr(tool_call, 'function'):
-                                        if not hasattr(existing_call, 'function'):
-                                            existing_call.function = tool_call.function
-                                        else:
-                                            if hasattr(tool_call.function, 'name') and tool_call.function.name:
-                                                existing_call.function.name = tool_call.function.name
-                                            if hasattr(tool_call.function, 'arguments'):
-                                                if not hasattr(existing_call.function, 'arguments'):
-                                                    existing_call.function.arguments = tool_call.function.arguments
-                                                else:
-                                                    existing_call.function.arguments += tool_call.function.arguments
-                    except Exception as e:
-                        # 打印完整的堆栈跟踪
-                        print(f"Error processing tool calls: {str(e)}")
-                        traceback.print_exc()
+                        broadcast_stream_log("ai", content, f"FeedbackAgent-R{current_turn}:流式输出", is_first=(assembler.content_length == len(content)))
+                
+                end_stream_log("ai", f"FeedbackAgent-R{current_turn}:流式输出")
                 
                 # 设置最终消息
-                message = collected_message
+                collected_content, tool_calls = assembler.finish()
                 if collected_content:
-                    message.content = collected_content
                     broadcast_log("ai", collected_content, f"FeedbackAgent-R{current_turn}:完整响应")
                 
                 # 检查是否有工具调用
-                if hasattr(message, 'tool_calls') and message.tool_calls:
+                if tool_calls:
                     # 处理工具调用
-                    tool_name = message.tool_calls[0].function.name if hasattr(message.tool_calls[0], 'function') and hasattr(message.tool_calls[0].function, 'name') else ""
-                    tool_args = message.tool_calls[0].function.arguments if hasattr(message.tool_calls[0], 'function') and hasattr(message.tool_calls[0].function, 'arguments') else ""
-                    tool_message = (f"调用工具-{tool_name}-参数-{tool_args}")
+                    tool_message = (f"调用工具-{tool_calls[0].function.name}-参数-{tool_calls[0].function.arguments}")
                     self._add_assistant_message(tool_message)
                     
-                    for tool_call in message.tool_calls:
-                        function_name = tool_call.function.name
-                        function_args = json.loads(tool_call.function.arguments)
-                        
-                        # 执行函数
-                        if function_name == "tool_update_metadata_description":
-                            table_name = function_args.get("table_name", "")
-                            column_name = function_args.get("column_name", "")
-                            enum_value = function_args.get("enum_value", "")
-                            description = function_args.get("description", "")
-                            result = SQLTools.tool_update_metadata_description(table_name, column_name, enum_value, description)
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, f"FeedbackAgent-R{current_turn}:已更新表信息")
-                            self._add_function_message(function_name, result, tool_call.id)
-                            
-                            # 记录更新结果
-                            try:
-                                result_json = json.loads(result)
-                                if result_json.get("success"):
-                                    update_results.append({
-                                        "table_name": table_name,
-                                        "column_name": column_name,
-                                        "enum_value": enum_value,
-                                        "description": description,
-                                        "message": result_json.get("message")
-                                    })
-                            except:
-                                pass
-                        elif function_name == "tool_update_business_term":
-                            term_type = function_args.get("term_type", "")
-                            term_name = function_args.get("term_name", "")
-                            result = SQLTools.tool_update_business_term(term_type, term_name)
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, f"FeedbackAgent-R{current_turn}:已更新{term_type}点赞数")
-                            self._add_function_message(function_name, result, tool_call.id)
-                            
-                            # 记录更新结果
-                            try:
-                                result_json = json.loads(result)
-                                if result_json.get("success"):
-                                    update_results.append({
-                                        "term_type": term_type,
-                                        "term_name": term_name,
-                                        "message": result_json.get("message")
-                                    })
-                            except:
-                                pass
+                    outcomes = execute_tool_calls(tool_calls, lambda tool_call: self._run_tool_call(tool_call, current_turn))
+                    for tool_call, outcome in zip(tool_calls, outcomes):
+                        if outcome is None:
+                            continue
+                        # 添加函数结果消息
+                        self._add_function_message(outcome["name"], outcome["result"], tool_call.id)
+                        if outcome["update"]:
+                            update_results.append(outcome["update"])
                         
                 else:
                     # 没有工具调用，处理完成
-                    broadcast_log("ai", message.content, "FeedbackAgent-分析完成")
-                    final_response = message.content
+                    final_response = collected_content or None
+                    broadcast_log("ai", final_response, "FeedbackAgent-分析完成")
                     self._add_assistant_message(final_response)
                     break
             
@@ -2,6 +2,7 @@ import json
 from typing import Dict, List, Any, Optional, Union
 from services.logger import broadcast_log
 from services.feedback_agent import FeedbackAgent, process_feedback_good
+from services.session_store import session_store, SessionNotFoundError
 
 
 def generate_feedback_with_agent(ddl: List = None, freeshot: List = None, term: List = None, messages: List = None) -> Dict:
@@ -18,4 +19,37 @@ def generate_feedback_with_agent(ddl: List = None, freeshot: List = None, term:
         Dict: 包含处理结果的字典
     """
     # 调用FeedbackAgent处理反馈
-    return process_feedback_good(ddl, freeshot, term, messages)
\ No newline at end of file
+    return process_feedback_good(ddl, freeshot, term, messages)
+
+
+def generate_feedback_in_session(conversation_id: str, metadata: Dict = None) -> Dict:
+    """
+    使用服务端会话中的历史对话和元数据处理用户点赞反馈
+    
+    Args:
+        conversation_id: 会话ID
+        metadata: 元数据，未变化时可不传
+        
+    Returns:
+        Dict: 包含处理结果的字典
+
+    Raises:
+        SessionNotFoundError: 会话不存在或已过期
+    """
+    session = session_store.get(conversation_id)
+    if session is None:
+        raise SessionNotFoundError(conversation_id)
+
+    with session.lock:
+        if metadata is not None:
+            session.set_metadata(metadata)
+        # 只传入用户和助手的文本消息，工具结果属于SQLAgent的推理过程
+        history = [message for message in session.messages if message.get("role") in ("user", "assistant")]
+        agent = FeedbackAgent(
+            session.metadata["ddl"], session.metadata["freeshot"], session.metadata["term"],
+            history, system_prompt=session.system_prompts.get("feedback")
+        )
+        session.system_prompts["feedback"] = agent.system_prompt
+        session_store.save(session)
+
+    return agent.process_feedback()
@@ -1,30 +1,24 @@
-import sqlite3
 from services.logger import broadcast_log
-from config.constants import METADATA_DB_PATH
+from services.retriever import freeshot_index
+from services.tracing import traced
+from config.constants import FREESHOT_TOP_K
 
+@traced("freeshot.retrieve", "chatbi_stage_duration_seconds", stage="freeshot")
 def generate_freeshot_metadata_from_schema(schema_data):
     """
-    从数据库中获取自由查询示例数据
-    返回格式：[{"name": "今天的播放量", "content":"SELECT COUNT(*) FROM video_play_logs WHERE date(created_at) = CURRENT_DATE"}]
+    根据用户问题从freeshots表中召回相关的查询示例，按相关度与点赞数排序
+    返回格式：[{"name": "今天的播放量", "content":"SELECT COUNT(*) FROM video_play_logs WHERE date(created_at) = CURRENT_DATE", "score": 1.0}]
     """
     broadcast_log("system", "", "根据用户问题召回相关示例")
     
     try:
-        conn = sqlite3.connect(METADATA_DB_PATH)
-        cursor = conn.cursor()
-        
-        # 查询freeshots表，按likes降序排列
-        cursor.execute('SELECT name, content FROM freeshots ORDER BY likes DESC')
-        rows = cursor.fetchall()
-        
-        conn.close()
-        
-        # 转换为所需格式
-        return [{"name": row[0], "content": row[1]} for row in rows]
+        query = schema_data.get("query", "") if schema_data else ""
+        top_k = (schema_data or {}).get("top_k", FREESHOT_TOP_K)
+        return freeshot_index.search(query, top_k)
     except Exception as e:
         print(f"Error fetching freeshot data: {e}")
         # 如果出错，返回默认数据
         return [
             {"name": "今天的播放量", "content":"SELECT COUNT(*) FROM video_play_logs WHERE dt='2023-05-19'"},
             {"name": "最近一周的播放量", "content":"SELECT COUNT(*) FROM video_play_logs WHERE dt>='2023-05-12' and dt<='2023-05-19'"}
-        ]
\ No newline at end of file
+        ]
@@ -0,0 +1,138 @@
+import json
+import re
+from typing import Dict, List, Any, Optional, Tuple
+from services.context_packer import estimate_tokens
+from config.constants import HISTORY_COMPACT_TOKEN_THRESHOLD
+
+# 压缩后的工具结果以此开头，避免重复压缩
+COMPACTED_PREFIX = "[已压缩]"
+# 错误信息和未知工具结果保留的字符数
+_DIGEST_LENGTH = 200
+# 摘要中最多列出的列名/表名数量
+_MAX_LISTED_NAMES = 30
+
+_DDL_HEADER_PATTERN = re.compile(r"CREATE TABLE (\S+) \(")
+
+
+def _digest(text: str) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= _DIGEST_LENGTH else text[:_DIGEST_LENGTH] + "..."
+
+
+def _join_names(names: List[str]) -> str:
+    listed = ", ".join(names[:_MAX_LISTED_NAMES])
+    if len(names) > _MAX_LISTED_NAMES:
+        listed += f" 等{len(names)}个"
+    return listed
+
+
+def _summarize_sql_result(content: str) -> str:
+    """SQL执行结果摘要：行数和列名，失败时保留错误信息"""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return f"{COMPACTED_PREFIX} SQL执行结果: {_digest(content)}"
+    if not result.get("success"):
+        return f"{COMPACTED_PREFIX} SQL执行失败: {_digest(result.get('error', ''))}"
+    columns = [column.get("name", "") for column in result.get("columns", [])]
+    return f"{COMPACTED_PREFIX} SQL执行成功，返回{result.get('totalRows', 0)}行，列: {_join_names(columns) or '无'}"
+
+
+def _summarize_table_schema(content: str) -> str:
+    """表结构摘要：表名和列名"""
+    if content.startswith("-- 错误"):
+        return f"{COMPACTED_PREFIX} {_digest(content)}"
+    header = _DDL_HEADER_PATTERN.search(content)
+    lines = content.split("\n")[1:-1]
+    columns = [line.split()[0] for line in lines if line.strip()]
+    table_name = header.group(1) if header else ""
+    return f"{COMPACTED_PREFIX} 表 {table_name} 结构，共{len(columns)}列: {_join_names(columns)}"
+
+
+def _summarize_all_tables(content: str) -> str:
+    """表列表摘要：只保留表名"""
+    if content.startswith("-- 错误"):
+        return f"{COMPACTED_PREFIX} {_digest(content)}"
+    names = [line.split(":", 1)[0] for line in content.split("\n") if line.strip()]
+    return f"{COMPACTED_PREFIX} 共{len(names)}张表: {_join_names(names)}"
+
+
+_SUMMARIZERS = {
+    "tool_execute_sql_and_fetch_top_10": _summarize_sql_result,
+    "tool_get_table_schema": _summarize_table_schema,
+    "tool_get_all_tables": _summarize_all_tables
+}
+
+
+def summarize_tool_result(name: str, content: str) -> str:
+    """将工具调用结果压缩为摘要
+
+    Args:
+        name: 工具名称
+        content: 工具返回内容
+
+    Returns:
+        str: 以COMPACTED_PREFIX开头的摘要
+    """
+    summarizer = _SUMMARIZERS.get(name)
+    if summarizer:
+        return summarizer(content or "")
+    return f"{COMPACTED_PREFIX} {_digest(content)}"
+
+
+def _message_tokens(message: Dict[str, Any]) -> int:
+    content = message.get("content")
+    return estimate_tokens(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+
+
+def latest_tool_round_start(messages: List[Dict[str, Any]]) -> int:
+    """最后一条助手消息（最近一次工具调用）的位置，没有时为消息数"""
+    return next(
+        (i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "assistant"),
+        len(messages)
+    )
+
+
+def compact_history(messages: List[Dict[str, Any]],
+                    token_threshold: int = HISTORY_COMPACT_TOKEN_THRESHOLD,
+                    protect_from: Optional[int] = None) -> Tuple[int, int]:
+    """对话历史超过token阈值时，从最早的轮次开始将工具调用结果替换为摘要（原地修改）
+
+    protect_from及其之后的消息保持原样，默认为最后一个用户问题，即当前轮次不压缩；
+    工具调用循环中可传入latest_tool_round_start()，只保留最近一次工具调用的结果。
+
+    Args:
+        messages: 消息列表
+        token_threshold: token阈值
+        protect_from: 保持原样的起始位置
+
+    Returns:
+        Tuple[int, int]: (压缩的消息数, 节省的估算token数)
+    """
+    total = sum(_message_tokens(message) for message in messages)
+    if total <= token_threshold:
+        return 0, 0
+
+    if protect_from is None:
+        protect_from = next(
+            (i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"),
+            len(messages)
+        )
+
+    compacted = 0
+    saved = 0
+    for message in messages[:protect_from]:
+        if total <= token_threshold:
+            break
+        content = message.get("content")
+        if message.get("role") != "tool" or not isinstance(content, str) or content.startswith(COMPACTED_PREFIX):
+            continue
+        summary = summarize_tool_result(message.get("name", ""), content)
+        reduction = estimate_tokens(content) - estimate_tokens(summary)
+        if reduction <= 0:
+            continue
+        message["content"] = summary
+        total -= reduction
+        saved += reduction
+        compacted += 1
+    return compacted, saved
@@ -0,0 +1,227 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from config.constants import LLM_CACHE_MODE, LLM_CACHE_DB_PATH
+from services.prompt_manager import TIME_INFO_PATTERN
+from services.llm_client_proxy import replace_completions
+
+CACHE_MODES = ("off", "auto", "record", "replay")
+# 参与缓存键计算的请求参数，除model、messages、tools外也包含会改变响应内容或形态的参数
+_KEY_FIELDS = ("model", "messages", "tools", "tool_choice", "temperature", "stream")
+
+
+class LLMCacheMissError(Exception):
+    """replay模式下缓存未命中"""
+    pass
+
+
+def cache_key(kwargs: Dict[str, Any]) -> str:
+    """按请求参数计算缓存键
+
+    系统提示词中的当前日期和时间（精确到分钟）不参与计算，否则录制的响应在一分钟后就无法回放
+    """
+    payload = {field: kwargs.get(field) for field in _KEY_FIELDS}
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    text = TIME_INFO_PATTERN.sub("今天日期<now>", text)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """基于SQLite的大模型响应缓存，流式响应按块存储"""
+
+    def __init__(self, db_path: str = LLM_CACHE_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        if not self._initialized:
+            with self._lock:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    stream INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """)
+                conn.commit()
+                self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，流式响应返回块列表，非流式响应返回响应字典"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT payload FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, stream: bool, payload: Any):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, stream, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key, 1 if stream else 0, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _dump(obj) -> Dict:
+    return obj.model_dump() if hasattr(obj, "model_dump") else obj
+
+
+def _load_completion(payload: Dict):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(payload)
+
+
+def _load_chunk(payload: Dict):
+    from openai.types.chat import ChatCompletionChunk
+    return ChatCompletionChunk.model_validate(payload)
+
+
+class _RecordingStream:
+    """边转发边记录的流式响应，完整读取后写入缓存"""
+
+    def __init__(self, stream, cache: LLMResponseCache, key: str):
+        self._stream = stream
+        self._cache = cache
+        self._key = key
+        self._chunks: List[Dict] = []
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append(_dump(chunk))
+            yield chunk
+        self._cache.set(self._key, True, self._chunks)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _AsyncRecordingStream(_RecordingStream):
+    """异步版本的记录流"""
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for chunk in self._stream:
+            self._chunks.append(_dump(chunk))
+            yield chunk
+        self._cache.set(self._key, True, self._chunks)
+
+
+class _ReplayStream:
+    """按块回放缓存的流式响应"""
+
+    def __init__(self, chunks: List[Dict]):
+        self._chunks = chunks
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield _load_chunk(chunk)
+
+    def __aiter__(self):
+        return self._aiterate()
+
+    async def _aiterate(self):
+        for chunk in self._chunks:
+            yield _load_chunk(chunk)
+
+    def close(self):
+        pass
+
+
+class _CachedCompletions:
+    """包装chat.completions，create按缓存模式回放或记录"""
+
+    def __init__(self, completions, cache: LLMResponseCache, mode: str):
+        self._completions = completions
+        self._cache = cache
+        self._mode = mode
+
+    def _lookup(self, kwargs: Dict[str, Any]):
+        """返回(缓存键, 回放结果)，不需要回放时回放结果为None"""
+        key = cache_key(kwargs)
+        if self._mode in ("auto", "replay"):
+            payload = self._cache.get(key)
+            if payload is not None:
+                return key, (_ReplayStream(payload) if kwargs.get("stream") else _load_completion(payload))
+            if self._mode == "replay":
+                raise LLMCacheMissError(f"大模型响应缓存未命中: {key}")
+        return key, None
+
+    def create(self, **kwargs):
+        key, replay = self._lookup(kwargs)
+        if replay is not None:
+            return replay
+        response = self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return _RecordingStream(response, self._cache, key)
+        self._cache.set(key, False, _dump(response))
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _AsyncCachedCompletions(_CachedCompletions):
+    """异步客户端的chat.completions包装"""
+
+    async def create(self, **kwargs):
+        key, replay = self._lookup(kwargs)
+        if replay is not None:
+            return replay
+        response = await self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return _AsyncRecordingStream(response, self._cache, key)
+        self._cache.set(key, False, _dump(response))
+        return response
+
+
+_cache = None
+
+
+def get_cache() -> LLMResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache()
+    return _cache
+
+
+def wrap_client(client, mode: str = LLM_CACHE_MODE, is_async: bool = False):
+    """按缓存模式包装OpenAI客户端，off模式原样返回
+
+    Args:
+        client: OpenAI或AsyncOpenAI客户端
+        mode: 缓存模式，取值见CACHE_MODES
+        is_async: 是否为AsyncOpenAI客户端
+
+    Returns:
+        与原客户端用法相同的对象，chat.completions.create经过缓存
+    """
+    if mode == "off":
+        return client
+    if mode not in CACHE_MODES:
+        print(f"未知的大模型响应缓存模式: {mode}，已关闭缓存")
+        return client
+    completions_cls = _AsyncCachedCompletions if is_async else _CachedCompletions
+    completions = completions_cls(client.chat.completions, get_cache(), mode)
+    return replace_completions(client, completions)
@@ -0,0 +1,14 @@
+class AttributeProxy:
+    """转发属性访问到被包装对象，overrides中的属性替换原属性"""
+
+    def __init__(self, target, **overrides):
+        self._target = target
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def replace_completions(client, completions):
+    """返回与OpenAI客户端用法相同的对象，其中chat.completions替换为completions，其他属性访问原客户端"""
+    return AttributeProxy(client, chat=AttributeProxy(client.chat, completions=completions))
@@ -1,26 +1,126 @@
-import os
-from initial.config import get_llm_config
+import threading
+from initial.config import get_llm_config, subscribe_config_changes
+from services.llm_cache import wrap_client
+from services.llm_tracing import instrument_client
+from config.constants import LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS, LLM_HTTP_KEEPALIVE_EXPIRY
+
+# 客户端注册表，按(api_key, base_url, timeout)缓存，所有客户端共享同一个HTTP连接池
+_clients = {}
+_http_client = None
+_current_client = None
+# 异步客户端注册表，供异步Agent运行时使用，同样共享一个异步HTTP连接池
+_async_clients = {}
+_async_http_client = None
+_current_async_client = None
+_current_model = None
+_lock = threading.Lock()
+
+def _get_http_client():
+    """
+    获取共享的HTTP连接池，保持长连接以复用TCP/TLS握手
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+    return _http_client
+
+def _get_async_http_client():
+    """
+    获取共享的异步HTTP连接池
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+        _async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+    return _async_http_client
 
 # 从配置服务获取LLM配置
 def get_client():
     """
-    Initialize and return OpenAI client with shared configuration
+    Return a cached OpenAI client with shared configuration and a shared keep-alive connection pool
     """
+    global _current_client
+    client = _current_client
+    if client is not None:
+        return client
+
     from openai import OpenAI
-    
-    # 获取配置
-    config = get_llm_config()
-    
-    return OpenAI(
-        api_key=config["api_key"],
-        base_url=config["base_url"],
-        timeout=config["timeout"],
-    )
+
+    with _lock:
+        if _current_client is None:
+            # 获取配置
+            config = get_llm_config()
+            key = (config["api_key"], config["base_url"], config["timeout"])
+            if key not in _clients:
+                _clients[key] = OpenAI(
+                    api_key=config["api_key"],
+                    base_url=config["base_url"],
+                    timeout=config["timeout"],
+                    http_client=_get_http_client(),
+                )
+            _current_client = wrap_client(instrument_client(_clients[key]))
+        return _current_client
+
+def get_async_client():
+    """
+    Return a cached AsyncOpenAI client; it must only be used from the agent runtime event loop
+    """
+    global _current_async_client
+    client = _current_async_client
+    if client is not None:
+        return client
+
+    from openai import AsyncOpenAI
+
+    with _lock:
+        if _current_async_client is None:
+            config = get_llm_config()
+            key = (config["api_key"], config["base_url"], config["timeout"])
+            if key not in _async_clients:
+                _async_clients[key] = AsyncOpenAI(
+                    api_key=config["api_key"],
+                    base_url=config["base_url"],
+                    timeout=config["timeout"],
+                    http_client=_get_async_http_client(),
+                )
+            _current_async_client = wrap_client(instrument_client(_async_clients[key], is_async=True), is_async=True)
+        return _current_async_client
 
 # 获取模型名称
 def get_model():
     """
     Get the model name from configuration
     """
-    config = get_llm_config()
-    return config["model"]
\ No newline at end of file
+    global _current_model
+    if _current_model is None:
+        _current_model = get_llm_config()["model"]
+    return _current_model
+
+def reset_clients():
+    """
+    LLM配置变更后调用，下次获取客户端时按新配置重新选择或创建
+    """
+    global _current_client, _current_async_client, _current_model
+    with _lock:
+        _current_client = None
+        _current_async_client = None
+        _current_model = None
+
+def _on_config_change(snapshot, changed_keys):
+    if any(key.startswith("llm_") for key in changed_keys):
+        reset_clients()
+
+subscribe_config_changes(_on_config_change)
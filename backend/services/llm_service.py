@@ -2,6 +2,7 @@ import time
 from services.logger import broadcast_log
 from services.llm_config import get_client, get_model
 from services.prompt_manager import PromptManager
+from services.context_packer import pack_context, format_pack_report
 
 # 调用大模型API生成SQL
 def generate_sql(query, ddl=None, freeshot=None, term=None):
@@ -39,9 +40,12 @@ def generate_sql(query, ddl=None, freeshot=None, term=None):
 # 构建提示词
 def build_prompt(query, ddl=None, freeshot=None, term=None):
     """
-    构建发送给大模型的提示词
+    构建发送给大模型的提示词，元数据按token预算和相关度裁剪
     """
-    return PromptManager.build_sql_prompt(query, ddl, freeshot, term)
+    packed = pack_context(ddl, freeshot, term)
+    if packed["dropped"]:
+        broadcast_log("ai", format_pack_report(packed), "生成SQL-元数据超出预算，已裁剪")
+    return PromptManager.build_sql_prompt(query, packed["ddl"], packed["freeshot"], packed["term"])
 
 # 解析API响应
 def parse_response(response):
@@ -1,7 +1,15 @@
 
+import re
+import hashlib
 from services.logger import broadcast_log
 from services.llm_config import get_client, get_model
 from services.prompt_manager import PromptManager
+from services.ttl_cache import TTLCache
+from services.tracing import traced
+from config.constants import TABLE_SELECT_CACHE_SIZE, TABLE_SELECT_CACHE_TTL, TABLE_SELECT_SCORE_MARGIN
+
+# 表筛选结果缓存，值为大模型选中的表名列表
+_table_select_cache = TTLCache(maxsize=TABLE_SELECT_CACHE_SIZE, ttl=TABLE_SELECT_CACHE_TTL)
 
 # 构建表选择提示词
 def build_table_select_prompt(query, ddl_list):
@@ -46,11 +54,77 @@ def parse_table_response(response):
     
     return filtered_table_names
 
+def _normalize_query(query):
+    """
+    归一化用户问题，忽略大小写、多余空白和句末标点的差异
+    """
+    query = re.sub(r"\s+", " ", str(query or "")).strip().lower()
+    return query.rstrip("?？。.!！ ")
+
+
+def _metadata_version(ddl_list):
+    """
+    根据候选表的DDL内容计算元数据版本，表或字段描述变化后缓存自动失效
+    """
+    digest = hashlib.sha1()
+    for item in sorted(ddl_list, key=lambda x: x["table_name"]):
+        digest.update(item["ddl"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _select_by_score(ddl_list):
+    """
+    所有候选表都带有向量召回分数时，如果最高分明显领先第二名，直接返回该表
+
+    Returns:
+        dict: 选中的DDL项，无法确定时返回None
+    """
+    scores = [item.get("score") for item in ddl_list]
+    if any(score is None for score in scores):
+        return None
+    ranked = sorted(ddl_list, key=lambda x: x["score"], reverse=True)
+    top_score, second_score = ranked[0]["score"], ranked[1]["score"]
+    if top_score > 0 and top_score >= second_score * TABLE_SELECT_SCORE_MARGIN:
+        return ranked[0]
+    return None
+
+
+def _filter_ddl_list(ddl_list, table_names):
+    """
+    根据表名过滤DDL列表，没有找到相关表时返回原始列表
+    """
+    filtered_ddl_list = [item for item in ddl_list if item["table_name"] in table_names]
+    return filtered_ddl_list or ddl_list
+
+
+@traced("ddl.table_select", "chatbi_stage_duration_seconds", stage="table_select")
 def get_tables_from_suggest(query, ddl_list):
     """
     根据用户问题，从向量数据库搜索出来的元数据中，找到跟用户问题相关的一个或多个表，ddl_list为[{"table_name": "", "table_desc": "", "ddl":"create table xxx"}]
     返回新的ddl_list，但只返回相关的ddl_list
+
+    候选表不超过一张、向量分数明显区分出一张表、或相同问题和候选表已有缓存结果时，不再调用大模型
     """
+    # 候选表过少，无需筛选
+    if len(ddl_list) <= 1:
+        return ddl_list
+
+    # 向量召回分数明显区分出一张表
+    selected = _select_by_score(ddl_list)
+    if selected:
+        broadcast_log("ai", selected["table_name"], "筛选数据表-召回分数领先，跳过推理")
+        return [selected]
+
+    cache_key = (
+        _normalize_query(query),
+        tuple(sorted(item["table_name"] for item in ddl_list)),
+        _metadata_version(ddl_list)
+    )
+    cached_table_names = _table_select_cache.get(cache_key)
+    if cached_table_names is not None:
+        broadcast_log("ai", "\n".join(cached_table_names), "筛选数据表-命中缓存")
+        return _filter_ddl_list(ddl_list, cached_table_names)
+
     try:
         # 构建提示词
         prompt = build_table_select_prompt(query, ddl_list)
@@ -68,20 +142,12 @@ def get_tables_from_suggest(query, ddl_list):
         
         # 解析响应
         table_names = parse_table_response(response)
+        _table_select_cache.set(cache_key, table_names)
         
-        # 根据表名过滤DDL列表
-        filtered_ddl_list = []
-        for item in ddl_list:
-            if item["table_name"] in table_names:
-                filtered_ddl_list.append(item)
-        
-        # 如果没有找到相关表，返回原始列表
-        if not filtered_ddl_list:
-            return ddl_list
-            
-        return filtered_ddl_list
+        # 根据表名过滤DDL列表，如果没有找到相关表，返回原始列表
+        return _filter_ddl_list(ddl_list, table_names)
         
     except Exception as e:
         # 发生错误时返回原始列表
         print(f"Error calling LLM API for table selection: {str(e)}")
-        return ddl_list
\ No newline at end of file
+        return ddl_list
@@ -0,0 +1,109 @@
+import time
+from typing import Any, Dict
+from services.tracing import start_span, metrics
+from services.llm_client_proxy import replace_completions
+
+
+def _finish(span, kwargs: Dict[str, Any], status: str):
+    span.finish(status, "chatbi_llm_request_duration_seconds",
+                model=kwargs.get("model", ""), stream=str(bool(kwargs.get("stream"))).lower())
+
+
+class _TracedStream:
+    """包装流式响应，记录首个token耗时和总耗时"""
+
+    def __init__(self, stream, span, kwargs: Dict[str, Any]):
+        self._stream = stream
+        self._span = span
+        self._kwargs = kwargs
+        self._first_chunk = True
+
+    def _on_chunk(self):
+        if self._first_chunk:
+            self._first_chunk = False
+            ttft = time.perf_counter() - self._span.start
+            self._span.set("ttft_ms", round(ttft * 1000, 3))
+            metrics.observe("chatbi_llm_ttft_seconds", ttft, model=self._kwargs.get("model", ""))
+
+    def __iter__(self):
+        status = "error"
+        try:
+            for chunk in self._stream:
+                self._on_chunk()
+                yield chunk
+            status = "ok"
+        finally:
+            _finish(self._span, self._kwargs, status)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _AsyncTracedStream(_TracedStream):
+    """异步版本的流式响应包装"""
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        status = "error"
+        try:
+            async for chunk in self._stream:
+                self._on_chunk()
+                yield chunk
+            status = "ok"
+        finally:
+            _finish(self._span, self._kwargs, status)
+
+
+class _TracedCompletions:
+    """包装chat.completions，create记录大模型调用的span和耗时指标"""
+
+    def __init__(self, completions):
+        self._completions = completions
+
+    def create(self, **kwargs):
+        span = start_span("llm.chat", model=kwargs.get("model", ""), stream=str(bool(kwargs.get("stream"))).lower())
+        try:
+            response = self._completions.create(**kwargs)
+        except Exception:
+            _finish(span, kwargs, "error")
+            raise
+        if kwargs.get("stream"):
+            return _TracedStream(response, span, kwargs)
+        _finish(span, kwargs, "ok")
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _AsyncTracedCompletions(_TracedCompletions):
+    """异步客户端的chat.completions包装"""
+
+    async def create(self, **kwargs):
+        span = start_span("llm.chat", model=kwargs.get("model", ""), stream=str(bool(kwargs.get("stream"))).lower())
+        try:
+            response = await self._completions.create(**kwargs)
+        except Exception:
+            _finish(span, kwargs, "error")
+            raise
+        if kwargs.get("stream"):
+            return _AsyncTracedStream(response, span, kwargs)
+        _finish(span, kwargs, "ok")
+        return response
+
+
+def instrument_client(client, is_async: bool = False):
+    """包装OpenAI客户端，chat.completions.create记录追踪span、首token耗时和总耗时
+
+    Args:
+        client: OpenAI或AsyncOpenAI客户端
+        is_async: 是否为AsyncOpenAI客户端
+
+    Returns:
+        与原客户端用法相同的对象
+    """
+    completions_cls = _AsyncTracedCompletions if is_async else _TracedCompletions
+    completions = completions_cls(client.chat.completions)
+    return replace_completions(client, completions)
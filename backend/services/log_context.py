@@ -0,0 +1,37 @@
+import contextvars
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Optional
+
+# 当前请求所属的日志会话ID（前端通过X-Session-Id请求头传入），日志只推送到该会话的房间
+current_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_session_id", default=None)
+
+# 会话ID最大长度，超出视为无效
+MAX_SESSION_ID_LENGTH = 128
+
+
+def normalize_session_id(session_id: Any) -> Optional[str]:
+    """校验会话ID，无效时返回None"""
+    if not isinstance(session_id, str):
+        return None
+    session_id = session_id.strip()
+    if not session_id or len(session_id) > MAX_SESSION_ID_LENGTH:
+        return None
+    return session_id
+
+
+def set_session_id(session_id: Optional[str]) -> contextvars.Token:
+    """设置当前上下文的会话ID，返回用于reset_session_id的token"""
+    return current_session_id.set(normalize_session_id(session_id))
+
+
+def reset_session_id(token: contextvars.Token):
+    current_session_id.reset(token)
+
+
+def get_session_id() -> Optional[str]:
+    return current_session_id.get()
+
+
+def submit_with_context(executor: Executor, func: Callable, *args, **kwargs) -> Future:
+    """将任务提交到线程池，并在当前上下文的副本中执行，使工作线程中的日志仍路由到发起请求的会话"""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
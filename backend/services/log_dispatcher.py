@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+
+class LogDispatcher:
+    """
+    异步日志分发器：日志先放入有界队列，由后台线程发送到WebSocket并打印，请求线程不等待发送
+
+    - 超长消息截断后发送，完整内容按payload_id保留，可通过get_payload()按需获取
+    - 队列超过高水位时，普通日志按采样率保留（流式日志不采样，避免内容断裂）
+    - 队列已满时丢弃新日志，压力解除后发送一条丢弃统计
+    """
+
+    def __init__(self, emit: Callable[[str, Dict[str, Any]], None], max_queue: int = 10000,
+                 max_message_chars: int = 4000, payload_cache_size: int = 200,
+                 sample_watermark: float = 0.8, sample_rate: int = 10,
+                 console: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            emit: 发送事件的函数，参数为事件名和日志数据
+            max_queue: 队列容量
+            max_message_chars: 消息超过该长度时截断
+            payload_cache_size: 保留的完整消息数量
+            sample_watermark: 队列占用超过该比例时开始采样
+            sample_rate: 采样时每sample_rate条普通日志保留1条
+            console: 在后台线程中输出到控制台的函数，参数为日志数据
+        """
+        self._emit = emit
+        self._console = console
+        self.max_message_chars = max_message_chars
+        self.payload_cache_size = payload_cache_size
+        self.sample_watermark = sample_watermark
+        self.sample_rate = max(1, sample_rate)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._payloads: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sample_counter = 0
+        self._dropped = 0
+        self._sampled = 0
+        self._unreported_drops = 0
+        self._worker: Optional[threading.Thread] = None
+
+    def dispatch(self, event: str, log_data: Dict[str, Any], sampleable: bool = True) -> Dict[str, Any]:
+        """放入发送队列，不阻塞
+
+        Args:
+            event: 事件名
+            log_data: 日志数据，message超长时会被截断
+            sampleable: 队列压力较大时是否允许采样丢弃
+
+        Returns:
+            Dict[str, Any]: 实际发送的日志数据（可能已截断）
+        """
+        log_data = self._truncate(log_data)
+        self._ensure_worker()
+
+        if sampleable and self._queue.qsize() >= self._queue.maxsize * self.sample_watermark:
+            with self._lock:
+                self._sample_counter += 1
+                if self._sample_counter % self.sample_rate != 0:
+                    self._sampled += 1
+                    self._unreported_drops += 1
+                    return log_data
+        try:
+            self._queue.put_nowait((event, log_data))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                self._unreported_drops += 1
+        return log_data
+
+    def get_payload(self, payload_id: str) -> Optional[str]:
+        """获取被截断消息的完整内容，已淘汰时返回None"""
+        with self._lock:
+            return self._payloads.get(payload_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queued": self._queue.qsize(), "dropped": self._dropped, "sampled": self._sampled}
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待队列中的日志发送完成，返回是否在超时前完成"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _truncate(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
+        message = log_data.get("message")
+        if not isinstance(message, str) or len(message) <= self.max_message_chars:
+            return log_data
+        payload_id = uuid.uuid4().hex
+        with self._lock:
+            self._payloads[payload_id] = message
+            while len(self._payloads) > self.payload_cache_size:
+                self._payloads.popitem(last=False)
+        return dict(
+            log_data,
+            message=message[:self.max_message_chars],
+            truncated=True,
+            full_length=len(message),
+            payload_id=payload_id
+        )
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="log-dispatcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            event, log_data = self._queue.get()
+            try:
+                self._emit(event, log_data)
+                if self._console:
+                    self._console(log_data)
+            except Exception as e:
+                print(f"发送日志失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+            if self._queue.empty():
+                self._report_drops()
+
+    def _report_drops(self):
+        with self._lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        if not dropped:
+            return
+        try:
+            self._emit("log", {
+                "type": "system",
+                "message": f"日志过多，已丢弃{dropped}条",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+                "summary": "日志已丢弃"
+            })
+        except Exception as e:
+            print(f"发送日志失败: {str(e)}")
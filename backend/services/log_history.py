@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from config.constants import (
+    LOG_HISTORY_SIZE, LOG_HISTORY_SESSIONS, LOG_SPILL_ENABLED, LOG_SPILL_DB_PATH, LOG_SPILL_TTL,
+    LOG_SPILL_BATCH_SIZE, LOG_REPLAY_LIMIT
+)
+
+
+class _SessionLog:
+    """单个会话的日志环形缓冲"""
+
+    def __init__(self, next_seq: int, size: int):
+        self.next_seq = next_seq
+        self.events: "deque[Tuple[int, str, Dict[str, Any]]]" = deque()
+        self.size = size
+
+
+class LogHistory:
+    """
+    按会话保留最近的日志事件，订阅时回放；超出环形缓冲或随会话被淘汰的事件以紧凑JSON写入SQLite
+
+    每个事件分配会话内递增的序号seq，客户端重连时带上最后收到的seq，只回放之后的事件
+    """
+
+    def __init__(self, size: int = LOG_HISTORY_SIZE, max_sessions: int = LOG_HISTORY_SESSIONS,
+                 spill_db_path: Optional[str] = LOG_SPILL_DB_PATH if LOG_SPILL_ENABLED else None,
+                 spill_ttl: float = LOG_SPILL_TTL, spill_batch_size: int = LOG_SPILL_BATCH_SIZE):
+        """
+        Args:
+            size: 每个会话在内存中保留的事件数
+            max_sessions: 内存中保留的会话数，超出时按LRU淘汰
+            spill_db_path: 淘汰事件写入的SQLite文件，为None时直接丢弃
+            spill_ttl: SQLite中事件的保留时间（秒）
+            spill_batch_size: 累积到该数量的淘汰事件后批量写入
+        """
+        self.size = size
+        self.max_sessions = max_sessions
+        self.spill_db_path = spill_db_path
+        self.spill_ttl = spill_ttl
+        self.spill_batch_size = spill_batch_size
+        self._sessions: "OrderedDict[str, _SessionLog]" = OrderedDict()
+        self._pending_spill: List[Tuple[str, int, str, Dict[str, Any], float]] = []
+        self._lock = threading.Lock()
+        self._spill_initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.spill_db_path)
+        if not self._spill_initialized:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS log_events (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_log_events_created_at ON log_events (created_at)")
+            conn.commit()
+            self._spill_initialized = True
+        return conn
+
+    def record(self, event: str, log_data: Dict[str, Any]) -> Optional[int]:
+        """记录一个事件并在log_data中写入seq；没有会话ID的事件不记录
+
+        Returns:
+            Optional[int]: 事件序号
+        """
+        session_id = log_data.get("session_id")
+        if not session_id:
+            return None
+        with self._lock:
+            session_log = self._sessions.get(session_id)
+            if session_log is None:
+                session_log = _SessionLog(self._spilled_max_seq(session_id) + 1, self.size)
+                self._sessions[session_id] = session_log
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, evicted = self._sessions.popitem(last=False)
+                    self._queue_spill(evicted_id, list(evicted.events))
+            else:
+                self._sessions.move_to_end(session_id)
+
+            seq = session_log.next_seq
+            session_log.next_seq += 1
+            log_data["seq"] = seq
+            session_log.events.append((seq, event, log_data))
+            if len(session_log.events) > session_log.size:
+                self._queue_spill(session_id, [session_log.events.popleft()])
+
+            if len(self._pending_spill) >= self.spill_batch_size:
+                self._flush_spill()
+        return seq
+
+    def replay(self, session_id: str, after_seq: Optional[int] = None,
+               limit: int = LOG_REPLAY_LIMIT) -> List[Tuple[str, Dict[str, Any]]]:
+        """获取会话中序号大于after_seq的事件，按序号排列，最多返回最近的limit条
+
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: (事件名, 日志数据) 列表
+        """
+        after_seq = after_seq if isinstance(after_seq, int) else 0
+        with self._lock:
+            session_log = self._sessions.get(session_id)
+            memory_events = [item for item in session_log.events if item[0] > after_seq] if session_log else []
+            self._flush_spill()
+
+        events = memory_events
+        remaining = limit - len(events)
+        first_memory_seq = events[0][0] if events else None
+        if remaining > 0:
+            events = self._load_spilled(session_id, after_seq, first_memory_seq, remaining) + events
+        return [(event, log_data) for _, event, log_data in events[-limit:]]
+
+    def _queue_spill(self, session_id: str, events: List[Tuple[int, str, Dict[str, Any]]]):
+        # 调用方需持有锁
+        if not self.spill_db_path:
+            return
+        now = time.time()
+        self._pending_spill.extend((session_id, seq, event, log_data, now) for seq, event, log_data in events)
+
+    def _flush_spill(self):
+        """批量写入待写入的事件，并清理过期记录，调用方需持有锁"""
+        if not self._pending_spill:
+            return
+        rows = [
+            (session_id, seq, event, json.dumps(log_data, ensure_ascii=False, separators=(",", ":")), created_at)
+            for session_id, seq, event, log_data, created_at in self._pending_spill
+        ]
+        self._pending_spill = []
+        conn = None
+        try:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO log_events (session_id, seq, event, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("DELETE FROM log_events WHERE created_at < ?", (time.time() - self.spill_ttl,))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"日志写入SQLite失败: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _spilled_max_seq(self, session_id: str) -> int:
+        """已淘汰事件（包括尚未写入SQLite的）中该会话的最大序号，会话重新进入内存时从其后继续编号，调用方需持有锁"""
+        if not self.spill_db_path:
+            return 0
+        pending_max = max((seq for pending_id, seq, _, _, _ in self._pending_spill if pending_id == session_id),
+                          default=0)
+        conn = None
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT MAX(seq) FROM log_events WHERE session_id = ?", (session_id,)).fetchone()
+            return max(row[0] or 0, pending_max)
+        except sqlite3.Error as e:
+            print(f"读取日志序号失败: {str(e)}")
+            return pending_max
+        finally:
+            if conn:
+                conn.close()
+
+    def _load_spilled(self, session_id: str, after_seq: int, before_seq: Optional[int],
+                      limit: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """从SQLite读取序号在(after_seq, before_seq)之间的最近limit条事件"""
+        if not self.spill_db_path:
+            return []
+        conn = None
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT seq, event, payload FROM log_events WHERE session_id = ? AND seq > ? AND seq < ? "
+                "AND created_at >= ? ORDER BY seq DESC LIMIT ?",
+                (session_id, after_seq, before_seq if before_seq is not None else 2 ** 62,
+                 time.time() - self.spill_ttl, limit)
+            ).fetchall()
+            return [(seq, event, json.loads(payload)) for seq, event, payload in reversed(rows)]
+        except (sqlite3.Error, ValueError) as e:
+            print(f"从SQLite读取日志失败: {str(e)}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+
+log_history = LogHistory()
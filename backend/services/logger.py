@@ -1,8 +1,19 @@
 # Logger service for handling WebSocket connections and log broadcasting
 
 from flask import request, jsonify
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
+import hmac
+import threading
 import time
+from config.constants import (
+    STREAM_LOG_FLUSH_INTERVAL, STREAM_LOG_FLUSH_CHARS, STREAM_LOG_IDLE_TIMEOUT, LOG_QUEUE_SIZE, LOG_MAX_MESSAGE_CHARS,
+    LOG_PAYLOAD_CACHE_SIZE, LOG_SAMPLE_WATERMARK, LOG_SAMPLE_RATE, ADMIN_TOKEN
+)
+from services.stream_log_coalescer import StreamLogCoalescer
+from services.log_dispatcher import LogDispatcher
+from services.log_context import get_session_id, normalize_session_id
+from services.log_history import log_history
+from services.tracing import get_request_id
 
 # Initialize SocketIO instance to be imported by app.py
 socketio = SocketIO(cors_allowed_origins="*")
@@ -10,6 +21,23 @@ socketio = SocketIO(cors_allowed_origins="*")
 # Store connected clients for broadcasting
 connected_clients = set()
 
+# 会话房间前缀：日志只推送到所属会话的房间
+SESSION_ROOM_PREFIX = "session:"
+# 管理员房间：接收所有会话的日志（需配置环境变量CHATBI_ADMIN_TOKEN）
+ADMIN_ROOM = "admin"
+
+# 记录并发送会话日志与订阅回放互斥，避免回放与实时推送的事件交错
+_session_emit_lock = threading.Lock()
+
+def session_room(session_id):
+    return f"{SESSION_ROOM_PREFIX}{session_id}"
+
+def is_admin_token(token):
+    """校验管理员令牌，未配置CHATBI_ADMIN_TOKEN时总是返回False"""
+    if not ADMIN_TOKEN or not isinstance(token, str):
+        return False
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
 # WebSocket event handlers
 @socketio.on('connect')
 def handle_connect():
@@ -24,36 +52,107 @@ def handle_disconnect():
         connected_clients.remove(request.sid)
     print(f"Client disconnected: {request.sid}. Total clients: {len(connected_clients)}")
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """
+    订阅日志：加入会话房间并回放该会话最近的日志，管理员令牌有效时加入管理员房间
+    Expected data: { "session_id": "", "admin_token": "", "last_seq": 0 }
+    last_seq为客户端最后收到的事件序号，只回放之后的事件；不传时回放全部保留的事件
+    """
+    data = data or {}
+    session_id = normalize_session_id(data.get('session_id'))
+    admin = is_admin_token(data.get('admin_token'))
+    last_seq = data.get('last_seq')
+
+    # 同一连接只订阅一个会话；管理员房间已包含所有会话的日志，不再加入会话房间以免重复
+    for room in rooms():
+        if room.startswith(SESSION_ROOM_PREFIX) or room == ADMIN_ROOM:
+            leave_room(room)
+    replayed = 0
+    if admin:
+        join_room(ADMIN_ROOM)
+    elif session_id:
+        with _session_emit_lock:
+            join_room(session_room(session_id))
+            for event, log_data in log_history.replay(session_id, last_seq):
+                emit(event, dict(log_data, replay=True))
+                replayed += 1
+
+    emit('subscribed', {"session_id": session_id, "admin": admin, "replayed": replayed})
+
+def _print_log(log_data):
+    """在分发线程中打印普通日志到服务器控制台"""
+    if not log_data.get("is_stream"):
+        print(f"[{log_data['timestamp']}] [{log_data['type']}] {log_data['message']}")
+
+def _emit_log(event, log_data):
+    """记录到会话日志历史，并发送到所属会话的房间和管理员房间；没有会话ID的日志只发送到管理员房间"""
+    session_id = log_data.get("session_id")
+    if session_id:
+        with _session_emit_lock:
+            log_history.record(event, log_data)
+            socketio.emit(event, log_data, to=session_room(session_id))
+    socketio.emit(event, log_data, to=ADMIN_ROOM)
+
+# 日志分发器：日志放入有界队列，由后台线程发送和打印，不阻塞请求
+_dispatcher = LogDispatcher(
+    _emit_log,
+    max_queue=LOG_QUEUE_SIZE,
+    max_message_chars=LOG_MAX_MESSAGE_CHARS,
+    payload_cache_size=LOG_PAYLOAD_CACHE_SIZE,
+    sample_watermark=LOG_SAMPLE_WATERMARK,
+    sample_rate=LOG_SAMPLE_RATE,
+    console=_print_log
+)
+
+# 流式日志合并器：按流缓冲token，定时或达到阈值后发送
+_stream_coalescer = StreamLogCoalescer(
+    lambda log_data: _dispatcher.dispatch('stream_log', log_data, sampleable=False),
+    flush_interval=STREAM_LOG_FLUSH_INTERVAL,
+    max_chars=STREAM_LOG_FLUSH_CHARS,
+    idle_timeout=STREAM_LOG_IDLE_TIMEOUT
+)
+
+def _stream_owner():
+    """流的来源：当前会话和线程"""
+    return (get_session_id(), threading.get_ident())
+
+def _stream_key(log_type, summary):
+    """流标识：同一会话、同一线程中同类型、同摘要的流式输出视为一个流"""
+    return _stream_owner() + (log_type, summary)
+
 # Log broadcasting function
 def broadcast_log(log_type, message, summary=""):
     """
-    Broadcast a log message to all connected WebSocket clients
+    Broadcast a log message to the clients subscribed to the current session (and the admin room)
+    日志放入分发队列后立即返回；超长消息会被截断，完整内容通过 /api/log/payload/<payload_id> 获取
     
     Args:
         log_type (str): Type of log ('system' or 'ai')
         message (str): Log message content
         summary (str, optional): Summary of the log message. Defaults to empty string.
     """
+    # 先发送当前会话、当前线程缓冲中的流式token，保证同一来源的日志顺序；其他会话的流不受影响
+    _stream_coalescer.flush_prefix(_stream_owner())
+
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
     log_data = {
         "type": log_type,
         "message": message,
         "timestamp": timestamp,
-        "summary": summary
+        "summary": summary,
+        "session_id": get_session_id(),
+        "request_id": get_request_id()
     }
     
-    # Emit to all connected clients
-    socketio.emit('log', log_data)
-    
-    # Print to server console for debugging
-    print(f"[{timestamp}] [{log_type}] {message}")
-    
-    return log_data
+    # Emit to all connected clients and print to server console (in the dispatcher thread)
+    return _dispatcher.dispatch('log', log_data)
 
 # 流式日志广播函数
 def broadcast_stream_log(log_type, token, summary="", is_first=False):
     """
-    广播流式日志消息到所有连接的WebSocket客户端
+    广播流式日志消息到当前会话的WebSocket客户端
+    token先按流缓冲，在时间窗口内或达到字符数阈值时合并为一条消息发送
     
     Args:
         log_type (str): 日志类型 ('system' 或 'ai')
@@ -61,24 +160,24 @@ def broadcast_stream_log(log_type, token, summary="", is_first=False):
         summary (str, optional): 日志消息的摘要。默认为空字符串。
         is_first (bool, optional): 是否是流式输出的第一个token。默认为False。
     """
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    log_data = {
-        "type": log_type,
-        "message": token,
-        "timestamp": timestamp,
-        "summary": summary,
-        "is_stream": True,
-        "is_first": is_first
-    }
-    
-    # 发送到所有连接的客户端
-    socketio.emit('stream_log', log_data)
+    _stream_coalescer.add(_stream_key(log_type, summary), log_type, token, summary, is_first, get_session_id(),
+                          get_request_id())
     
     # 打印到服务器控制台进行调试
     if is_first:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         print(f"[{timestamp}] [{log_type}] 开始流式输出: {summary}")
+
+# 结束流式日志
+def end_stream_log(log_type, summary=""):
+    """
+    结束一个流式输出：发送缓冲中剩余的token，并标记is_last
     
-    return log_data
+    Args:
+        log_type (str): 日志类型 ('system' 或 'ai')
+        summary (str, optional): 与broadcast_stream_log相同的摘要
+    """
+    _stream_coalescer.end(_stream_key(log_type, summary), log_type, summary, get_session_id(), get_request_id())
 
 # HTTP route handler (to be registered in app.py)
 def handle_log_post():
@@ -104,4 +203,15 @@ def handle_log_post():
     # Broadcast the log
     log_data = broadcast_log(log_type, message, summary)
     
-    return jsonify(log_data), 200
\ No newline at end of file
+    return jsonify(log_data), 200
+
+# 获取被截断日志的完整内容 (to be registered in app.py)
+def handle_log_payload_get(payload_id):
+    """
+    Handle HTTP GET requests to /api/log/payload/<payload_id>
+    返回被截断日志消息的完整内容
+    """
+    message = _dispatcher.get_payload(payload_id)
+    if message is None:
+        return jsonify({"error": "Payload not found or expired"}), 404
+    return jsonify({"payload_id": payload_id, "message": message}), 200
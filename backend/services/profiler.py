@@ -0,0 +1,121 @@
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from config.constants import PROFILE_HISTORY_SIZE, PROFILE_STATS_LIMIT
+
+# 同一时间只分析一个请求：tracemalloc是进程级的，多个cProfile同时启用也会相互冲突
+_profile_lock = threading.Lock()
+
+
+class ProfileSession:
+    """
+    一次请求的性能分析：cProfile统计调用耗时，tracemalloc记录内存峰值
+
+    cProfile只统计启用它的线程，提交到线程池的工作（如并行召回、工具调用）只计入等待时间；
+    tracemalloc统计整个进程的内存分配
+    """
+
+    def __init__(self, name: str, request_id: Optional[str] = None):
+        self.name = name
+        self.request_id = request_id
+        self.profile = cProfile.Profile()
+        self.finished = False
+        self._started_tracemalloc = False
+        self._start = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self) -> Dict[str, Any]:
+        """停止分析，返回分析记录"""
+        self.finished = True
+        self.profile.disable()
+        duration = time.perf_counter() - self._start
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(PROFILE_STATS_LIMIT)
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "created_at": time.time(),
+            "duration_ms": round(duration * 1000, 3),
+            "peak_memory_bytes": peak,
+            "stats": stream.getvalue(),
+            # 与pstats.Stats.dump_stats的文件格式相同，可用pstats/snakeviz加载
+            "pstats": marshal.dumps(stats.stats)
+        }
+
+
+class ProfileStore:
+    """按ID保留最近的性能分析记录"""
+
+    def __init__(self, maxsize: int = PROFILE_HISTORY_SIZE):
+        self.maxsize = maxsize
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, record: Dict[str, Any]) -> str:
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._records[profile_id] = dict(record, profile_id=profile_id)
+            while len(self._records) > self.maxsize:
+                self._records.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._records.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """最近的分析记录摘要，不含统计内容，最新的在前"""
+        with self._lock:
+            records = list(self._records.values())
+        return [{key: value for key, value in record.items() if key not in ("stats", "pstats")}
+                for record in reversed(records)]
+
+
+profile_store = ProfileStore()
+
+
+def start_profile(name: str, request_id: Optional[str] = None) -> Optional[ProfileSession]:
+    """开始分析当前线程，已有请求在分析时返回None（本次请求不分析）"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    session = ProfileSession(name, request_id)
+    try:
+        session.start()
+    except Exception:
+        _profile_lock.release()
+        raise
+    return session
+
+
+def finish_profile(session: ProfileSession) -> Optional[str]:
+    """结束分析并保存记录，返回分析ID；重复调用时返回None"""
+    if session.finished:
+        return None
+    try:
+        return profile_store.save(session.stop())
+    finally:
+        _profile_lock.release()
+
+
+def parse_profile_paths(value: Optional[str]) -> List[str]:
+    """解析自动性能分析的接口路径：逗号分隔"""
+    return [path.strip() for path in (value or "").split(",") if path.strip()]
@@ -1,9 +1,29 @@
 import os
+import re
+from datetime import datetime
+
+# 提示词中的当前时间信息，缓存的提示词复用前需要刷新
+TIME_INFO_PATTERN = re.compile(r"今天日期\d{4}-\d{2}-\d{2} \S+ 当前时间\d{2}:\d{2}")
 
 class PromptManager:
     """
     Centralized manager for all LLM prompt templates
     """
+    @staticmethod
+    def build_time_info(now=None):
+        """
+        Build the current date/time line used in agent prompts
+        """
+        now = now or datetime.now()
+        return f"今天日期{now.strftime('%Y-%m-%d %A')} 当前时间{now.strftime('%H:%M')}"
+    
+    @staticmethod
+    def refresh_time_info(prompt):
+        """
+        Replace the date/time line of a previously built prompt with the current time
+        """
+        return TIME_INFO_PATTERN.sub(lambda match: PromptManager.build_time_info(), prompt, count=1)
+    
     @staticmethod
     def build_sql_prompt(query, ddl=None, freeshot=None, term=None):
         """
@@ -91,16 +111,13 @@ table3""")
         """
         Build prompt for SQL Agent with ReAct paradigm
         """
-        from datetime import datetime
-        
         prompt_parts = []
 
         system_role = "你是一个专业的SQL助手，能够根据用户需求生成SQL查询并执行。你可以分析SQL执行结果，处理错误并自动修正。"
         prompt_parts.append(f"## 系统角色\n{system_role}\n")
         
         # Add current time information
-        now = datetime.now()
-        prompt_parts.append(f"## 附加信息\n今天日期{now.strftime('%Y-%m-%d %A')} 当前时间{now.strftime('%H:%M')}\n")
+        prompt_parts.append(f"## 附加信息\n{PromptManager.build_time_info()}\n")
         
         # Add user query
         prompt_parts.append(f"## 元数据信息（注意，以下是部分表的部分字段信息，枚举值也是其部分枚举值）\n{metadata_content}\n")
@@ -133,16 +150,13 @@ table3""")
         """
         Build prompt for Feedback Agent to process user's positive feedback
         """
-        from datetime import datetime
-        
         prompt_parts = []
 
         system_role = "你是一个专业的元数据管理助手，能够根据用户的反馈和历史对话，分析并更新数据库元数据的描述信息、业务术语和查询示例。"
         prompt_parts.append(f"## 系统角色\n{system_role}\n")
         
         # Add current time information
-        now = datetime.now()
-        prompt_parts.append(f"## 附加信息\n今天日期{now.strftime('%Y-%m-%d %A')} 当前时间{now.strftime('%H:%M')}\n")
+        prompt_parts.append(f"## 附加信息\n{PromptManager.build_time_info()}\n")
         
         # Add metadata information
         prompt_parts.append(f"## 元数据信息（注意，以下是部分表的部分字段信息）\n{metadata_content}\n")
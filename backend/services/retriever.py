@@ -0,0 +1,183 @@
+import math
+import re
+import heapq
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Optional
+from config.constants import METADATA_DB_PATH, RETRIEVAL_LIKES_WEIGHT
+
+# 英文、数字按单词切分；中文按单字和相邻二元组切分
+_WORD_PATTERN = re.compile(r"[a-z0-9_]+|[一-鿿]+")
+_CJK_PATTERN = re.compile(r"[一-鿿]+")
+
+# BM25参数
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为检索词
+
+    Args:
+        text: 待切分文本
+
+    Returns:
+        List[str]: 检索词列表（可能重复）
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall((text or "").lower()):
+        if _CJK_PATTERN.fullmatch(word):
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class RetrievalIndex:
+    """基于BM25倒排索引的内存检索器，用于freeshots/terms表的按相关度召回
+
+    索引在首次查询时从metadata.db加载，之后常驻内存；点赞数变化时原地更新，
+    数据结构变化时调用invalidate()，下次查询时重建。
+    """
+
+    def __init__(self, table: str, db_path: str = METADATA_DB_PATH):
+        self.table = table
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._docs: List[Dict[str, Any]] = []
+        self._name_to_doc: Dict[str, int] = {}
+        self._doc_lengths: List[int] = []
+        self._avg_doc_length = 0.0
+        self._postings: Dict[str, List[tuple]] = {}
+        self._max_likes = 0
+
+    def _load(self):
+        """从metadata.db加载数据并构建倒排索引"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(f'SELECT name, content, likes FROM {self.table}').fetchall()
+        finally:
+            conn.close()
+
+        docs = []
+        doc_lengths = []
+        postings = defaultdict(list)
+        for doc_idx, (name, content, likes) in enumerate(rows):
+            docs.append({"name": name, "content": content, "likes": likes or 0})
+            # 名称是用户问题的自然语言描述，权重高于内容
+            tokens = tokenize(name) * 2 + tokenize(content)
+            doc_lengths.append(len(tokens))
+            term_freqs = defaultdict(int)
+            for token in tokens:
+                term_freqs[token] += 1
+            for token, tf in term_freqs.items():
+                postings[token].append((doc_idx, tf))
+
+        self._docs = docs
+        self._name_to_doc = {doc["name"]: idx for idx, doc in enumerate(docs)}
+        self._doc_lengths = doc_lengths
+        self._avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        self._postings = dict(postings)
+        self._max_likes = max((doc["likes"] for doc in docs), default=0)
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def invalidate(self):
+        """标记索引失效，下次查询时重新加载"""
+        with self._lock:
+            self._loaded = False
+
+    def update_likes(self, name: str, likes: int):
+        """原地更新某条记录的点赞数
+
+        Args:
+            name: 记录名称
+            likes: 新的点赞数
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            doc_idx = self._name_to_doc.get(name)
+            if doc_idx is None:
+                # 新记录，需要重建索引
+                self._loaded = False
+                return
+            self._docs[doc_idx]["likes"] = likes
+            self._max_likes = max(self._max_likes, likes)
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """按用户问题检索相关记录，相关度与点赞数加权排序
+
+        Args:
+            query: 用户问题
+            top_k: 返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 记录列表，格式为 [{"name": "", "content": "", "score": 0.0}]
+        """
+        self._ensure_loaded()
+        docs = self._docs
+        if not docs or top_k <= 0:
+            return []
+
+        # 累积BM25分数，只遍历命中词的倒排列表
+        num_docs = len(docs)
+        avg_length = self._avg_doc_length or 1.0
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._doc_lengths[doc_idx] / avg_length)
+                scores[doc_idx] += idf * tf * (_BM25_K1 + 1) / (tf + norm)
+
+        likes_norm = math.log1p(self._max_likes) or 1.0
+
+        def likes_score(doc_idx):
+            return math.log1p(docs[doc_idx]["likes"]) / likes_norm
+
+        if scores:
+            max_score = max(scores.values())
+            ranked = heapq.nlargest(
+                top_k,
+                ((score / max_score + RETRIEVAL_LIKES_WEIGHT * likes_score(doc_idx), doc_idx) for doc_idx, score in scores.items())
+            )
+        else:
+            # 没有任何命中时，退化为按点赞数排序
+            ranked = heapq.nlargest(
+                top_k,
+                ((RETRIEVAL_LIKES_WEIGHT * likes_score(doc_idx), doc_idx) for doc_idx in range(num_docs))
+            )
+
+        return [{
+            "name": docs[doc_idx]["name"],
+            "content": docs[doc_idx]["content"],
+            "score": round(score, 4)
+        } for score, doc_idx in ranked]
+
+
+freeshot_index = RetrievalIndex('freeshots')
+term_index = RetrievalIndex('terms')
+
+
+def get_index(term_type: str) -> Optional[RetrievalIndex]:
+    """根据类型获取检索索引
+
+    Args:
+        term_type: 'freeshot' 或 'term'
+    """
+    if term_type == 'freeshot':
+        return freeshot_index
+    if term_type == 'term':
+        return term_index
+    return None
@@ -0,0 +1,221 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+from config.constants import (
+    SESSION_CACHE_SIZE, SESSION_TTL, SESSION_SPILL_ENABLED, SESSION_SPILL_DB_PATH, SESSION_SPILL_TTL
+)
+
+
+class SessionNotFoundError(Exception):
+    """会话不存在或已过期，客户端需要重新提交完整历史和元数据"""
+    pass
+
+
+def metadata_hash(metadata: Dict[str, Any]) -> str:
+    """计算元数据（ddl、freeshot、term）的指纹，用于判断是否需要重建系统提示词"""
+    return hashlib.sha1(json.dumps(metadata, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ConversationSession:
+    """一次对话的服务端状态：历史消息、元数据上下文和已构建的系统提示词
+
+    messages 不包含系统提示词；system_prompts 按Agent类型（sql、feedback）缓存，元数据变化时清空。
+    同一会话的请求通过 lock 串行处理。
+    """
+
+    def __init__(self, conversation_id: str, messages: List[Dict] = None, metadata: Dict[str, Any] = None,
+                 system_prompts: Dict[str, str] = None, updated_at: float = None):
+        self.conversation_id = conversation_id
+        self.messages = messages or []
+        self.metadata = metadata or {"ddl": [], "freeshot": [], "term": []}
+        self.metadata_hash = metadata_hash(self.metadata)
+        self.system_prompts = system_prompts or {}
+        self.updated_at = updated_at or time.time()
+        self.lock = threading.Lock()
+
+    def set_metadata(self, metadata: Dict[str, Any]) -> bool:
+        """更新元数据上下文
+
+        Returns:
+            bool: 元数据是否发生变化
+        """
+        metadata = {
+            "ddl": metadata.get("ddl", []),
+            "freeshot": metadata.get("freeshot", []),
+            "term": metadata.get("term", [])
+        }
+        new_hash = metadata_hash(metadata)
+        if new_hash == self.metadata_hash:
+            return False
+        self.metadata = metadata
+        self.metadata_hash = new_hash
+        self.system_prompts = {}
+        return True
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "messages": self.messages,
+            "metadata": self.metadata,
+            "system_prompts": self.system_prompts
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, conversation_id: str, payload: str, updated_at: float) -> "ConversationSession":
+        data = json.loads(payload)
+        return cls(conversation_id, data.get("messages"), data.get("metadata"), data.get("system_prompts"), updated_at)
+
+
+class SessionStore:
+    """会话存储，内存中按LRU和闲置时间淘汰，淘汰的会话可写入SQLite，再次访问时加载回内存"""
+
+    def __init__(self, maxsize: int = SESSION_CACHE_SIZE, ttl: float = SESSION_TTL,
+                 spill_db_path: Optional[str] = SESSION_SPILL_DB_PATH if SESSION_SPILL_ENABLED else None,
+                 spill_ttl: float = SESSION_SPILL_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.spill_db_path = spill_db_path
+        self.spill_ttl = spill_ttl
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill_initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.spill_db_path)
+        if not self._spill_initialized:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                conversation_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+            conn.commit()
+            self._spill_initialized = True
+        return conn
+
+    def _spill(self, sessions: List[ConversationSession]):
+        """将淘汰的会话写入SQLite，并清理过期记录"""
+        if not self.spill_db_path or not sessions:
+            return
+        conn = None
+        try:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions (conversation_id, payload, updated_at) VALUES (?, ?, ?)",
+                [(session.conversation_id, session.to_json(), session.updated_at) for session in sessions]
+            )
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.spill_ttl,))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"会话写入SQLite失败: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _load_spilled(self, conversation_id: str) -> Optional[ConversationSession]:
+        """从SQLite加载会话；记录保留到会话被删除或过期，再次淘汰时覆盖，同一会话的并发请求和其他worker进程都能加载"""
+        if not self.spill_db_path:
+            return None
+        conn = None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, updated_at FROM sessions WHERE conversation_id = ? AND updated_at >= ?",
+                (conversation_id, time.time() - self.spill_ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            return ConversationSession.from_json(conversation_id, row[0], row[1])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"从SQLite加载会话失败: {str(e)}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def _collect_evicted(self) -> List[ConversationSession]:
+        """移出闲置超时和超出容量的会话，调用方需持有锁"""
+        evicted = []
+        deadline = time.time() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.updated_at >= deadline and len(self._sessions) <= self.maxsize:
+                break
+            evicted.append(self._sessions.popitem(last=False)[1])
+        return evicted
+
+    def get(self, conversation_id: str) -> Optional[ConversationSession]:
+        """获取会话，内存中不存在时尝试从SQLite加载
+
+        Returns:
+            Optional[ConversationSession]: 会话，不存在或已过期时返回None
+        """
+        with self._lock:
+            evicted = self._collect_evicted()
+            session = self._sessions.get(conversation_id)
+            if session is not None:
+                session.updated_at = time.time()
+                self._sessions.move_to_end(conversation_id)
+        self._spill(evicted)
+        if session is not None:
+            return session
+
+        session = self._load_spilled(conversation_id)
+        if session is None:
+            return None
+        session.updated_at = time.time()
+        with self._lock:
+            # 同一会话的并发请求可能已先加载，使用内存中的会话对象，保证共用同一把会话锁
+            existing = self._sessions.get(conversation_id)
+            if existing is not None:
+                session = existing
+            else:
+                self._sessions[conversation_id] = session
+            self._sessions.move_to_end(conversation_id)
+            evicted = self._collect_evicted()
+        self._spill(evicted)
+        return session
+
+    def create(self, conversation_id: str, messages: List[Dict] = None, metadata: Dict[str, Any] = None) -> ConversationSession:
+        """创建（或覆盖）会话"""
+        session = ConversationSession(conversation_id, list(messages or []))
+        if metadata is not None:
+            session.set_metadata(metadata)
+        self.save(session)
+        return session
+
+    def save(self, session: ConversationSession):
+        """保存会话并刷新其闲置时间"""
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions[session.conversation_id] = session
+            self._sessions.move_to_end(session.conversation_id)
+            evicted = self._collect_evicted()
+        self._spill(evicted)
+
+    def delete(self, conversation_id: str):
+        """删除会话"""
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+        if self.spill_db_path:
+            conn = None
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM sessions WHERE conversation_id = ?", (conversation_id,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"删除会话失败: {str(e)}")
+            finally:
+                if conn:
+                    conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+session_store = SessionStore()
@@ -0,0 +1,131 @@
+import base64
+import fcntl
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+from socketio import PubSubManager
+from config.constants import (
+    SOCKETIO_ASYNC_MODE, SOCKETIO_MESSAGE_QUEUE, SOCKETIO_TRANSPORTS, SOCKETIO_QUEUE_MAX_BYTES
+)
+
+FILE_QUEUE_SCHEME = "file://"
+
+
+class FileQueueManager(PubSubManager):
+    """
+    基于追加写文件的Socket.IO消息队列，用于单机多进程部署时在各worker之间转发推送
+
+    每个进程把要推送的消息追加到同一个文件，后台任务从文件末尾开始读取其他进程写入的消息并发送给本进程的连接；
+    文件超过max_bytes时改名为<文件名>.1并从新文件继续写入，读取方读完旧文件后切换到新文件
+    （读取落后超过两个文件时会丢失更早的消息）。
+    多台机器部署时应改用Redis等消息队列（--message-queue redis://...）
+    """
+
+    name = "file"
+
+    def __init__(self, url: str, channel: str = "socketio", write_only: bool = False, logger=None,
+                 poll_interval: float = 0.05, max_bytes: int = SOCKETIO_QUEUE_MAX_BYTES):
+        self.path = url[len(FILE_QUEUE_SCHEME):] if url.startswith(FILE_QUEUE_SCHEME) else url
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _publish(self, data: Dict[str, Any]):
+        line = base64.b64encode(pickle.dumps(data)) + b"\n"
+        # O_APPEND保证多个进程的单次写入不会相互覆盖
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+            if self.max_bytes and os.fstat(fd).st_size > self.max_bytes:
+                self._rotate(fd)
+        finally:
+            os.close(fd)
+
+    def _rotate(self, fd: int):
+        """把已写满的队列文件改名为<文件名>.1，加文件锁避免多个进程重复轮转"""
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            # 其他进程已经轮转过时，当前路径指向的是新文件
+            if stat.st_ino == os.fstat(fd).st_ino and stat.st_size > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+
+    @staticmethod
+    def _inode(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _next_file(self, f) -> Optional[str]:
+        """当前文件已读完时，返回轮转后应继续读取的文件；没有轮转或新文件尚未创建时返回None"""
+        inode = os.fstat(f.fileno()).st_ino
+        rotated_path = self.path + ".1"
+        if self._inode(self.path) == inode:
+            return None
+        if self._inode(rotated_path) == inode:
+            return self.path if self._inode(self.path) is not None else None
+        # 读取期间已轮转两次，先读<文件名>.1（更早的文件已被覆盖）
+        return rotated_path if self._inode(rotated_path) is not None else None
+
+    def _listen(self):
+        # 只转发启动之后写入的消息
+        open(self.path, "ab").close()
+        f = open(self.path, "rb")
+        f.seek(0, os.SEEK_END)
+        pending = b""
+        try:
+            while True:
+                chunk = f.readline()
+                if not chunk:
+                    next_path = self._next_file(f)
+                    if next_path:
+                        # 旧文件已读完，从头读取轮转后的文件
+                        f.close()
+                        f = open(next_path, "rb")
+                        pending = b""
+                        continue
+                    time.sleep(self.poll_interval)
+                    continue
+                pending += chunk
+                if not pending.endswith(b"\n"):
+                    # 另一个进程的写入尚未完成
+                    continue
+                line, pending = pending, b""
+                try:
+                    yield pickle.loads(base64.b64decode(line))
+                except Exception as e:
+                    print(f"解析Socket.IO队列消息失败: {str(e)}")
+        finally:
+            f.close()
+
+
+def get_socketio_options(async_mode: Optional[str] = SOCKETIO_ASYNC_MODE,
+                         message_queue: Optional[str] = SOCKETIO_MESSAGE_QUEUE,
+                         transports: Optional[str] = SOCKETIO_TRANSPORTS) -> Dict[str, Any]:
+    """
+    根据运行模式构建SocketIO.init_app的参数
+
+    Args:
+        async_mode: threading、gevent或eventlet，为空时由Flask-SocketIO自动选择
+        message_queue: 消息队列地址，file://开头使用本地文件队列，其他地址（redis://等）交给Flask-SocketIO处理
+        transports: 逗号分隔的传输方式，为空时允许长轮询和WebSocket
+
+    Returns:
+        Dict[str, Any]: init_app的关键字参数
+    """
+    options: Dict[str, Any] = {}
+    if async_mode:
+        options["async_mode"] = async_mode
+    if message_queue:
+        if message_queue.startswith(FILE_QUEUE_SCHEME):
+            options["client_manager"] = FileQueueManager(message_queue)
+        else:
+            options["message_queue"] = message_queue
+    if transports:
+        options["transports"] = [transport.strip() for transport in transports.split(",") if transport.strip()]
+    return options
@@ -1,19 +1,38 @@
 import json
 import traceback
 from typing import Dict, List, Any, Optional, Union
-from services.logger import broadcast_log,broadcast_stream_log
+from services.logger import broadcast_log,broadcast_stream_log,end_stream_log
 from services.llm_service import get_client
 from services.llm_config import get_model
 from services.prompt_manager import PromptManager
+from services.context_packer import pack_context, format_pack_report
+from services.history_compactor import compact_history, latest_tool_round_start
 from services.tool_registry import ToolRegistry
+from services.tool_executor import execute_tool_calls, submit_speculative
+from services.stream_assembler import StreamAssembler
 from services.sql_tools import SQLTools
 from services.sql_executor import SQLExecutor
+from services.db_service import is_select_sql
+from services.tracing import traced
+from initial.config import get_config_snapshot
+from config.constants import AGENT_SPECULATIVE_TOOLS
+
+
+def _speculative_tools_enabled() -> bool:
+    """是否开启只读工具的提前执行，配置项agent_speculative_tools优先于默认值"""
+    value = get_config_snapshot().get("agent_speculative_tools")
+    if value is None:
+        return AGENT_SPECULATIVE_TOOLS
+    return value.strip().lower() in ("true", "1", "yes", "on")
 
 
 class SQLAgent:
     """基于ReAct范式的SQL智能体，可以执行SQL并分析结果，处理错误并自动修正"""
     
-    def __init__(self, ddl: List = None, freeshot: List = None, term: List = None, messages: List = None):
+    # 最大轮次，防止无限循环
+    max_turns = 10
+    
+    def __init__(self, ddl: List = None, freeshot: List = None, term: List = None, messages: List = None, system_prompt: str = None):
         """初始化SQLAgent
         
         Args:
@@ -21,22 +40,40 @@ class SQLAgent:
             freeshot: 相似查询示例
             term: 术语解释
             messages: 历史对话消息
+            system_prompt: 已构建的系统提示词（来自会话缓存），提供时不再裁剪元数据和构建提示词
         """
         self.ddl = ddl or []
         self.freeshot = freeshot or []
         self.term = term or []
+        self.system_prompt = system_prompt
         self.messages = messages
         self.thought = ""
         self.sql = ""
         self.result = None
         self.error = None
+        # 本轮提前执行的只读工具调用，按工具调用index存放
+        self._speculative = {}
         
         # 初始化系统消息
         self._init_messages()
+        # 历史过长时压缩较早轮次的工具结果
+        self._compact_history()
     
     def _init_messages(self):
         """初始化消息列表，添加系统提示和历史消息"""
 
+        if self.system_prompt:
+            # 会话缓存的提示词可能是几天前构建的，刷新其中的当前日期和时间
+            self.system_prompt = PromptManager.refresh_time_info(self.system_prompt)
+            self.messages.insert(0, {"role": "system", "content": self.system_prompt})
+            return
+
+        # 按token预算和相关度裁剪元数据
+        packed = pack_context(self.ddl, self.freeshot, self.term)
+        self.ddl, self.freeshot, self.term = packed["ddl"], packed["freeshot"], packed["term"]
+        if packed["dropped"]:
+            broadcast_log("ai", format_pack_report(packed), "SQLAgent-元数据超出预算，已裁剪")
+
         # 添加元数据信息（ddl、freeshot、term）
         metadata_parts = []
         
@@ -74,12 +111,29 @@ class SQLAgent:
         system_content = PromptManager.build_sql_agent_prompt(metadata_content)
         broadcast_log("ai", "", "SQLAgent-构建Agent角色提示词")
         
+        self.system_prompt = system_content
+        
         # 添加系统提示
         self.messages.insert(0, {
             "role": "system",
             "content": system_content
         })
     
+    def _compact_history(self, current_turn: int = 0):
+        """对话历史超过token阈值时，将较早的工具调用结果替换为摘要
+
+        Args:
+            current_turn: 工具调用循环中的轮次，为0时（构造时）当前问题的消息保持原样；
+                大于0时当前问题中较早的工具调用结果也可压缩，只保留最近一次工具调用的结果
+        """
+        if current_turn:
+            compacted, saved = compact_history(self.messages, protect_from=latest_tool_round_start(self.messages))
+        else:
+            compacted, saved = compact_history(self.messages)
+        if compacted:
+            summary = f"SQLAgent-R{current_turn}:对话历史已压缩" if current_turn else "SQLAgent-对话历史已压缩"
+            broadcast_log("ai", f"压缩了{compacted}条工具调用结果，节省约{saved}个token", summary)
+    
     def _add_user_message(self, content: str):
         """添加用户消息"""
         self.messages.append({"role": "user", "content": content})
@@ -109,6 +163,186 @@ class SQLAgent:
         self.messages.append(message)
     
 
+    def _completion_kwargs(self, functions: List[Dict]) -> Dict:
+        """构建流式调用模型的参数"""
+        return {
+            "model": get_model(),
+            "messages": self.messages,
+            "tools": [{"type": "function", "function": func} for func in functions],
+            "tool_choice": "auto",
+            "temperature": 0,
+            "stream": True
+        }
+    
+    def _new_turn_state(self, current_turn: int) -> Dict:
+        """创建一轮流式响应的累积状态"""
+        self._speculative = {}
+        assembler = StreamAssembler()
+        if _speculative_tools_enabled():
+            assembler.on_tool_call = lambda tool_call: self._speculate(assembler, tool_call, current_turn)
+        return {"assembler": assembler, "final_response": None}
+    
+    def _speculate(self, assembler: StreamAssembler, tool_call, current_turn: int):
+        """模型仍在输出时，提前执行参数已完整的只读工具调用
+        
+        只有同一轮中之前的调用都已确定且都是只读工具时才提前执行，避免读操作越过之前的写操作；
+        SQL执行工具只提前执行SELECT/WITH查询
+        """
+        name = tool_call.function.name
+        if not ToolRegistry.is_read_only(name):
+            return
+        preceding = assembler.preceding_tool_names(tool_call.index)
+        if preceding is None or not all(ToolRegistry.is_read_only(previous) for previous in preceding):
+            return
+        args = tool_call.parsed_arguments
+        if name == "tool_execute_sql_and_fetch_top_10" and not (isinstance(args, dict) and is_select_sql(args.get("sql"))):
+            return
+        broadcast_log("ai", tool_call.function.arguments, f"SQLAgent-R{current_turn}:提前执行{tool_call.function.name}")
+        self._speculative[tool_call.index] = {
+            "name": tool_call.function.name,
+            "args": tool_call.parsed_arguments,
+            "future": submit_speculative(lambda call: self._run_tool_call(call, current_turn), tool_call)
+        }
+    
+    def _take_speculative_outcome(self, tool_call, current_turn: int) -> Optional[Dict]:
+        """取出提前执行的结果，最终参数与提前执行时不一致则丢弃
+        
+        Returns:
+            Optional[Dict]: 可复用的执行结果，没有则返回None
+        """
+        speculation = self._speculative.pop(getattr(tool_call, 'index', None), None)
+        if speculation is None:
+            return None
+        if speculation["name"] != tool_call.function.name or speculation["args"] != getattr(tool_call, 'parsed_arguments', None):
+            speculation["future"].cancel()
+            broadcast_log("ai", tool_call.function.arguments, f"SQLAgent-R{current_turn}:最终参数已变化，丢弃提前执行结果")
+            return None
+        return speculation["future"].result()
+    
+    def _process_chunk(self, state: Dict, chunk, current_turn: int):
+        """处理一个流式响应块，累积内容和工具调用
+        
+        Args:
+            state: 本轮累积状态，包含流式响应组装器assembler
+            chunk: 流式响应块
+            current_turn: 当前轮次
+        """
+        assembler = state["assembler"]
+        content = assembler.feed(chunk)
+        if content:
+            # 实时广播每个token（使用流式日志）
+            broadcast_stream_log("ai", content, f"SQLAgent-R{current_turn}:流式输出", is_first=(assembler.content_length == len(content)))
+    
+    def _finish_turn(self, state: Dict, current_turn: int) -> List:
+        """结束一轮流式响应，返回本轮需要执行的工具调用
+        
+        Returns:
+            List: 工具调用列表；为空表示模型已给出最终回答，此时state["final_response"]为回答内容
+        """
+        end_stream_log("ai", f"SQLAgent-R{current_turn}:流式输出")
+        content, tool_calls = state["assembler"].finish()
+        if content:
+            broadcast_log("ai", content, f"SQLAgent-R{current_turn}:完整响应")
+        
+        # 检查是否有工具调用
+        if tool_calls:
+            # 处理工具调用
+            tool_message = ("调用工具-{tool_name}-参数-{tool_args}").format(tool_name=tool_calls[0].function.name, tool_args=tool_calls[0].function.arguments)
+            self._add_assistant_message(tool_message)
+            return tool_calls
+        
+        # 没有工具调用
+        final_response = content or None
+        broadcast_log("ai", final_response, "SQLAgent-推理结束")
+        state["final_response"] = final_response
+        self._add_assistant_message(final_response)
+        return []
+    
+    def _run_tool_call(self, tool_call, current_turn: int) -> Optional[Dict]:
+        """执行单个工具调用，可能在工具线程池中并行执行，因此不修改消息列表
+        
+        Args:
+            tool_call: 模型返回的工具调用
+            current_turn: 当前轮次
+            
+        Returns:
+            Optional[Dict]: {"name": 函数名称, "args": 参数, "result": 返回内容}，函数名称为空时返回None
+        """
+        function_name = tool_call.function.name if hasattr(tool_call.function, 'name') and tool_call.function.name else ""
+        if not function_name:
+            print(f"Warning: function name is empty or None, arguments: {tool_call.function.arguments if hasattr(tool_call.function, 'arguments') else 'None'}")
+            return None
+        function_args = json.loads(tool_call.function.arguments)
+        result = None
+        
+        # 执行函数
+        if function_name == "tool_execute_sql_and_fetch_top_10":
+            sql = function_args.get("sql", "")
+            result = SQLTools.tool_execute_sql_and_fetch_top_10(sql)
+            broadcast_log("ai", result, "SQLAgent-R{current_turn}-已执行SQL".format(current_turn=current_turn))
+        elif function_name == "tool_get_table_schema":
+            table_name = function_args.get("table_name", "")
+            result = SQLTools.tool_get_table_schema(table_name)                   
+            broadcast_log("ai", result, "SQLAgent-R{current_turn}-已重新召回完整表信息".format(current_turn=current_turn))
+        elif function_name == "tool_update_metadata_description":
+            table_name = function_args.get("table_name", "")
+            column_name = function_args.get("column_name", "")
+            enum_value = function_args.get("enum_value", "")
+            description = function_args.get("description", "")
+            result = SQLTools.tool_update_metadata_description(table_name, column_name, enum_value, description)
+            broadcast_log("ai", result, "SQLAgent-R{current_turn}:已更新表信息".format(current_turn=current_turn))
+        elif function_name == "tool_get_all_tables":
+            result = SQLTools.tool_get_all_tables()
+            broadcast_log("ai", result, "SQLAgent-R{current_turn}:已获取当前所有表信息".format(current_turn=current_turn))
+        else:
+            return None
+        return {"name": function_name, "args": function_args, "result": result}
+    
+    def _execute_tool_calls(self, tool_calls: List, current_turn: int):
+        """执行本轮全部工具调用，只读工具并行执行，并按原顺序将结果添加到消息列表
+        
+        Args:
+            tool_calls: 模型返回的工具调用列表
+            current_turn: 当前轮次
+        """
+        def run(tool_call):
+            outcome = self._take_speculative_outcome(tool_call, current_turn)
+            return outcome if outcome is not None else self._run_tool_call(tool_call, current_turn)
+        
+        outcomes = execute_tool_calls(tool_calls, run)
+        for tool_call, outcome in zip(tool_calls, outcomes):
+            if outcome is None:
+                continue
+            if outcome["name"] == "tool_execute_sql_and_fetch_top_10":
+                self.sql = outcome["args"].get("sql", "")
+                self.result = outcome["result"]
+            # 添加函数结果消息
+            self._add_function_message(outcome["name"], outcome["result"], tool_call.id)
+    
+    def _build_result(self, final_response: Optional[str]) -> Dict:
+        """构建返回结果"""
+        # 提取思考过程和SQL
+        thought = final_response or ""
+        
+        # 返回结果
+        return {
+            "content": thought,
+            "sql": self.sql,
+            "result": self.result
+        }
+    
+    def _build_error_result(self, e: Exception) -> Dict:
+        """发生错误时返回错误信息并打印堆栈跟踪"""
+        print(f"Error in SQLAgent: {str(e)}")
+        traceback.print_exc()
+        return {
+            "content": f"执行过程中发生错误: {str(e)}",
+            "sql": self.sql,
+            "result": None,
+            "error": str(e)
+        }
+
+    @traced("sql_agent.generate", "chatbi_stage_duration_seconds", stage="sql_agent")
     def generate(self) -> Dict:
         """生成SQL并执行
         
@@ -123,154 +357,36 @@ class SQLAgent:
             client = get_client()
             broadcast_log("ai", "", "SQLAgent-推理中...")
             
-            # 设置最大轮次，防止无限循环
-            max_turns = 10
             current_turn = 0
             final_response = None
             
-            while current_turn < max_turns:
+            while current_turn < self.max_turns:
                 current_turn += 1
+                if current_turn > 1:
+                    # 工具调用结果在循环中累积，每次调用模型前检查token阈值
+                    self._compact_history(current_turn)
                 
                 # 调用模型（流式输出）
-                stream = client.chat.completions.create(
-                    model=get_model(),
-                    messages=self.messages,
-                    tools=[{"type": "function", "function": func} for func in functions],
-                    tool_choice="auto",
-                    temperature=0,
-                    stream=True
-                )
+                stream = client.chat.completions.create(**self._completion_kwargs(functions))
                 
                 # 用于累积完整响应的变量
-                collected_message = None
-                collected_content = ""
+                state = self._new_turn_state(current_turn)
                 
                 # 处理流式响应
                 for chunk in stream:
-                    delta = chunk.choices[0].delta
-                    
-                    # 如果是第一个包含消息的块，初始化message对象
-                    if not collected_message and hasattr(delta, 'role'):
-                        collected_message = delta
-                    
-                    # 累积内容
-                    if hasattr(delta, 'content') and delta.content:
-                        collected_content += delta.content
-                        # 实时广播每个token（使用流式日志）
-                        broadcast_stream_log("ai", delta.content, f"SQLAgent-R{current_turn}:流式输出", is_first=(len(collected_content) == len(delta.content)))
-                    
-                    # 处理工具调用
-                    try:
-                        if hasattr(delta, 'tool_calls') and delta.tool_calls and hasattr(delta.tool_calls, '__iter__'):
-                            # 确保collected_message有tool_calls属性
-                            if not hasattr(collected_message, 'tool_calls'):
-                                collected_message.tool_calls = []
-                            
-                            for tool_call in delta.tool_calls:
-                                # 确保collected_message.tool_calls不为None
-                                if collected_message.tool_calls is None:
-                                    collected_message.tool_calls = []
-                                
-                                # 查找或创建对应的工具调用
-                                existing_call = next((t for t in collected_message.tool_calls if t.index == tool_call.index), None)
-                                if not existing_call:
-                                    collected_message.tool_calls.append(tool_call)
-                                else:
-                                    # 更新现有工具调用
-                                    if hasattr(tool_call, 'function'):
-                                        if not hasattr(existing_call, 'function'):
-                                            existing_call.function = tool_call.function
-                                        else:
-                                            if hasattr(tool_call.function, 'name') and tool_call.function.name:
-                                                existing_call.function.name = tool_call.function.name
-                                            if hasattr(tool_call.function, 'arguments'):
-                                                if not hasattr(existing_call.function, 'arguments'):
-                                                    existing_call.function.arguments = tool_call.function.arguments
-                                                else:
-                                                    existing_call.function.arguments += tool_call.function.arguments
-                    except Exception as e:
-                        # 打印完整的堆栈跟踪
-                        print(f"Error processing tool calls: {str(e)}")
-                        traceback.print_exc()
+                    self._process_chunk(state, chunk, current_turn)
                 
-                # 设置最终消息
-                message = collected_message
-                if collected_content:
-                    message.content = collected_content
-                    broadcast_log("ai", collected_content, f"SQLAgent-R{current_turn}:完整响应")
-                
-                # 检查是否有工具调用
-                if hasattr(message, 'tool_calls') and message.tool_calls:
-                    # 处理工具调用
-                    tool_name = message.tool_calls[0].function.name if hasattr(message.tool_calls[0], 'function') and hasattr(message.tool_calls[0].function, 'name') else ""
-                    tool_args = message.tool_calls[0].function.arguments if hasattr(message.tool_calls[0], 'function') and hasattr(message.tool_calls[0].function, 'arguments') else ""
-                    tool_message = ("调用工具-{tool_name}-参数-{tool_args}").format(tool_name=tool_name, tool_args=tool_args)
-                    self._add_assistant_message(tool_message)
-                    
-                    for tool_call in message.tool_calls:
-                        function_name = tool_call.function.name if hasattr(tool_call.function, 'name') and tool_call.function.name else ""
-                        if not function_name:
-                            print(f"Warning: function name is empty or None, arguments: {tool_call.function.arguments if hasattr(tool_call.function, 'arguments') else 'None'}")
-                            continue
-                        function_args = json.loads(tool_call.function.arguments)
-                        
-                        # 执行函数
-                        if function_name == "tool_execute_sql_and_fetch_top_10":
-                            sql = function_args.get("sql", "")
-                            result = SQLTools.tool_execute_sql_and_fetch_top_10(sql)
-                            self.sql = sql
-                            self.result = result
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, "SQLAgent-R{current_turn}-已执行SQL".format(current_turn=current_turn))
-                            self._add_function_message(function_name, result, tool_call.id)
-                        elif function_name == "tool_get_table_schema":
-                            table_name = function_args.get("table_name", "")
-                            result = SQLTools.tool_get_table_schema(table_name)                   
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, "SQLAgent-R{current_turn}-已重新召回完整表信息".format(current_turn=current_turn))
-                            self._add_function_message(function_name, result, tool_call.id)
-                        elif function_name == "tool_update_metadata_description":
-                            table_name = function_args.get("table_name", "")
-                            column_name = function_args.get("column_name", "")
-                            enum_value = function_args.get("enum_value", "")
-                            description = function_args.get("description", "")
-                            result = SQLTools.tool_update_metadata_description(table_name, column_name, enum_value, description)
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, "SQLAgent-R{current_turn}:已更新表信息".format(current_turn=current_turn))
-                            self._add_function_message(function_name, result, tool_call.id)
-                        elif function_name == "tool_get_all_tables":
-                            result = SQLTools.tool_get_all_tables()
-                            # 添加函数结果消息
-                            broadcast_log("ai", result, "SQLAgent-R{current_turn}:已获取当前所有表信息".format(current_turn=current_turn))
-                            self._add_function_message(function_name, result, tool_call.id)
-                        
-                else:
-                    # 没有工具调用
-                    broadcast_log("ai", message.content, "SQLAgent-推理结束")
-                    final_response = message.content
-                    self._add_assistant_message(final_response)
+                tool_calls = self._finish_turn(state, current_turn)
+                if not tool_calls:
+                    final_response = state["final_response"]
                     break
+                
+                self._execute_tool_calls(tool_calls, current_turn)
             
-            # 提取思考过程和SQL
-            thought = final_response or ""
-            
-            # 返回结果
-            return {
-                "content": thought,
-                "sql": self.sql,
-                "result": self.result
-            }
+            return self._build_result(final_response)
         
         except Exception as e:
-            # 发生错误时返回错误信息并打印堆栈跟踪
-            print(f"Error in SQLAgent: {str(e)}")
-            traceback.print_exc()
-            return {
-                "content": f"执行过程中发生错误: {str(e)}",
-                "sql": self.sql,
-                "result": None,
-                "error": str(e)
-            }
+            return self._build_error_result(e)
 
 
 def generate_sql_with_agent(ddl: List = None, freeshot: List = None, term: List = None, messages: List = None) -> Dict:
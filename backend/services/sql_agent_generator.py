@@ -6,6 +6,7 @@ from services.llm_service import get_client
 from services.llm_config import get_model
 from services.prompt_manager import PromptManager
 from services.sql_agent import SQLAgent, generate_sql_with_agent
+from services.session_store import session_store, SessionNotFoundError
 
 
 def generate_sql_with_react_agent(ddl: List = None, freeshot: List = None, term: List = None, messages: List = None) -> Dict:
@@ -22,4 +23,52 @@ def generate_sql_with_react_agent(ddl: List = None, freeshot: List = None, term:
         Dict: 包含思考过程、SQL和执行结果的字典
     """
     # 调用SQLAgent生成SQL并执行
-    return generate_sql_with_agent(ddl, freeshot, term, messages)
\ No newline at end of file
+    return generate_sql_with_agent(ddl, freeshot, term, messages)
+
+
+def generate_sql_in_session(conversation_id: str, message: str = None, metadata: Dict = None, messages: List = None) -> Dict:
+    """
+    在服务端会话中使用SQLAgent生成SQL并执行
+
+    会话保存历史消息（包括工具调用结果）、元数据和已构建的系统提示词，客户端后续只需提交新的用户问题；
+    元数据有变化时才需要随请求提交。
+    
+    Args:
+        conversation_id: 会话ID
+        message: 新的用户问题
+        metadata: 元数据 {"ddl": [], "freeshot": [], "term": []}，未变化时可不传
+        messages: 完整历史消息，提供时以此重建会话（会话过期后由客户端重新提交）
+        
+    Returns:
+        Dict: 包含思考过程、SQL、执行结果和conversation_id的字典
+
+    Raises:
+        SessionNotFoundError: 会话不存在且未提供完整历史
+    """
+    if messages is not None:
+        session = session_store.create(conversation_id, messages, metadata or {})
+    else:
+        session = session_store.get(conversation_id)
+        if session is None:
+            raise SessionNotFoundError(conversation_id)
+
+    # 同一会话的请求串行处理，避免历史消息交错
+    with session.lock:
+        if metadata is not None:
+            session.set_metadata(metadata)
+        if message:
+            session.messages.append({"role": "user", "content": message})
+
+        agent = SQLAgent(
+            session.metadata["ddl"], session.metadata["freeshot"], session.metadata["term"],
+            list(session.messages), system_prompt=session.system_prompts.get("sql")
+        )
+        result = agent.generate()
+
+        # 保存构建好的系统提示词和本次产生的消息（去掉开头的系统提示词）
+        session.system_prompts["sql"] = agent.system_prompt
+        session.messages = agent.messages[1:]
+        session_store.save(session)
+
+    result["conversation_id"] = conversation_id
+    return result
@@ -2,12 +2,14 @@ import json
 from typing import Dict, List, Any, Optional, Union
 from services.db_service import execute_query, DatabaseError
 from services.logger import broadcast_log
+from services.tracing import traced
 
 
 class SQLExecutor:
     """SQL执行器类，封装SQL执行相关的逻辑"""
     
     @staticmethod
+    @traced("sql.execute", "chatbi_stage_duration_seconds", stage="sql_execute")
     def execute_sql(sql: str, limit: int = None) -> Dict:
         """执行SQL查询并返回结果
         
@@ -1,8 +1,9 @@
 import json
 from typing import Dict, List, Any, Optional, Union
-from services.db_service import execute_query, DatabaseError
+from services.db_service import execute_query, is_select_sql, DatabaseError
 from services.logger import broadcast_log
 from services.tool_registry import ToolRegistry
+from services.retriever import get_index
 import sqlite3
 from config.constants import METADATA_DB_PATH
 
@@ -12,7 +13,8 @@ class SQLTools:
     
     @staticmethod
     @ToolRegistry.register(
-        description="执行SQL查询并返回前10条结果，通常用来验证SQL使用，根据执行结果观察语法是否有问题，是否能查出结果，查不出则需要跟用户确认需求"
+        description="执行SQL查询并返回前10条结果，通常用来验证SQL使用，根据执行结果观察语法是否有问题，是否能查出结果，查不出则需要跟用户确认需求；只能执行SELECT或WITH查询",
+        read_only=True
     )
     def tool_execute_sql_and_fetch_top_10(sql: str) -> str:
         """执行SQL查询并返回最多10条数据
@@ -23,9 +25,15 @@ class SQLTools:
         Returns:
             str: JSON格式的字符串，包含执行结果或错误信息
         """
+        # 工具注册为只读，会与其他只读调用并行执行，因此只允许查询语句，并以只读方式执行
+        if not is_select_sql(sql):
+            return json.dumps({
+                "success": False,
+                "error": "只允许执行SELECT或WITH查询语句"
+            }, ensure_ascii=False)
         try:
             # 执行查询
-            result = execute_query('data', sql)
+            result = execute_query('data', sql, read_only=True)
             # 限制结果最多10条
             result = result[:10]
 
@@ -87,7 +95,8 @@ class SQLTools:
     
     @staticmethod
     @ToolRegistry.register(
-        description="获取指定表的结构信息"
+        description="获取指定表的结构信息",
+        read_only=True
     )
     def tool_get_table_schema(table_name: str) -> str:
         """获取表结构
@@ -229,7 +238,8 @@ class SQLTools:
     
     @staticmethod
     @ToolRegistry.register(
-        description="获取所有表及其描述信息"
+        description="获取所有表及其描述信息",
+        read_only=True
     )
     def tool_get_all_tables() -> str:
         """获取所有表及其描述信息
@@ -372,6 +382,9 @@ class SQLTools:
             conn.commit()
             conn.close()
             
+            # 同步更新内存检索索引中的点赞数
+            get_index(term_type).update_likes(term_name, new_likes)
+            
             return json.dumps({
                 "success": True,
                 "message": f"已更新{('自由查询示例' if term_type == 'freeshot' else '业务术语')} {term_name} 的点赞数为 {new_likes}"
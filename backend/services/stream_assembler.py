@@ -0,0 +1,175 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class AssembledFunction:
+    """组装完成的函数调用信息，字段与OpenAI返回的function对象一致"""
+
+    def __init__(self, name: str, arguments: str):
+        self.name = name
+        self.arguments = arguments
+
+
+class AssembledToolCall:
+    """组装完成的工具调用，字段与OpenAI返回的tool_call对象一致
+
+    parsed_arguments 为已解析的参数；参数不是合法JSON时为None
+    """
+
+    def __init__(self, index: int, id: Optional[str], name: str, arguments: str, parsed_arguments: Optional[Dict] = None):
+        self.index = index
+        self.id = id
+        self.type = "function"
+        self.function = AssembledFunction(name, arguments)
+        self.parsed_arguments = parsed_arguments
+
+
+class _ToolCallBuffer:
+    """单个工具调用的参数缓冲区，增量扫描JSON括号层级以判断参数是否完整"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.id = None
+        self.name = ""
+        self.argument_parts: List[str] = []
+        self.parsed_arguments = None
+        self.emitted = False
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._trailing = False
+
+    @property
+    def arguments(self) -> str:
+        return "".join(self.argument_parts)
+
+    def append_arguments(self, fragment: str) -> bool:
+        """追加参数片段
+
+        Returns:
+            bool: 追加后参数是否恰好构成一个完整的JSON值
+        """
+        self.argument_parts.append(fragment)
+        for ch in fragment:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._started and self._depth == 0:
+                    self._trailing = True
+                self._depth += 1
+                self._started = True
+            elif ch in "}]":
+                self._depth -= 1
+            elif not ch.isspace() and self._started and self._depth == 0:
+                # 顶层值结束后又出现了其他内容
+                self._trailing = True
+        return self._started and self._depth == 0 and not self._in_string and not self._trailing
+
+
+class StreamAssembler:
+    """流式响应组装器，供SQLAgent和FeedbackAgent共用
+
+    文本内容和工具调用参数均以列表累积、最后一次性拼接；工具调用按index存放在字典中。
+    某个工具调用的参数成为完整JSON时立即回调on_tool_call，调用方可以在流结束前开始执行。
+    """
+
+    def __init__(self, on_tool_call: Optional[Callable[[AssembledToolCall], Any]] = None):
+        """
+        Args:
+            on_tool_call: 工具调用参数完整时的回调，每个工具调用最多回调一次
+        """
+        self.on_tool_call = on_tool_call
+        self.content_length = 0
+        self._content_parts: List[str] = []
+        self._tool_calls: Dict[int, _ToolCallBuffer] = {}
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content_parts)
+
+    def feed(self, chunk) -> Optional[str]:
+        """处理一个流式响应块
+
+        Args:
+            chunk: 流式响应块
+
+        Returns:
+            Optional[str]: 本块新增的文本内容，没有则为None
+        """
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+
+        content = getattr(delta, "content", None)
+        if content:
+            self._content_parts.append(content)
+            self.content_length += len(content)
+
+        for tool_call_delta in getattr(delta, "tool_calls", None) or []:
+            self._feed_tool_call(tool_call_delta)
+
+        return content or None
+
+    def _feed_tool_call(self, tool_call_delta):
+        index = getattr(tool_call_delta, "index", None)
+        if index is None:
+            index = len(self._tool_calls)
+        buffer = self._tool_calls.get(index)
+        if buffer is None:
+            buffer = self._tool_calls[index] = _ToolCallBuffer(index)
+
+        if getattr(tool_call_delta, "id", None):
+            buffer.id = tool_call_delta.id
+        function = getattr(tool_call_delta, "function", None)
+        if function is None:
+            return
+        if getattr(function, "name", None):
+            buffer.name = function.name
+        fragment = getattr(function, "arguments", None)
+        if fragment and buffer.append_arguments(fragment) and not buffer.emitted and buffer.name:
+            try:
+                buffer.parsed_arguments = json.loads(buffer.arguments)
+            except ValueError:
+                return
+            buffer.emitted = True
+            if self.on_tool_call:
+                self.on_tool_call(self._build_tool_call(buffer))
+
+    def preceding_tool_names(self, index: int) -> Optional[List[str]]:
+        """index之前所有工具调用的名称；之前的调用尚未全部出现或名称未知时返回None"""
+        names = []
+        for previous in range(index):
+            buffer = self._tool_calls.get(previous)
+            if buffer is None or not buffer.name:
+                return None
+            names.append(buffer.name)
+        return names
+
+    @staticmethod
+    def _build_tool_call(buffer: _ToolCallBuffer) -> AssembledToolCall:
+        return AssembledToolCall(buffer.index, buffer.id, buffer.name, buffer.arguments, buffer.parsed_arguments)
+
+    def finish(self) -> Tuple[str, List[AssembledToolCall]]:
+        """结束流式响应
+
+        Returns:
+            Tuple[str, List[AssembledToolCall]]: (完整文本内容, 按index排序的工具调用列表)
+        """
+        tool_calls = []
+        for index in sorted(self._tool_calls):
+            buffer = self._tool_calls[index]
+            # 提前回调后仍可能收到后续片段，以最终参数为准重新解析
+            try:
+                buffer.parsed_arguments = json.loads(buffer.arguments)
+            except ValueError:
+                buffer.parsed_arguments = None
+            tool_calls.append(self._build_tool_call(buffer))
+        return self.content, tool_calls
@@ -0,0 +1,168 @@
+import threading
+import time
+from typing import Callable, Dict, Any, Hashable, List, Optional
+
+
+class StreamLogCoalescer:
+    """
+    合并流式日志的token：同一个流的token先缓冲，达到时间窗口或字符数阈值后作为一条stream_log发送，
+    避免每个token一次WebSocket推送
+
+    - 流的第一条消息保留is_first=True，之后的消息为False
+    - end()发送缓冲中剩余的token并标记is_last=True
+    - flush_prefix()立即发送流标识以指定前缀开头的缓冲，普通日志发送前调用以保持同一来源的日志顺序
+    - 开始后超过idle_timeout没有新token也没有结束的流（如出错中断）不再视为未结束
+    """
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None], flush_interval: float = 0.04, max_chars: int = 256,
+                 idle_timeout: float = 300):
+        """
+        Args:
+            emit: 发送一条合并后的日志，参数为log_data
+            flush_interval: 时间窗口（秒），缓冲中最早的token超过该时间即发送
+            max_chars: 缓冲字符数达到该值即发送
+            idle_timeout: 未结束的流超过该时间（秒）没有新token即清理
+        """
+        self._emit = emit
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self.idle_timeout = idle_timeout
+        # 发送在锁内进行，保证同一个流的消息按顺序到达
+        self._condition = threading.Condition()
+        # 流标识 -> {"log_type", "summary", "session_id", "request_id", "tokens", "size", "is_first", "started"}
+        self._buffers: Dict[Hashable, Dict[str, Any]] = {}
+        # 已开始但尚未结束的流 -> 最后一个token的时间
+        self._open_streams: Dict[Hashable, float] = {}
+        self._flusher: Optional[threading.Thread] = None
+
+    def add(self, key: Hashable, log_type: str, token: str, summary: str = "", is_first: bool = False,
+            session_id: Optional[str] = None, request_id: Optional[str] = None):
+        """缓冲一个token
+
+        Args:
+            key: 流标识，同一个流的token合并发送
+            log_type: 日志类型
+            token: token内容
+            summary: 日志摘要
+            is_first: 是否是流的第一个token，此时先发送该流之前未发送的缓冲
+            session_id: 日志所属的会话ID，随消息一起发送
+            request_id: 日志所属的请求ID，随消息一起发送
+        """
+        with self._condition:
+            now = time.monotonic()
+            if is_first:
+                self._send(key, is_last=False)
+                self._expire_idle(now)
+            if is_first or key in self._open_streams:
+                self._open_streams[key] = now
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = {
+                    "log_type": log_type,
+                    "summary": summary,
+                    "session_id": session_id,
+                    "request_id": request_id,
+                    "tokens": [],
+                    "size": 0,
+                    "is_first": is_first,
+                    "started": now
+                }
+                self._buffers[key] = buffer
+                self._condition.notify()
+            buffer["tokens"].append(token)
+            buffer["size"] += len(token)
+            if buffer["size"] >= self.max_chars or now - buffer["started"] >= self.flush_interval:
+                self._send(key, is_last=False)
+        self._ensure_flusher()
+
+    def end(self, key: Hashable, log_type: str, summary: str = "", session_id: Optional[str] = None,
+            request_id: Optional[str] = None):
+        """结束一个流：发送剩余缓冲并标记is_last；该流未输出过token时不发送"""
+        with self._condition:
+            if key not in self._open_streams and key not in self._buffers:
+                return
+            if key not in self._buffers:
+                # 缓冲已被定时发送，补一条空消息标记结束
+                self._buffers[key] = {
+                    "log_type": log_type,
+                    "summary": summary,
+                    "session_id": session_id,
+                    "request_id": request_id,
+                    "tokens": [],
+                    "size": 0,
+                    "is_first": False,
+                    "started": time.monotonic()
+                }
+            self._send(key, is_last=True)
+            self._open_streams.pop(key, None)
+
+    def flush_all(self):
+        """立即发送所有流的缓冲"""
+        with self._condition:
+            for key in list(self._buffers):
+                self._send(key, is_last=False)
+
+    def flush_prefix(self, prefix: tuple):
+        """立即发送流标识（元组）以prefix开头的缓冲，如同一会话、同一线程的所有流"""
+        with self._condition:
+            for key in [key for key in self._buffers if isinstance(key, tuple) and key[:len(prefix)] == prefix]:
+                self._send(key, is_last=False)
+
+    def pending(self) -> int:
+        """缓冲中的流数量"""
+        with self._condition:
+            return len(self._buffers)
+
+    def open_streams(self) -> int:
+        """已开始但尚未结束的流数量"""
+        with self._condition:
+            return len(self._open_streams)
+
+    def _expire_idle(self, now: float):
+        # 调用方需持有锁；出错中断、没有调用end()的流在超时后清理
+        for key in [key for key, last_active in self._open_streams.items() if now - last_active >= self.idle_timeout]:
+            self._send(key, is_last=False)
+            del self._open_streams[key]
+
+    def _send(self, key: Hashable, is_last: bool):
+        # 调用方需持有锁
+        buffer = self._buffers.pop(key, None)
+        if buffer is None:
+            return
+        self._emit({
+            "type": buffer["log_type"],
+            "message": "".join(buffer["tokens"]),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "summary": buffer["summary"],
+            "is_stream": True,
+            "is_first": buffer["is_first"],
+            "is_last": is_last,
+            "session_id": buffer["session_id"],
+            "request_id": buffer["request_id"]
+        })
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._condition:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="stream-log-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        """后台发送超过时间窗口的缓冲，覆盖流中途停顿（如等待工具调用）的情况"""
+        with self._condition:
+            while True:
+                if not self._buffers:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                oldest = min(buffer["started"] for buffer in self._buffers.values())
+                wait = oldest + self.flush_interval - now
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                expired: List[Hashable] = [key for key, buffer in self._buffers.items()
+                                           if now - buffer["started"] >= self.flush_interval]
+                for key in expired:
+                    self._send(key, is_last=False)
@@ -1,30 +1,24 @@
-import sqlite3
 from services.logger import broadcast_log
-from config.constants import METADATA_DB_PATH
+from services.retriever import term_index
+from services.tracing import traced
+from config.constants import TERM_TOP_K
 
+@traced("term.retrieve", "chatbi_stage_duration_seconds", stage="term")
 def generate_term_metadata_from_schema(schema_data):
     """
-    从数据库中获取业务术语数据
-    返回格式：[{"name": "高级用户", "content":"一般指等级大于3的用户"}]
+    根据用户问题从terms表中召回相关的业务术语，按相关度与点赞数排序
+    返回格式：[{"name": "高级用户", "content":"一般指等级大于3的用户", "score": 1.0}]
     """
     broadcast_log("system", "", "根据用户问题召回相关业务术语")
     
     try:
-        conn = sqlite3.connect(METADATA_DB_PATH)
-        cursor = conn.cursor()
-        
-        # 查询terms表，按likes降序排列
-        cursor.execute('SELECT name, content FROM terms ORDER BY likes DESC')
-        rows = cursor.fetchall()
-        
-        conn.close()
-        
-        # 转换为所需格式
-        return [{"name": row[0], "content": row[1]} for row in rows]
+        query = schema_data.get("query", "") if schema_data else ""
+        top_k = (schema_data or {}).get("top_k", TERM_TOP_K)
+        return term_index.search(query, top_k)
     except Exception as e:
         print(f"Error fetching term data: {e}")
         # 如果出错，返回默认数据
         return [
             {"name": "高级用户", "content":"一般指等级大于3的用户"},
             {"name": "普通用户", "content":"一般指等级大于1的用户"}
-        ]
\ No newline at end of file
+        ]
@@ -0,0 +1,66 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List
+from services.tool_registry import ToolRegistry
+from services.log_context import submit_with_context
+from config.constants import TOOL_CALL_WORKERS
+
+# 共享线程池，用于并行执行同一轮中的只读工具调用
+_executor = ThreadPoolExecutor(max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-call")
+# 独立线程池，用于在模型流式输出期间提前执行只读工具调用，避免与本轮正式执行互相占用线程
+_speculative_executor = ThreadPoolExecutor(max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-speculative")
+
+
+def _tool_name(tool_call) -> str:
+    function = getattr(tool_call, 'function', None)
+    return getattr(function, 'name', None) or ""
+
+
+def execute_tool_calls(tool_calls: List, run_tool_call: Callable[[Any], Any]) -> List[Any]:
+    """执行模型在同一轮返回的多个工具调用
+
+    连续的只读工具调用提交到线程池并行执行；写工具作为分隔点，在之前的只读调用全部完成后单独执行，
+    保证写操作之间、写操作与前后读操作之间的先后顺序与模型给出的顺序一致。
+
+    Args:
+        tool_calls: 模型返回的工具调用列表
+        run_tool_call: 执行单个工具调用的函数，返回值原样放入结果列表
+
+    Returns:
+        List[Any]: 与tool_calls一一对应、顺序相同的执行结果；任一调用抛出的异常会在此处重新抛出
+    """
+    results = [None] * len(tool_calls)
+    batch = []
+
+    def flush():
+        # 单个调用直接在当前线程执行，多个调用并行执行，结果按下标归位
+        if len(batch) == 1:
+            index, tool_call = batch[0]
+            results[index] = run_tool_call(tool_call)
+        elif batch:
+            futures = [(index, submit_with_context(_executor, run_tool_call, tool_call)) for index, tool_call in batch]
+            for index, future in futures:
+                results[index] = future.result()
+        batch.clear()
+
+    for index, tool_call in enumerate(tool_calls):
+        if ToolRegistry.is_read_only(_tool_name(tool_call)):
+            batch.append((index, tool_call))
+        else:
+            flush()
+            results[index] = run_tool_call(tool_call)
+    flush()
+
+    return results
+
+
+def submit_speculative(run_tool_call: Callable[[Any], Any], tool_call) -> Future:
+    """提交一个提前执行的只读工具调用
+
+    Args:
+        run_tool_call: 执行单个工具调用的函数
+        tool_call: 参数已完整的工具调用
+
+    Returns:
+        Future: 执行结果
+    """
+    return submit_with_context(_speculative_executor, run_tool_call, tool_call)
@@ -1,12 +1,14 @@
 from functools import wraps
 from typing import Dict, List, Any, Optional, Callable
 from inspect import signature, Parameter
+from services.tracing import span
 
 class ToolRegistry:
     """工具注册器类，用于管理和注册工具函数"""
     
     _instance = None
     _tools: Dict[str, Dict] = {}
+    _read_only: set = set()
     
     def __new__(cls):
         if cls._instance is None:
@@ -14,17 +16,19 @@ class ToolRegistry:
         return cls._instance
     
     @classmethod
-    def register(cls, name: Optional[str] = None, description: Optional[str] = None):
+    def register(cls, name: Optional[str] = None, description: Optional[str] = None, read_only: bool = False):
         """装饰器，用于注册工具函数
         
         Args:
             name: 工具名称，如果不提供则使用函数名
             description: 工具描述
+            read_only: 是否为只读工具，只读工具可与同一轮的其他只读调用并行执行，写工具串行执行
         """
         def decorator(func: Callable):
             @wraps(func)
             def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
+                with span("tool.call", "chatbi_tool_call_duration_seconds", tool=tool_name):
+                    return func(*args, **kwargs)
             
             # 获取函数名称
             tool_name = name or func.__name__
@@ -58,6 +62,10 @@ class ToolRegistry:
                     'required': required
                 }
             }
+            if read_only:
+                cls._read_only.add(tool_name)
+            else:
+                cls._read_only.discard(tool_name)
             
             return wrapper
         return decorator
@@ -72,7 +80,19 @@ class ToolRegistry:
         """根据名称列表获取注册的工具"""
         return [cls._tools[name] for name in names if name in cls._tools]
     
+    @classmethod
+    def is_read_only(cls, name: str) -> bool:
+        """工具是否为只读，未注册的工具按写工具处理"""
+        return name in cls._read_only
+    
+    @classmethod
+    def unregister(cls, name: str):
+        """移除指定名称的工具"""
+        cls._tools.pop(name, None)
+        cls._read_only.discard(name)
+    
     @classmethod
     def clear(cls):
         """清除所有注册的工具"""
-        cls._tools.clear()
\ No newline at end of file
+        cls._tools.clear()
+        cls._read_only.clear()
\ No newline at end of file
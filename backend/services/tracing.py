@@ -0,0 +1,265 @@
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from config.constants import TRACE_HISTORY_SIZE
+
+# 外部传入的请求ID最大长度
+MAX_REQUEST_ID_LENGTH = 128
+
+# 延迟直方图的默认桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 指标说明，用于/metrics中的HELP行
+METRIC_DESCRIPTIONS = {
+    "chatbi_http_request_duration_seconds": "HTTP请求耗时",
+    "chatbi_db_query_duration_seconds": "SQLite查询耗时",
+    "chatbi_embedding_duration_seconds": "向量嵌入接口耗时",
+    "chatbi_llm_ttft_seconds": "大模型流式响应首个token耗时",
+    "chatbi_llm_request_duration_seconds": "大模型请求总耗时",
+    "chatbi_tool_call_duration_seconds": "Agent工具调用耗时",
+    "chatbi_stage_duration_seconds": "处理阶段耗时",
+}
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, Any], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in items) + "}"
+
+
+class Histogram:
+    """Prometheus风格的累积直方图，按标签组合分别统计"""
+
+    def __init__(self, name: str, description: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description or name
+        self.buckets = tuple(sorted(buckets))
+        # 标签组合 -> [各桶计数, 总和, 次数]
+        self._series: Dict[Tuple[Tuple[str, Any], ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[Tuple[str, Any], ...], Dict[str, Any]]:
+        """各标签组合的统计：{"buckets": [...], "sum": 0.0, "count": 0}"""
+        with self._lock:
+            return {key: {"buckets": list(series[0]), "sum": series[1], "count": series[2]}
+                    for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', repr(float(bound))))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self._histograms: "OrderedDict[str, Histogram]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """获取直方图，不存在时创建"""
+        histogram = self._histograms.get(name)
+        if histogram is not None:
+            return histogram
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, METRIC_DESCRIPTIONS.get(name, ""), buckets)
+            return self._histograms[name]
+
+    def observe(self, name: str, value: float, **labels):
+        self.histogram(name).observe(value, **labels)
+
+    def render(self) -> str:
+        """Prometheus文本格式"""
+        with self._lock:
+            histograms = list(self._histograms.values())
+        lines = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class Span:
+    """一段计时区间，记录在所属请求的追踪中"""
+
+    def __init__(self, name: str, trace: Optional["Trace"], parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace = trace
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def finish(self, status: Optional[str] = None, metric: Optional[str] = None, **labels) -> float:
+        """结束计时，可同时把耗时记入直方图
+
+        Returns:
+            float: 耗时（秒）
+        """
+        if self.duration is not None:
+            return self.duration
+        self.duration = time.perf_counter() - self.start
+        if status:
+            self.status = status
+        if metric:
+            metrics.observe(metric, self.duration, **labels)
+        if self.trace is not None:
+            self.trace.add(self)
+        return self.duration
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start - trace_start) * 1000, 3),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    """一次请求的追踪，包含该请求（及其工作线程）中结束的所有span"""
+
+    def __init__(self, request_id: str, name: str = ""):
+        self.request_id = request_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "spans": [span.to_dict(self.start) for span in spans]
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+# 最近结束的请求追踪，按请求ID查询
+_recent_traces: "OrderedDict[str, Trace]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_trace(request_id: Optional[str] = None, name: str = "") -> contextvars.Token:
+    """开始当前上下文的请求追踪，返回用于end_trace的token；请求ID无效时重新生成"""
+    if not isinstance(request_id, str) or not request_id.strip() or len(request_id) > MAX_REQUEST_ID_LENGTH:
+        request_id = new_request_id()
+    return _current_trace.set(Trace(request_id.strip(), name))
+
+
+def end_trace(token: contextvars.Token) -> Optional[Trace]:
+    """结束请求追踪并保留在最近追踪中"""
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    trace.duration = time.perf_counter() - trace.start
+    with _recent_lock:
+        _recent_traces[trace.request_id] = trace
+        _recent_traces.move_to_end(trace.request_id)
+        while len(_recent_traces) > TRACE_HISTORY_SIZE:
+            _recent_traces.popitem(last=False)
+    return trace
+
+
+def get_trace(request_id: str) -> Optional[Dict[str, Any]]:
+    """查询最近结束的请求追踪"""
+    with _recent_lock:
+        trace = _recent_traces.get(request_id)
+    return trace.to_dict() if trace else None
+
+
+def get_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def start_span(name: str, **attributes) -> Span:
+    """开始一个span但不设为当前span，用于跨越多次调用的计时（如流式响应），需调用finish()结束"""
+    return Span(name, _current_trace.get(), _current_span.get(), attributes)
+
+
+@contextmanager
+def span(name: str, metric: Optional[str] = None, **labels):
+    """计时一段代码，嵌套的span以其为父节点；指定metric时耗时记入该直方图，labels同时作为直方图标签和span属性
+
+    labels应为低基数的值（如数据库名、工具名），避免直方图序列过多
+    """
+    current = start_span(name, **labels)
+    token = _current_span.set(current)
+    status = "ok"
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish(status, metric, **labels)
+
+
+def traced(name: str, metric: Optional[str] = None, **labels):
+    """装饰器版本的span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, metric, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -6,9 +6,10 @@ import sqlite3
 import time
 from config.constants import METADATA_DB_PATH, CHROMA_PERSIST_DIR
 from initial.config import get_config
+from services.tracing import span
 
 # 从配置服务获取火山引擎API配置
-from initial.config import get_embedding_config
+from initial.config import get_embedding_config, subscribe_config_changes
 
 # 自定义嵌入函数，使用火山引擎API
 class VolcanoEmbeddingFunction:
@@ -20,6 +21,8 @@ class VolcanoEmbeddingFunction:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        # 复用HTTP长连接
+        self.session = requests.Session()
     
     def __call__(self, input):
         print(f"Generating embeddings for {len(input)} documents")
@@ -35,13 +38,14 @@ class VolcanoEmbeddingFunction:
         }
         
         try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                data=json.dumps(payload)
-            )
-            response.raise_for_status()
-            result = response.json()
+            with span("embedding", "chatbi_embedding_duration_seconds", model=self.model):
+                response = self.session.post(
+                    self.api_url,
+                    headers=self.headers,
+                    data=json.dumps(payload)
+                )
+                response.raise_for_status()
+                result = response.json()
             
             # 提取嵌入向量
             embeddings = [item["embedding"] for item in result["data"]]
@@ -51,12 +55,28 @@ class VolcanoEmbeddingFunction:
             # 返回空向量作为fallback
             return [[0.0] * 2048] * len(input)
 
+# 当前嵌入函数，嵌入配置变更后重建
+_embedding_function = None
+
+def get_embedding_function():
+    global _embedding_function
+    if _embedding_function is None:
+        config = get_embedding_config()
+        _embedding_function = VolcanoEmbeddingFunction(config["api_key"], config["api_url"], config["model"])
+    return _embedding_function
+
+def _on_config_change(snapshot, changed_keys):
+    global _embedding_function
+    if any(key.startswith("embedding_") for key in changed_keys):
+        _embedding_function = None
+
+subscribe_config_changes(_on_config_change)
+
 # 初始化ChromaDB客户端
 def init_vector_db():
     os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
     client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
-    config = get_embedding_config()
-    volcano_ef = VolcanoEmbeddingFunction(config["api_key"], config["api_url"], config["model"])
+    volcano_ef = get_embedding_function()
     try:
         client.delete_collection("metadata_collection")
         print("Deleted existing collection")
@@ -87,10 +107,9 @@ def load_metadata_to_vector_db(collection):
         try:
             client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
             client.delete_collection("metadata_collection")
-            config = get_embedding_config()
             collection = client.create_collection(
                 name="metadata_collection",
-                embedding_function=VolcanoEmbeddingFunction(config["api_key"], config["api_url"], config["model"])
+                embedding_function=get_embedding_function()
             )
             print("Recreated collection after error")
         except Exception as inner_e:
@@ -239,10 +258,9 @@ def search_metadata(query, limit=10):
     # 获取现有向量数据库集合，而不是重新初始化
     client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
     try:
-        config = get_embedding_config()
         collection = client.get_collection(
             name="metadata_collection",
-            embedding_function=VolcanoEmbeddingFunction(config["api_key"], config["api_url"], config["model"])
+            embedding_function=get_embedding_function()
         )
         # 检查集合是否有数据
         try:
@@ -436,5 +454,15 @@ def format_suggest_results(search_results):
                     }]
                 })
     
+    # 每张表取其自身及字段、枚举值命中的最高分，作为表的召回分数
+    table_scores = {}
+    for item in search_results:
+        table_id = item.get('id') if item.get('type') == 'table' else item.get('table_id')
+        if table_id:
+            table_scores[table_id] = max(table_scores.get(table_id, 0.0), item.get('score', 0.0))
+    for db in organized_results.values():
+        for table in db["tables"]:
+            table["score"] = table_scores.get(table["id"], 0.0)
+    
     # 转换为列表格式
     return list(organized_results.values())
\ No newline at end of file
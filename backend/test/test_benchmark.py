@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to sys.path to import the utils module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.benchmark import percentile, run_benchmark
+
+
+class FakeBackendHandler(BaseHTTPRequestHandler):
+    """按 /ddl → /sql-agent → /execute 返回固定结果，sql_agent_response可替换为出错的响应"""
+    sql_agent_response = {"sql": "SELECT 1"}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        responses = {
+            "/ddl": {"metadata": "CREATE TABLE videos (video_id INTEGER)"},
+            "/sql-agent": self.sql_agent_response,
+            "/execute": {"data": [{"1": 1}]}
+        }
+        body = json.dumps(responses.get(self.path, {})).encode("utf-8")
+        self.send_response(200 if self.path in responses else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        FakeBackendHandler.sql_agent_response = {"sql": "SELECT 1"}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeBackendHandler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.payload = {"query": "播放量", "schema": []}
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([4.0, 1.0, 3.0, 2.0], 50), 2.5)
+        self.assertAlmostEqual(percentile([1.0, 2.0, 3.0, 4.0, 5.0], 90), 4.6)
+        self.assertEqual(percentile([1.0, 2.0], 100), 2.0)
+
+    def test_run_benchmark_reports_every_stage(self):
+        report = run_benchmark(self.base_url, self.payload, concurrency=3, total=6)
+
+        self.assertEqual(report["completed"], 6)
+        self.assertEqual(report["errors"], [])
+        for stage in ("ddl", "sql-agent", "execute", "total"):
+            stats = report["stages"][stage]
+            self.assertEqual(stats["count"], 6)
+            self.assertLessEqual(stats["p50"], stats["p99"])
+            self.assertLessEqual(stats["p99"], stats["max"])
+
+    def test_run_benchmark_counts_agent_errors(self):
+        FakeBackendHandler.sql_agent_response = {"error": "大模型调用失败"}
+        report = run_benchmark(self.base_url, self.payload, concurrency=2, total=2)
+
+        self.assertEqual(report["completed"], 0)
+        self.assertEqual(report["errors"], ["大模型调用失败"] * 2)
+        self.assertEqual(report["stages"]["sql-agent"]["count"], 2)
+        self.assertEqual(report["stages"]["execute"]["count"], 0)
+        self.assertEqual(report["stages"]["total"]["count"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add the parent directory to sys.path to import the initial module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from initial.bulk_loader import BulkLoader
+
+SCHEMAS = {"plays": "CREATE TABLE plays (id INTEGER, title TEXT, PRIMARY KEY (id))"}
+INDEXES = {"plays": ["CREATE INDEX idx_plays_title ON plays (title)"]}
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "data.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def query(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_loads_batches_and_creates_indexes_after_load(self):
+        loader = BulkLoader(self.db_path, SCHEMAS, INDEXES, batch_size=3)
+        loader.add_records("plays", ({"id": i, "title": f"t{i}"} for i in range(10)))
+        # 列顺序不同的记录单独分组
+        loader.add_records("plays", [{"title": "t10", "id": 10}])
+        self.assertEqual(loader.add_records("unknown", [{"id": 1}]), 0)
+        stats = loader.finish()
+
+        self.assertEqual(stats["rows"], 11)
+        self.assertEqual(stats["tables"]["plays"]["inserted"], 11)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM plays"), [(11,)])
+        self.assertIn(("idx_plays_title",), self.query("SELECT name FROM sqlite_master WHERE type='index'"))
+
+    def test_skips_duplicate_and_unbindable_rows(self):
+        loader = BulkLoader(self.db_path, SCHEMAS, batch_size=100)
+        loader.add_records("plays", [
+            {"id": 1, "title": "a"},
+            {"id": 1, "title": "duplicate"},
+            {"id": 2, "title": {"not": "bindable"}},
+            {"id": 3, "title": "c"},
+        ])
+        stats = loader.finish()
+
+        self.assertEqual(stats["tables"]["plays"]["rows"], 4)
+        self.assertEqual(stats["tables"]["plays"]["inserted"], 2)
+        self.assertEqual(self.query("SELECT id, title FROM plays ORDER BY id"), [(1, "a"), (3, "c")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+from unittest import mock
+
+# Add the parent directory to sys.path to import the initial module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import initial.config as config
+
+DEFAULTS = [
+    {"key": "llm_model", "value": "model-a", "name": "大模型名称"},
+    {"key": "agent_speculative_tools", "value": "false", "name": "Agent提前执行只读工具"},
+]
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "config.db")
+        json_path = os.path.join(self.temp_dir.name, "config.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(DEFAULTS, f)
+        self.patcher = mock.patch.multiple(config, CONFIG_DB_PATH=self.db_path, CONFIG_JSON_PATH=json_path,
+                                           CONFIG_VERSION_CHECK_INTERVAL=0, _snapshot=None,
+                                           _snapshot_db_version=0, _subscribers=[])
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_init_adds_new_defaults_to_existing_db(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE configs (key TEXT PRIMARY KEY, value TEXT NOT NULL, name TEXT NOT NULL)")
+        conn.execute("INSERT INTO configs VALUES ('llm_model', 'custom', '大模型名称')")
+        conn.commit()
+        conn.close()
+
+        config.init_config_db()
+
+        self.assertEqual(config.get_config_snapshot().get("llm_model"), "custom")
+        self.assertEqual(config.get_config_snapshot().get("agent_speculative_tools"), "false")
+
+    def test_update_unknown_key_is_rejected(self):
+        config.init_config_db()
+        with self.assertRaises(ValueError):
+            config.update_configs([{"key": "llm_model", "value": "model-b"}, {"key": "missing", "value": "x"}])
+        self.assertEqual(config.get_config_snapshot().get("llm_model"), "model-a")
+
+    def test_reloads_changes_made_by_other_processes(self):
+        config.init_config_db()
+        self.assertEqual(config.get_config_snapshot().get("llm_model"), "model-a")
+        changes = []
+        config.subscribe_config_changes(lambda snapshot, keys: changes.append(keys))
+
+        # 模拟另一个worker进程修改配置
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE configs SET value = 'model-b' WHERE key = 'llm_model'")
+        conn.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(config.get_config_snapshot().get("llm_model"), "model-b")
+        self.assertEqual(changes, [{"llm_model"}])
+
+    def test_base_url_override_is_not_saved(self):
+        config.init_config_db()
+        with mock.patch.object(config, "LLM_BASE_URL_OVERRIDE", "http://127.0.0.1:8100/v1"):
+            self.assertEqual(config.get_llm_config()["base_url"], "http://127.0.0.1:8100/v1")
+        self.assertIsNone(config.get_config_snapshot().get("llm_base_url"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.context_packer import pack_context, estimate_tokens, _trim_enum_column
+
+ENUM_VALUES = [f"v{i}" for i in range(30)]
+DDL = "\n".join([
+    "CREATE TABLE video_play_logs (",
+    "    log_id BIGINT PRIMARY KEY COMMENT '日志ID',",
+    "    device_type ENUM(" + ", ".join(f"'{v}'" for v in ENUM_VALUES) + ") COMMENT '设备类型 ["
+    + ", ".join(f"{v}: 描述{v}" for v in ENUM_VALUES) + "]',",
+    "    app_version VARCHAR(20),",
+    "    dt VARCHAR(50) COMMENT '日期分区'",
+    ") COMMENT = '视频播放日志表';"
+])
+
+
+class TestContextPacker(unittest.TestCase):
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("播放量"), 3)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    def test_within_budget_is_unchanged(self):
+        ddl = [{"name": "播放日志", "content": DDL}]
+        packed = pack_context(ddl, [], [], token_budget=100000)
+        self.assertEqual(packed["ddl"], ddl)
+        self.assertEqual(packed["dropped"], [])
+
+    def test_trims_enum_values_first(self):
+        ddl = [{"name": "播放日志", "table_name": "video_play_logs", "content": DDL}]
+        budget = estimate_tokens("表名: 播放日志\n" + DDL) - 50
+        packed = pack_context(ddl, [], [], token_budget=budget, max_enum_values=3)
+        content = packed["ddl"][0]["content"]
+        self.assertIn("ENUM('v0', 'v1', 'v2')", content)
+        self.assertIn("[v0: 描述v0, v1: 描述v1, v2: 描述v2]'", content)
+        self.assertIn("app_version", content)
+        self.assertEqual(packed["dropped"][0]["action"], "trim_enum")
+        self.assertLessEqual(packed["tokens"], budget)
+
+    def test_drops_lowest_scored_examples_before_tables(self):
+        ddl = [{"name": "视频表", "content": "CREATE TABLE videos (\n    video_id BIGINT PRIMARY KEY COMMENT '视频ID'\n);"}]
+        freeshot = [
+            {"name": "今天的播放量", "content": "SELECT COUNT(*) FROM video_play_logs", "score": 0.9},
+            {"name": "每个创作者的视频数", "content": "SELECT creator_id FROM videos", "score": 0.1},
+        ]
+        base = pack_context(ddl, freeshot[:1], [], token_budget=100000)
+        packed = pack_context(ddl, freeshot, [], token_budget=base["tokens"] + 2)
+        self.assertEqual([item["name"] for item in packed["freeshot"]], ["今天的播放量"])
+        self.assertEqual(len(packed["ddl"]), 1)
+        self.assertEqual(packed["dropped"], [{"type": "freeshot", "name": "每个创作者的视频数", "action": "drop", "detail": ""}])
+
+    def test_enum_values_with_parentheses(self):
+        column = ("    user_type ENUM('免费', '付费(会员)', '付费(单片)', 'it''s') "
+                  "COMMENT '用户类型 [免费: 普通用户, 付费(会员): 开通会员, 付费(单片): 单片购买, it''s: 其他]'")
+        self.assertEqual(_trim_enum_column(column, 10), (column, 4, 4))
+        trimmed, total, kept = _trim_enum_column(column, 2)
+        self.assertEqual((total, kept), (4, 2))
+        self.assertEqual(trimmed, "    user_type ENUM('免费', '付费(会员)') "
+                                  "COMMENT '用户类型 [免费: 普通用户, 付费(会员): 开通会员]'")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the parent directory to sys.path to import the initial module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from initial.data_files import iter_data_file, resolve_table_name, write_data_file
+
+TABLES = ["videos", "video_play_logs"]
+
+
+class TestDataFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.records = [{"log_id": 1, "title": "a", "is_vip": True}, {"log_id": 2, "title": "", "is_vip": False}]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, path):
+        return [(table_name, list(records)) for table_name, records in iter_data_file(path, TABLES)]
+
+    def test_resolve_table_name_prefers_longest_suffix(self):
+        self.assertEqual(resolve_table_name("iqiyi_data_video_play_logs", TABLES), "video_play_logs")
+        self.assertEqual(resolve_table_name("videos", TABLES), "videos")
+        self.assertIsNone(resolve_table_name("unknown", TABLES))
+
+    def test_jsonl_gzip_round_trip_skips_bad_lines(self):
+        path, count = write_data_file(self.temp_dir.name, "demo_", "video_play_logs", iter(self.records),
+                                      "jsonl", compress=True)
+        self.assertEqual(count, 2)
+        self.assertTrue(path.endswith("demo_video_play_logs.jsonl.gz"))
+        self.assertEqual(self.read(path), [("video_play_logs", self.records)])
+
+        plain_path = os.path.join(self.temp_dir.name, "videos.jsonl")
+        with open(plain_path, "w", encoding="utf-8") as f:
+            f.write('{"video_id": 1}\nnot json\n\n{"video_id": 2}\n')
+        self.assertEqual(self.read(plain_path), [("videos", [{"video_id": 1}, {"video_id": 2}])])
+
+    def test_csv_replaces_other_formats(self):
+        json_path, _ = write_data_file(self.temp_dir.name, "demo_", "video_play_logs", self.records, "json")
+        csv_path, _ = write_data_file(self.temp_dir.name, "demo_", "video_play_logs", self.records, "csv")
+
+        self.assertFalse(os.path.exists(json_path))
+        self.assertEqual(self.read(csv_path), [("video_play_logs", [
+            {"log_id": "1", "title": "a", "is_vip": "1"},
+            {"log_id": "2", "title": None, "is_vip": "0"}
+        ])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.db_service as db_service
+from services.db_service import DatabaseError, execute_query, is_select_sql
+
+
+class TestDbService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "data.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE plays (id INTEGER)")
+        conn.execute("INSERT INTO plays VALUES (1)")
+        conn.commit()
+        conn.close()
+        self.patcher = mock.patch.object(db_service, "DATA_DB_PATH", self.db_path)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_is_select_sql(self):
+        self.assertTrue(is_select_sql("select * from plays"))
+        self.assertTrue(is_select_sql("  -- 注释\n/* block */ WITH t AS (SELECT 1) SELECT * FROM t"))
+        self.assertFalse(is_select_sql("DELETE FROM plays"))
+        self.assertFalse(is_select_sql("selectx FROM plays"))
+        self.assertFalse(is_select_sql(None))
+
+    def test_read_only_rejects_writes_behind_with(self):
+        with self.assertRaises(DatabaseError):
+            execute_query('data', "WITH t AS (SELECT 1) DELETE FROM plays", read_only=True)
+        self.assertEqual(execute_query('data', "SELECT COUNT(*) AS n FROM plays", read_only=True), [{"n": 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.db_service as db_service
+from config.constants import INITIAL_METADATA_SCHEMA_SQL_PATH
+from services.ddl import generate_ddl_from_schema
+
+SCHEMA = {"schema": [{"id": "iqiyi", "tables": [
+    {"table": "plays", "description": "播放日志", "type": "fact", "score": 0.8, "columns": [
+        {"column": "device", "type": "ENUM", "description": "设备类型",
+         "values": [{"value": "ios", "desc": "苹果"}, {"value": "android"}]},
+        {"column": "title", "type": "VARCHAR(64)", "description": "用户's标题"}
+    ]},
+    {"table": "missing", "columns": []},
+    {"table": "users", "type": "dim", "columns": []}
+]}]}
+
+PLAYS_DDL = (
+    "CREATE TABLE plays (\n"
+    "    log_id BIGINT PRIMARY KEY COMMENT '日志ID',\n"
+    "    device ENUM('ios', 'android') COMMENT '设备类型 [ios: 苹果]',\n"
+    "    title VARCHAR(64) COMMENT '用户''s标题',\n"
+    "    dt VARCHAR(50) COMMENT '日期分区字段'\n"
+    ") COMMENT = '播放日志 | 类型: fact (行为实时表，dt字段代表行为发生的日期)';"
+)
+USERS_DDL = (
+    "CREATE TABLE users (\n"
+    "    user_id BIGINT PRIMARY KEY\n"
+    ") COMMENT = '类型: dim (维度表，一般不会发生变化)';"
+)
+
+
+class TestGenerateDDL(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "metadata.db")
+        conn = sqlite3.connect(self.db_path)
+        with open(INITIAL_METADATA_SCHEMA_SQL_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute("INSERT INTO dbs VALUES ('iqiyi', 'iqiyi', '')")
+        conn.executemany("INSERT INTO tables VALUES (?, 'iqiyi', ?, '', ?)",
+                         [("t1", "plays", "fact"), ("t2", "users", "dim")])
+        conn.executemany("INSERT INTO columns VALUES (?, ?, ?, ?, ?, ?)", [
+            ("c1", "t1", "log_id", "BIGINT", "日志ID", True),
+            ("c2", "t1", "device", "ENUM", "设备", False),
+            ("c3", "t1", "dt", "VARCHAR(50)", None, False),
+            ("c4", "t2", "user_id", "BIGINT", None, True),
+        ])
+        conn.commit()
+        conn.close()
+        self.patcher = mock.patch.object(db_service, "METADATA_DB_PATH", self.db_path)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_generates_expected_ddl(self):
+        self.assertEqual(generate_ddl_from_schema(SCHEMA), [
+            {"table_name": "plays", "table_desc": "播放日志", "ddl": PLAYS_DDL, "score": 0.8},
+            {"table_name": "users", "table_desc": "", "ddl": USERS_DDL, "score": None},
+        ])
+        self.assertEqual(generate_ddl_from_schema({"schema": []}), [])
+
+    def test_metadata_edits_are_reflected(self):
+        generate_ddl_from_schema(SCHEMA)
+        # 缓存的片段以描述为键，修改元数据后生成新的片段
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO user_columns VALUES ('plays', 'log_id', '播放记录ID')")
+        conn.commit()
+        conn.close()
+
+        ddl = generate_ddl_from_schema(SCHEMA)[0]["ddl"]
+        self.assertIn("    log_id BIGINT PRIMARY KEY COMMENT '播放记录ID',", ddl)
+        self.assertEqual(ddl.replace("播放记录ID", "日志ID"), PLAYS_DDL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import json
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.history_compactor import compact_history, latest_tool_round_start, summarize_tool_result, COMPACTED_PREFIX
+
+SQL_RESULT = json.dumps({
+    "success": True,
+    "columns": [{"name": "user_id", "type": "INTEGER", "nullable": True}, {"name": "play_count", "type": "INTEGER", "nullable": True}],
+    "data": [[i, i * 10] for i in range(10)],
+    "totalRows": 10
+})
+SCHEMA_RESULT = "CREATE TABLE videos (\n    video_id BIGINT PRIMARY KEY,\n    title VARCHAR(200) COMMENT '标题',\n    dt VARCHAR(50)\n) COMMENT = '视频表';"
+
+
+class TestHistoryCompactor(unittest.TestCase):
+    def test_summaries(self):
+        self.assertEqual(summarize_tool_result("tool_execute_sql_and_fetch_top_10", SQL_RESULT),
+                         f"{COMPACTED_PREFIX} SQL执行成功，返回10行，列: user_id, play_count")
+        error = json.dumps({"success": False, "error": "no such column: foo"})
+        self.assertEqual(summarize_tool_result("tool_execute_sql_and_fetch_top_10", error),
+                         f"{COMPACTED_PREFIX} SQL执行失败: no such column: foo")
+        self.assertEqual(summarize_tool_result("tool_get_table_schema", SCHEMA_RESULT),
+                         f"{COMPACTED_PREFIX} 表 videos 结构，共3列: video_id, title, dt")
+        self.assertEqual(summarize_tool_result("tool_get_all_tables", "users: 用户表\nvideos: 视频表"),
+                         f"{COMPACTED_PREFIX} 共2张表: users, videos")
+
+    def test_latest_turn_kept_verbatim(self):
+        messages = [
+            {"role": "system", "content": "系统提示词"},
+            {"role": "user", "content": "第一个问题"},
+            {"role": "tool", "name": "tool_get_table_schema", "content": SCHEMA_RESULT, "tool_call_id": "c1"},
+            {"role": "tool", "name": "tool_execute_sql_and_fetch_top_10", "content": SQL_RESULT, "tool_call_id": "c2"},
+            {"role": "assistant", "content": "回答"},
+            {"role": "user", "content": "第二个问题"},
+            {"role": "tool", "name": "tool_execute_sql_and_fetch_top_10", "content": SQL_RESULT, "tool_call_id": "c3"}
+        ]
+        compacted, saved = compact_history(messages, token_threshold=10)
+        self.assertEqual(compacted, 2)
+        self.assertGreater(saved, 0)
+        self.assertTrue(messages[2]["content"].startswith(COMPACTED_PREFIX))
+        self.assertTrue(messages[3]["content"].startswith(COMPACTED_PREFIX))
+        self.assertEqual(messages[3]["tool_call_id"], "c2")
+        self.assertEqual(messages[6]["content"], SQL_RESULT)
+
+        # 已压缩的结果不再重复压缩
+        self.assertEqual(compact_history(messages, token_threshold=10), (0, 0))
+
+    def test_tool_loop_keeps_latest_round(self):
+        messages = [
+            {"role": "system", "content": "系统提示词"},
+            {"role": "user", "content": "问题"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c1"}]},
+            {"role": "tool", "name": "tool_get_table_schema", "content": SCHEMA_RESULT, "tool_call_id": "c1"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c2"}]},
+            {"role": "tool", "name": "tool_execute_sql_and_fetch_top_10", "content": SQL_RESULT, "tool_call_id": "c2"}
+        ]
+        self.assertEqual(latest_tool_round_start(messages), 4)
+        compacted, _ = compact_history(messages, token_threshold=10, protect_from=latest_tool_round_start(messages))
+        self.assertEqual(compacted, 1)
+        self.assertTrue(messages[3]["content"].startswith(COMPACTED_PREFIX))
+        self.assertEqual(messages[5]["content"], SQL_RESULT)
+
+    def test_below_threshold_unchanged(self):
+        messages = [
+            {"role": "user", "content": "问题"},
+            {"role": "tool", "name": "tool_execute_sql_and_fetch_top_10", "content": SQL_RESULT},
+            {"role": "user", "content": "问题2"}
+        ]
+        self.assertEqual(compact_history(messages, token_threshold=100000), (0, 0))
+        self.assertEqual(messages[1]["content"], SQL_RESULT)
+
+
+if __name__ == '__main__':
+    unittest.main()
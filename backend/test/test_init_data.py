@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+from unittest import mock
+
+# Add the parent directory to sys.path to import the initial module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import initial.data as data
+
+
+class TestInitData(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.metadata_dir = os.path.join(root, "metadata")
+        self.data_dir = os.path.join(root, "data")
+        os.makedirs(self.metadata_dir)
+        os.makedirs(self.data_dir)
+        self.db_path = os.path.join(root, "data.db")
+        with open(os.path.join(self.metadata_dir, "demo.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": "demo", "tables": [{"name": "plays", "columns": [
+                {"name": "id", "type": "BIGINT", "is_primary": True},
+                {"name": "title", "type": "VARCHAR(64)"}
+            ]}]}, f)
+        self.write_rows([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}])
+        self.patcher = mock.patch.multiple(data, DATA_DB_PATH=self.db_path,
+                                           DATA_DB_FINGERPRINT_PATH=self.db_path + ".fingerprint",
+                                           INITIAL_METADATA_DIR=self.metadata_dir, INITIAL_DATA_DIR=self.data_dir)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def write_rows(self, rows):
+        with open(os.path.join(self.data_dir, "demo_plays.json"), "w", encoding="utf-8") as f:
+            json.dump({"plays": rows}, f)
+
+    def count_rows(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM plays").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_reuses_database_when_sources_unchanged(self):
+        self.assertTrue(data.init_data())
+        self.assertFalse(data.init_data())
+        self.assertEqual(self.count_rows(), 2)
+        self.assertTrue(data.init_data(force=True))
+
+    def test_rebuilds_when_data_file_changes(self):
+        data.init_data()
+        self.write_rows([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}, {"id": 3, "title": "c"}])
+        self.assertTrue(data.init_data())
+        self.assertEqual(self.count_rows(), 3)
+
+    def test_retries_after_failed_data_file(self):
+        data.init_data()
+        with open(os.path.join(self.data_dir, "broken.json"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertTrue(data.init_data())
+        self.assertFalse(os.path.exists(self.db_path + ".fingerprint"))
+        # 源文件没有变化，仍然重新导入
+        self.assertTrue(data.init_data())
+        self.assertEqual(self.count_rows(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai.types.chat import ChatCompletionChunk
+from services import llm_cache
+from services.llm_cache import LLMResponseCache, LLMCacheMissError, wrap_client
+from services.prompt_manager import PromptManager
+
+
+def make_chunk(content):
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": "m",
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": None}]
+    })
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return iter([make_chunk("你好"), make_chunk("世界")])
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        llm_cache._cache = LLMResponseCache(os.path.join(self.temp_dir.name, "llm_cache.db"))
+        self.completions = FakeCompletions()
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+        self.kwargs = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "tools": [], "stream": True}
+
+    def tearDown(self):
+        llm_cache._cache = None
+        self.temp_dir.cleanup()
+
+    def test_record_then_replay_stream(self):
+        recorded = [chunk.choices[0].delta.content for chunk in wrap_client(self.client, "record").chat.completions.create(**self.kwargs)]
+        replayed = [chunk.choices[0].delta.content for chunk in wrap_client(self.client, "replay").chat.completions.create(**self.kwargs)]
+        self.assertEqual(recorded, ["你好", "世界"])
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(self.completions.calls, 1)
+
+    def test_cache_key_ignores_prompt_time(self):
+        def kwargs_at(now):
+            system = f"## 附加信息\n{PromptManager.build_time_info(now)}\n"
+            return dict(self.kwargs, messages=[{"role": "system", "content": system}, {"role": "user", "content": "hi"}])
+
+        self.assertEqual(llm_cache.cache_key(kwargs_at(datetime(2025, 3, 1, 8, 30))),
+                         llm_cache.cache_key(kwargs_at(datetime(2025, 3, 2, 9, 45))))
+        self.assertNotEqual(llm_cache.cache_key(kwargs_at(datetime(2025, 3, 1, 8, 30))), llm_cache.cache_key(self.kwargs))
+
+    def test_replay_miss_raises(self):
+        with self.assertRaises(LLMCacheMissError):
+            wrap_client(self.client, "replay").chat.completions.create(**self.kwargs)
+
+    def test_off_returns_client(self):
+        self.assertIs(wrap_client(self.client, "off"), self.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.log_context import set_session_id, reset_session_id, get_session_id, submit_with_context
+
+
+class TestLogContext(unittest.TestCase):
+    def test_session_id_is_validated_and_reset(self):
+        token = set_session_id("  abc  ")
+        self.assertEqual(get_session_id(), "abc")
+        reset_session_id(token)
+        self.assertIsNone(get_session_id())
+
+        token = set_session_id("x" * 200)
+        self.assertIsNone(get_session_id())
+        reset_session_id(token)
+
+    def test_submit_with_context_propagates_session(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            token = set_session_id("session-1")
+            try:
+                self.assertEqual(submit_with_context(executor, get_session_id).result(), "session-1")
+                # 普通submit不会传递上下文
+                self.assertIsNone(executor.submit(get_session_id).result())
+            finally:
+                reset_session_id(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import threading
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.log_dispatcher import LogDispatcher
+
+
+class TestLogDispatcher(unittest.TestCase):
+    def test_truncates_and_keeps_full_payload(self):
+        sent = []
+        dispatcher = LogDispatcher(lambda event, data: sent.append((event, data)), max_message_chars=5, payload_cache_size=1)
+        result = dispatcher.dispatch("log", {"type": "system", "message": "0123456789", "summary": "执行SQL成功"})
+        self.assertTrue(dispatcher.flush())
+        self.assertEqual(sent[0][1]["message"], "01234")
+        self.assertTrue(sent[0][1]["truncated"])
+        self.assertEqual(sent[0][1]["full_length"], 10)
+        self.assertEqual(dispatcher.get_payload(result["payload_id"]), "0123456789")
+
+        # 超出保留数量后淘汰最早的完整内容
+        dispatcher.dispatch("log", {"type": "system", "message": "abcdefghij"})
+        self.assertIsNone(dispatcher.get_payload(result["payload_id"]))
+
+    def test_drops_and_samples_without_blocking(self):
+        release = threading.Event()
+        sent = []
+
+        def slow_emit(event, data):
+            release.wait()
+            sent.append(data)
+
+        dispatcher = LogDispatcher(slow_emit, max_queue=4, sample_watermark=0.5, sample_rate=2)
+        for i in range(20):
+            dispatcher.dispatch("log", {"type": "system", "message": str(i)})
+        stats = dispatcher.stats()
+        self.assertGreater(stats["sampled"], 0)
+        self.assertGreater(stats["dropped"], 0)
+
+        release.set()
+        self.assertTrue(dispatcher.flush())
+        # 压力解除后发送一条丢弃统计
+        self.assertTrue(any("已丢弃" in data["message"] for data in sent))
+
+    def test_stream_logs_are_not_sampled(self):
+        release = threading.Event()
+        dispatcher = LogDispatcher(lambda event, data: release.wait(), max_queue=10, sample_watermark=0.1)
+        for i in range(5):
+            dispatcher.dispatch("stream_log", {"message": str(i)}, sampleable=False)
+        self.assertEqual(dispatcher.stats()["sampled"], 0)
+        release.set()
+        self.assertTrue(dispatcher.flush())
+
+
+if __name__ == '__main__':
+    unittest.main()
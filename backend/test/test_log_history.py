@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.log_history import LogHistory
+
+
+def log(session_id, message):
+    return {"type": "ai", "message": message, "session_id": session_id}
+
+
+class TestLogHistory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.temp_dir.name, "log_history.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_replay_includes_spilled_events_in_order(self):
+        history = LogHistory(size=2, max_sessions=10, spill_db_path=self.spill_path, spill_batch_size=100)
+        for i in range(5):
+            history.record("log", log("s1", str(i)))
+        history.record("stream_log", log("s2", "other"))
+
+        replayed = history.replay("s1")
+        self.assertEqual([data["message"] for _, data in replayed], ["0", "1", "2", "3", "4"])
+        self.assertEqual([data["seq"] for _, data in replayed], [1, 2, 3, 4, 5])
+        # 只回放last_seq之后的事件
+        self.assertEqual([data["message"] for _, data in history.replay("s1", 3)], ["3", "4"])
+        self.assertEqual([data["message"] for _, data in history.replay("s1", limit=2)], ["3", "4"])
+        self.assertEqual(history.replay("s2")[0][0], "stream_log")
+
+    def test_evicted_session_continues_sequence(self):
+        history = LogHistory(size=10, max_sessions=1, spill_db_path=self.spill_path, spill_batch_size=1)
+        history.record("log", log("s1", "a"))
+        history.record("log", log("s2", "b"))
+        self.assertEqual(history.record("log", log("s1", "c")), 2)
+        self.assertEqual([data["message"] for _, data in history.replay("s1")], ["a", "c"])
+
+    def test_evicted_session_counts_pending_spill(self):
+        # 淘汰的事件尚未写入SQLite时会话再次记录日志，序号不能从1重新开始
+        history = LogHistory(size=10, max_sessions=1, spill_db_path=self.spill_path, spill_batch_size=100)
+        for message in ("a", "b", "c"):
+            history.record("log", log("s1", message))
+        history.record("log", log("s2", "other"))
+        self.assertEqual(history.record("log", log("s1", "d")), 4)
+        self.assertEqual([data["message"] for _, data in history.replay("s1")], ["a", "b", "c", "d"])
+        self.assertEqual([data["message"] for _, data in history.replay("s1", 3)], ["d"])
+
+    def test_events_without_session_are_not_recorded(self):
+        history = LogHistory(size=2, spill_db_path=None)
+        self.assertIsNone(history.record("log", {"message": "startup"}))
+        for i in range(3):
+            history.record("log", log("s1", str(i)))
+        self.assertEqual([data["message"] for _, data in history.replay("s1")], ["1", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import json
+import threading
+
+import requests
+
+# Add the parent directory to sys.path to import the utils module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mock_llm_server import MockLLMServer, run_server
+
+DDL_MESSAGES = [
+    {"role": "system", "content": "CREATE TABLE video_play_logs (log_id INTEGER)"},
+    {"role": "user", "content": "最近7天的播放量"}
+]
+
+
+class TestMockLLMServer(unittest.TestCase):
+    def test_plans_follow_conversation(self):
+        server = MockLLMServer(ttft=0, token_delay=0)
+        self.assertEqual(server.plan_non_stream([{"role": "user", "content": "表名: videos\n表名: users"}]), "videos")
+        self.assertIn("SELECT * FROM video_play_logs", server.plan_non_stream(DDL_MESSAGES))
+
+        plan = server.plan_stream(DDL_MESSAGES, has_tools=True)
+        self.assertEqual(plan["tool_calls"][0]["arguments"], {"sql": "SELECT * FROM video_play_logs LIMIT 10"})
+        answered = DDL_MESSAGES + [{"role": "assistant", "content": ""}, {"role": "tool", "content": "[]"}]
+        self.assertIn("content", server.plan_stream(answered, has_tools=True))
+
+        scripted = MockLLMServer(script={"turns": [{"content": "a"}, {"content": "b"}]})
+        self.assertEqual(scripted.plan_stream(answered + answered[2:], has_tools=True), {"content": "b"})
+
+    def test_streams_tool_call_over_http(self):
+        httpd = run_server("127.0.0.1", 0, ttft=0, token_delay=0, chars_per_token=5)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/v1/chat/completions"
+
+        response = requests.post(url, json={"model": "m", "messages": DDL_MESSAGES, "stream": True,
+                                            "tools": [{"type": "function"}]}, stream=True, timeout=10)
+        events = [line[len("data: "):] for line in response.iter_lines(decode_unicode=True) if line]
+        self.assertEqual(events[-1], "[DONE]")
+        chunks = [json.loads(event) for event in events[:-1]]
+        arguments = "".join(tool_call["function"].get("arguments", "")
+                            for chunk in chunks for tool_call in chunk["choices"][0]["delta"].get("tool_calls", []))
+        self.assertEqual(json.loads(arguments), {"sql": "SELECT * FROM video_play_logs LIMIT 10"})
+        self.assertEqual(chunks[-1]["choices"][0]["finish_reason"], "tool_calls")
+
+        completion = requests.post(url, json={"model": "m", "messages": DDL_MESSAGES}, timeout=10).json()
+        self.assertIn("video_play_logs", completion["choices"][0]["message"]["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import sys
+import os
+import marshal
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.profiler import start_profile, finish_profile, profile_store, parse_profile_paths
+
+
+def allocate():
+    return [str(i) * 10 for i in range(20000)]
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profile_records_stats_and_peak_memory(self):
+        session = start_profile("/sql-agent", "req-1")
+        self.assertIsNotNone(session)
+        # 同一时间只分析一个请求
+        self.assertIsNone(start_profile("/ddl"))
+        allocate()
+        profile_id = finish_profile(session)
+        self.assertIsNone(finish_profile(session))
+
+        record = profile_store.get(profile_id)
+        self.assertEqual(record["request_id"], "req-1")
+        self.assertIn("allocate", record["stats"])
+        self.assertGreater(record["peak_memory_bytes"], 0)
+        self.assertIsInstance(marshal.loads(record["pstats"]), dict)
+        self.assertNotIn("pstats", profile_store.list()[0])
+
+        # 分析结束后可以开始下一次
+        finish_profile(start_profile("/ddl"))
+
+    def test_parse_profile_paths(self):
+        self.assertEqual(parse_profile_paths(" /sql-agent, /ddl ,"), ["/sql-agent", "/ddl"])
+        self.assertEqual(parse_profile_paths(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
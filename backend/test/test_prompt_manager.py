@@ -0,0 +1,29 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.prompt_manager import PromptManager
+
+
+class TestPromptManager(unittest.TestCase):
+    def test_refresh_time_info_updates_cached_prompt(self):
+        old_time = PromptManager.build_time_info(datetime(2025, 3, 1, 8, 30))
+        prompt = f"## 系统角色\n助手\n\n## 附加信息\n{old_time}\n\n## 元数据信息\n今天日期不变"
+
+        refreshed = PromptManager.refresh_time_info(prompt)
+
+        self.assertNotIn(old_time, refreshed)
+        self.assertIn(PromptManager.build_time_info(), refreshed)
+        self.assertTrue(refreshed.endswith("## 元数据信息\n今天日期不变"))
+
+    def test_agent_prompt_contains_current_time(self):
+        prompt = PromptManager.build_sql_agent_prompt("表名: t")
+        self.assertIn(PromptManager.build_time_info(), prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
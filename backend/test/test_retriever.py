@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.retriever import RetrievalIndex, tokenize
+
+
+class TestRetrievalIndex(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE freeshots (id TEXT PRIMARY KEY, name TEXT, content TEXT, likes INTEGER)')
+        conn.executemany('INSERT INTO freeshots VALUES (?, ?, ?, ?)', [
+            ('fs_001', '今天的播放量', "SELECT COUNT(*) FROM video_play_logs WHERE dt='2023-05-19'", 0),
+            ('fs_002', '最近一周的播放量', "SELECT COUNT(*) FROM video_play_logs WHERE dt>='2023-05-12'", 0),
+            ('fs_003', '每个创作者的视频数', 'SELECT creator_id, COUNT(*) FROM videos GROUP BY creator_id', 10),
+        ])
+        conn.commit()
+        conn.close()
+        self.index = RetrievalIndex('freeshots', self.db_path)
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def test_tokenize_mixed_text(self):
+        tokens = tokenize('DAU播放量')
+        self.assertIn('dau', tokens)
+        self.assertIn('播放', tokens)
+        self.assertIn('放量', tokens)
+
+    def test_search_ranks_by_relevance(self):
+        results = self.index.search('最近一周播放量', top_k=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['name'], '最近一周的播放量')
+        self.assertNotIn('每个创作者的视频数', [r['name'] for r in results])
+
+    def test_search_without_hits_falls_back_to_likes(self):
+        results = self.index.search('xyz', top_k=1)
+        self.assertEqual(results[0]['name'], '每个创作者的视频数')
+
+    def test_update_likes_changes_ranking(self):
+        self.index.search('播放量', top_k=2)
+        self.index.update_likes('今天的播放量', 1000)
+        results = self.index.search('播放量', top_k=2)
+        self.assertEqual(results[0]['name'], '今天的播放量')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.session_store import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.temp_dir.name, "sessions.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_evicted_session_is_spilled_and_reloaded(self):
+        store = SessionStore(maxsize=2, ttl=3600, spill_db_path=self.spill_path)
+        first = store.create("c1", [{"role": "user", "content": "第一个问题"}], {"ddl": [{"name": "t", "content": "ddl"}]})
+        first.system_prompts["sql"] = "prompt"
+        store.save(first)
+        store.create("c2")
+        store.create("c3")
+        self.assertEqual(len(store), 2)
+
+        reloaded = store.get("c1")
+        self.assertIsNot(reloaded, first)
+        self.assertEqual(reloaded.messages, [{"role": "user", "content": "第一个问题"}])
+        self.assertEqual(reloaded.metadata["ddl"], [{"name": "t", "content": "ddl"}])
+        self.assertEqual(reloaded.system_prompts, {"sql": "prompt"})
+
+    def test_spilled_session_stays_loadable(self):
+        store = SessionStore(maxsize=1, ttl=3600, spill_db_path=self.spill_path)
+        store.create("c1", [{"role": "user", "content": "问题"}])
+        store.create("c2")
+
+        # 另一个worker进程共享同一个SQLite文件
+        other = SessionStore(maxsize=10, ttl=3600, spill_db_path=self.spill_path)
+        self.assertIsNotNone(other.get("c1"))
+        reloaded = store.get("c1")
+        self.assertEqual(reloaded.messages, [{"role": "user", "content": "问题"}])
+        self.assertIs(store.get("c1"), reloaded)
+
+        store.delete("c1")
+        self.assertIsNone(SessionStore(spill_db_path=self.spill_path).get("c1"))
+
+    def test_without_spill_evicted_session_is_lost(self):
+        store = SessionStore(maxsize=1, ttl=3600, spill_db_path=None)
+        store.create("c1")
+        store.create("c2")
+        self.assertIsNone(store.get("c1"))
+        self.assertIsNotNone(store.get("c2"))
+
+    def test_metadata_change_clears_system_prompts(self):
+        store = SessionStore(maxsize=10, ttl=3600, spill_db_path=None)
+        session = store.create("c1", metadata={"ddl": [], "freeshot": [], "term": []})
+        session.system_prompts["sql"] = "prompt"
+        self.assertFalse(session.set_metadata({"ddl": [], "freeshot": [], "term": []}))
+        self.assertEqual(session.system_prompts, {"sql": "prompt"})
+        self.assertTrue(session.set_metadata({"ddl": [], "freeshot": [], "term": [{"name": "GMV", "content": "成交额"}]}))
+        self.assertEqual(session.system_prompts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
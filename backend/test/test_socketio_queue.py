@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import base64
+import pickle
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.socketio_queue import FileQueueManager, get_socketio_options
+
+
+class TestFileQueueManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "socketio_queue.log")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reader_follows_rotation(self):
+        message_size = len(base64.b64encode(pickle.dumps({"n": 0, "data": "x" * 40}))) + 1
+        # 每个文件写满3条消息后轮转
+        manager = FileQueueManager(f"file://{self.path}", poll_interval=0.01, max_bytes=message_size * 5 // 2)
+        received = []
+        listener = manager._listen()
+        # 第一次读取时定位到文件末尾，之前写入的消息不转发
+        manager._publish({"n": -1})
+        ready = threading.Event()
+
+        def consume():
+            ready.set()
+            for message in listener:
+                received.append(message["n"])
+
+        threading.Thread(target=consume, daemon=True).start()
+        ready.wait()
+        time.sleep(0.05)
+        # 连续写入，读取方醒来前已轮转两次
+        for n in range(7):
+            manager._publish({"n": n, "data": "x" * 40})
+
+        deadline = time.monotonic() + 5
+        while len(received) < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(received, list(range(7)))
+        self.assertEqual(os.path.getsize(self.path), message_size)
+        self.assertEqual(os.path.getsize(self.path + ".1"), message_size * 3)
+
+    def test_transports_option(self):
+        self.assertEqual(get_socketio_options(None, None, "websocket"), {"transports": ["websocket"]})
+        self.assertEqual(get_socketio_options(None, None, None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.sql_agent as sql_agent
+from services.sql_agent import SQLAgent
+
+
+def tool_chunk(index, arguments, name):
+    tool_call = SimpleNamespace(index=index, id=f"call_{index}", function=SimpleNamespace(name=name, arguments=arguments))
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[tool_call]))])
+
+
+class TestSpeculation(unittest.TestCase):
+    def setUp(self):
+        self.agent = SQLAgent.__new__(SQLAgent)
+        self.submitted = []
+        patches = [
+            mock.patch.object(sql_agent, "_speculative_tools_enabled", return_value=True),
+            mock.patch.object(sql_agent, "broadcast_log"),
+            mock.patch.object(sql_agent, "submit_speculative",
+                              side_effect=lambda run, tool_call: self.submitted.append(tool_call.function.name)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def feed(self, *chunks):
+        state = self.agent._new_turn_state(1)
+        for chunk in chunks:
+            state["assembler"].feed(chunk)
+
+    def test_reads_after_a_write_are_not_speculated(self):
+        self.feed(
+            tool_chunk(0, '{"table_name": "t", "description": "d"}', "tool_update_metadata_description"),
+            tool_chunk(1, '{"table_name": "t"}', "tool_get_table_schema"),
+        )
+        self.assertEqual(self.submitted, [])
+
+    def test_only_select_sql_is_speculated(self):
+        self.feed(
+            tool_chunk(0, '{"sql": "DELETE FROM t"}', "tool_execute_sql_and_fetch_top_10"),
+            tool_chunk(1, '{"sql": "SELECT 1"}', "tool_execute_sql_and_fetch_top_10"),
+        )
+        self.assertEqual(self.submitted, ["tool_execute_sql_and_fetch_top_10"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.stream_assembler import StreamAssembler
+
+
+def content_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, tool_calls=None))])
+
+
+def tool_chunk(index, arguments, id=None, name=None):
+    tool_call = SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[tool_call]))])
+
+
+class TestStreamAssembler(unittest.TestCase):
+    def test_content_accumulation(self):
+        assembler = StreamAssembler()
+        for text in ["查询", "结果", "如下"]:
+            self.assertEqual(assembler.feed(content_chunk(text)), text)
+        self.assertEqual(assembler.feed(SimpleNamespace(choices=[])), None)
+        content, tool_calls = assembler.finish()
+        self.assertEqual(content, "查询结果如下")
+        self.assertEqual(tool_calls, [])
+
+    def test_tool_call_emitted_when_arguments_complete(self):
+        emitted = []
+        assembler = StreamAssembler(on_tool_call=emitted.append)
+        assembler.feed(tool_chunk(0, "", id="call_a", name="tool_execute_sql_and_fetch_top_10"))
+        assembler.feed(tool_chunk(0, '{"sql": "SELECT \'}\' AS a, \\"x\\"'))
+        self.assertEqual(emitted, [])
+        # 第二个调用交错到达
+        assembler.feed(tool_chunk(1, '{"table_name"', id="call_b", name="tool_get_table_schema"))
+        assembler.feed(tool_chunk(0, ' FROM t"}'))
+        self.assertEqual(len(emitted), 1)
+        self.assertEqual(emitted[0].id, "call_a")
+        self.assertEqual(emitted[0].parsed_arguments, {"sql": "SELECT '}' AS a, \"x\" FROM t"})
+        assembler.feed(tool_chunk(1, ': "videos"}'))
+        self.assertEqual([call.id for call in emitted], ["call_a", "call_b"])
+
+        content, tool_calls = assembler.finish()
+        self.assertEqual(content, "")
+        self.assertEqual([call.function.name for call in tool_calls], ["tool_execute_sql_and_fetch_top_10", "tool_get_table_schema"])
+        self.assertEqual(tool_calls[1].function.arguments, '{"table_name": "videos"}')
+
+    def test_incomplete_arguments_are_not_emitted(self):
+        emitted = []
+        assembler = StreamAssembler(on_tool_call=emitted.append)
+        assembler.feed(tool_chunk(0, '{"sql": "SELECT', id="call_a", name="tool_execute_sql_and_fetch_top_10"))
+        content, tool_calls = assembler.finish()
+        self.assertEqual(emitted, [])
+        self.assertIsNone(tool_calls[0].parsed_arguments)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.stream_log_coalescer import StreamLogCoalescer
+
+
+class TestStreamLogCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.coalescer = StreamLogCoalescer(self.sent.append, flush_interval=10, max_chars=8)
+
+    def test_tokens_are_merged_until_threshold(self):
+        self.coalescer.add("s", "ai", "ab", "R1", is_first=True)
+        self.coalescer.add("s", "ai", "cd", "R1")
+        self.assertEqual(self.sent, [])
+        self.coalescer.add("s", "ai", "efgh", "R1")
+        self.coalescer.add("s", "ai", "ij", "R1")
+        self.coalescer.end("s", "ai", "R1")
+        self.assertEqual([log["message"] for log in self.sent], ["abcdefgh", "ij"])
+        self.assertEqual([log["is_first"] for log in self.sent], [True, False])
+        self.assertEqual([log["is_last"] for log in self.sent], [False, True])
+
+    def test_end_marks_last_after_timed_flush(self):
+        self.coalescer.add("s", "ai", "abcdefgh", "R1", is_first=True)
+        self.coalescer.end("s", "ai", "R1")
+        self.assertEqual(self.sent[-1]["message"], "")
+        self.assertTrue(self.sent[-1]["is_last"])
+        # 未开始的流结束时不发送
+        self.coalescer.end("other", "ai", "R2")
+        self.assertEqual(len(self.sent), 2)
+
+    def test_flush_all_and_streams_are_separate(self):
+        self.coalescer.add("a", "ai", "x", "R1", is_first=True)
+        self.coalescer.add("b", "ai", "y", "R1", is_first=True)
+        self.coalescer.flush_all()
+        self.assertEqual(sorted(log["message"] for log in self.sent), ["x", "y"])
+        self.assertEqual(self.coalescer.pending(), 0)
+
+    def test_flush_prefix_only_sends_matching_streams(self):
+        self.coalescer.add(("s1", 1, "ai", "R1"), "ai", "x", "R1", is_first=True, request_id="req-1")
+        self.coalescer.add(("s2", 2, "ai", "R1"), "ai", "y", "R1", is_first=True)
+        self.coalescer.flush_prefix(("s1", 1))
+        self.assertEqual([(log["message"], log["request_id"]) for log in self.sent], [("x", "req-1")])
+        self.assertEqual(self.coalescer.pending(), 1)
+
+    def test_idle_streams_are_expired(self):
+        coalescer = StreamLogCoalescer(self.sent.append, flush_interval=10, max_chars=8, idle_timeout=0)
+        # 出错中断，没有调用end()
+        coalescer.add("broken", "ai", "x", "R1", is_first=True)
+        coalescer.add("next", "ai", "y", "R2", is_first=True)
+        self.assertEqual(coalescer.open_streams(), 1)
+        self.assertEqual(self.sent[0]["message"], "x")
+
+    def test_background_flush_after_window(self):
+        coalescer = StreamLogCoalescer(self.sent.append, flush_interval=0.02, max_chars=1000)
+        coalescer.add("s", "ai", "token", "R1", is_first=True)
+        deadline = time.time() + 1
+        while not self.sent and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.sent[0]["message"], "token")
+        self.assertTrue(self.sent[0]["is_first"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tool_registry import ToolRegistry
+from services.tool_executor import execute_tool_calls
+
+
+def sample_read_tool(key: str) -> str:
+    return key
+
+
+def sample_write_tool(key: str) -> str:
+    return key
+
+
+def make_call(name, key):
+    return SimpleNamespace(id=f"call_{key}", function=SimpleNamespace(name=name, arguments=key))
+
+
+class TestToolExecutor(unittest.TestCase):
+    def setUp(self):
+        ToolRegistry.register(description="测试只读工具", read_only=True)(sample_read_tool)
+        ToolRegistry.register(description="测试写工具")(sample_write_tool)
+
+    def tearDown(self):
+        ToolRegistry.unregister("sample_read_tool")
+        ToolRegistry.unregister("sample_write_tool")
+
+    def test_read_only_calls_run_concurrently_in_order(self):
+        calls = [make_call("sample_read_tool", str(i)) for i in range(3)]
+        # 三个调用必须同时在执行才能通过屏障
+        barrier = threading.Barrier(3, timeout=2)
+
+        def run(tool_call):
+            barrier.wait()
+            time.sleep(0.01 * (3 - int(tool_call.function.arguments)))
+            return tool_call.id
+
+        self.assertEqual(execute_tool_calls(calls, run), ["call_0", "call_1", "call_2"])
+
+    def test_write_calls_are_serialized(self):
+        calls = [
+            make_call("sample_read_tool", "r1"),
+            make_call("sample_read_tool", "r2"),
+            make_call("sample_write_tool", "w"),
+            make_call("sample_read_tool", "r3")
+        ]
+        events = []
+        lock = threading.Lock()
+
+        def run(tool_call):
+            key = tool_call.function.arguments
+            with lock:
+                events.append(("start", key))
+            time.sleep(0.01)
+            with lock:
+                events.append(("end", key))
+            return key
+
+        self.assertEqual(execute_tool_calls(calls, run), ["r1", "r2", "w", "r3"])
+        write_start = events.index(("start", "w"))
+        self.assertLess(events.index(("end", "r1")), write_start)
+        self.assertLess(events.index(("end", "r2")), write_start)
+        self.assertLess(events.index(("end", "w")), events.index(("start", "r3")))
+
+    def test_unknown_tool_is_treated_as_write(self):
+        self.assertFalse(ToolRegistry.is_read_only("no_such_tool"))
+        self.assertTrue(ToolRegistry.is_read_only("sample_read_tool"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path to import the services module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tracing import Histogram, MetricsRegistry, span, start_trace, end_trace, get_trace, get_request_id
+from services.log_context import submit_with_context
+
+
+class TestTracing(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("test_seconds", "测试", buckets=(0.1, 1.0))
+        histogram.observe(0.05, db="data")
+        histogram.observe(0.5, db="data")
+        histogram.observe(5, db="data")
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{db="data",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{db="data",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{db="data",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{db="data"} 3', lines)
+
+    def test_registry_renders_help_and_type(self):
+        registry = MetricsRegistry()
+        registry.observe("chatbi_tool_call_duration_seconds", 0.2, tool='a"b')
+        text = registry.render()
+        self.assertIn("# TYPE chatbi_tool_call_duration_seconds histogram", text)
+        self.assertIn('tool="a\\"b"', text)
+
+    def test_nested_spans_across_threads(self):
+        token = start_trace("req-1", "/sql-agent")
+        self.assertEqual(get_request_id(), "req-1")
+        with span("outer") as outer:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                submit_with_context(executor, lambda: span("inner").__enter__().finish()).result()
+            with span("child"):
+                pass
+        end_trace(token)
+        self.assertIsNone(get_request_id())
+
+        trace = get_trace("req-1")
+        spans = {item["name"]: item for item in trace["spans"]}
+        self.assertEqual(set(spans), {"outer", "inner", "child"})
+        self.assertEqual(spans["child"]["parent_id"], outer.span_id)
+        self.assertEqual(spans["inner"]["parent_id"], outer.span_id)
+
+    def test_error_status_and_invalid_request_id(self):
+        token = start_trace("x" * 500)
+        request_id = get_request_id()
+        self.assertNotEqual(request_id, "x" * 500)
+        with self.assertRaises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+        end_trace(token)
+        self.assertEqual(get_trace(request_id)["spans"][0]["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+端到端压测：按 /ddl → /sql-agent → /execute 的顺序驱动后端，统计各阶段和整体的吞吐与延迟分位数
+
+    # 使用本地模拟大模型：启动模拟服务和一个独立的后端进程（通过环境变量CHATBI_LLM_BASE_URL指向模拟服务，
+    # 不修改config.db中的配置），压测结束后关闭
+    python utils/benchmark.py --mock-llm --concurrency 8 --requests 100
+
+    # 使用当前配置的真实大模型
+    python utils/benchmark.py --concurrency 2 --requests 10 --query "最近7天每天的播放量"
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+STAGES = ("ddl", "sql-agent", "execute")
+
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def build_payload(base_url: str, query: str, db_id: Optional[str] = None, table_count: int = 3) -> Dict[str, Any]:
+    """从元数据接口构建 /ddl 的请求体，相当于用户在前端高亮了若干张表"""
+    dbs = requests.get(f"{base_url}/metadata/dbs", timeout=30).json()
+    if not dbs:
+        raise RuntimeError("元数据中没有数据库")
+    db = next((item for item in dbs if item["id"] == db_id), None) if db_id else dbs[0]
+    if db is None:
+        raise RuntimeError(f"数据库不存在: {db_id}")
+    tables = requests.get(f"{base_url}/metadata/tables", params={"db": db["id"]}, timeout=30).json()
+    return {
+        "query": query,
+        "schema": [{
+            "id": db["id"],
+            "tables": [{
+                "table": table["table"],
+                "description": table.get("description", ""),
+                "type": table.get("type", ""),
+                "columns": []
+            } for table in tables[:table_count]]
+        }]
+    }
+
+
+def run_once(http: requests.Session, base_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """执行一次完整流程，返回各阶段耗时（秒），失败时包含error"""
+    timings = {}
+
+    def timed(stage, method, path, **kwargs):
+        start = time.perf_counter()
+        response = http.request(method, f"{base_url}{path}", timeout=600, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        ddl = timed("ddl", "POST", "/ddl", json=payload)["metadata"]
+        agent = timed("sql-agent", "POST", "/sql-agent", json={
+            "metadata": {"ddl": ddl, "freeshot": [], "term": []},
+            "messages": [{"role": "user", "content": payload["query"]}]
+        })
+        if agent.get("error"):
+            raise RuntimeError(agent["error"])
+        if not agent.get("sql"):
+            raise RuntimeError("SQLAgent未返回SQL")
+        timed("execute", "POST", "/execute", json={"sql": agent["sql"]})
+    except Exception as e:
+        timings["error"] = str(e)
+    return timings
+
+
+def run_benchmark(base_url: str, payload: Dict[str, Any], concurrency: int, total: int) -> Dict[str, Any]:
+    """以指定并发执行total次完整流程
+
+    Returns:
+        Dict[str, Any]: {"wall_time": 秒, "completed": 成功次数, "errors": [...],
+            "stages": {阶段: {"count", "throughput", "p50", "p90", "p99", "max"}}}
+    """
+    local = threading.local()
+
+    def worker(_):
+        if not hasattr(local, "http"):
+            local.http = requests.Session()
+        return run_once(local.http, base_url, payload)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(total)))
+    wall_time = time.perf_counter() - start
+
+    succeeded = [result for result in results if "error" not in result]
+    stage_samples = {stage: [result[stage] for result in results if stage in result] for stage in STAGES}
+    stage_samples["total"] = [sum(result[stage] for stage in STAGES) for result in succeeded]
+
+    stages = {}
+    for stage, samples in stage_samples.items():
+        stages[stage] = {
+            "count": len(samples),
+            "throughput": len(samples) / wall_time if wall_time else 0.0,
+            "p50": percentile(samples, 50),
+            "p90": percentile(samples, 90),
+            "p99": percentile(samples, 99),
+            "max": max(samples, default=0.0)
+        }
+    return {
+        "wall_time": wall_time,
+        "completed": len(succeeded),
+        "errors": [result["error"] for result in results if "error" in result],
+        "stages": stages
+    }
+
+
+def format_report(report: Dict[str, Any], concurrency: int, total: int) -> str:
+    lines = [
+        f"并发: {concurrency}  请求: {total}  成功: {report['completed']}  失败: {len(report['errors'])}  总耗时: {report['wall_time']:.2f}s",
+        f"{'阶段':<10}{'次数':>6}{'吞吐(次/s)':>12}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"
+    ]
+    for stage, stats in report["stages"].items():
+        lines.append(
+            f"{stage:<12}{stats['count']:>6}{stats['throughput']:>12.2f}"
+            f"{stats['p50'] * 1000:>10.0f}{stats['p90'] * 1000:>10.0f}{stats['p99'] * 1000:>10.0f}{stats['max'] * 1000:>10.0f}"
+        )
+    if report["errors"]:
+        lines.append("错误示例: " + report["errors"][0])
+    return "\n".join(lines)
+
+
+def start_backend(port: int, llm_base_url: str, workers: int = 1) -> subprocess.Popen:
+    """启动一个独立的后端进程，通过环境变量CHATBI_LLM_BASE_URL指定大模型地址"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, CHATBI_LLM_BASE_URL=llm_base_url)
+    return subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=backend_dir, env=env
+    )
+
+
+def wait_ready(base_url: str, process: Optional[subprocess.Popen] = None, timeout: float = 120) -> None:
+    """等待后端可以响应请求"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"后端进程已退出，返回码 {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/metadata/dbs", timeout=5).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"后端在{timeout}秒内未就绪: {base_url}")
+
+
+def stop_backend(process: subprocess.Popen, timeout: float = 10) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ChatBI端到端压测：/ddl → /sql-agent → /execute")
+    parser.add_argument("--base-url", default="http://localhost:5000", help="后端地址")
+    parser.add_argument("--query", default="最近7天每天的播放量是多少", help="用户问题")
+    parser.add_argument("--db", help="数据库ID，默认第一个")
+    parser.add_argument("--tables", type=int, default=3, help="高亮的表数量")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发数")
+    parser.add_argument("--requests", type=int, default=20, help="完整流程执行次数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    parser.add_argument("--mock-llm", action="store_true",
+                        help="启动本地模拟大模型和一个指向它的独立后端进程（忽略--base-url）")
+    parser.add_argument("--mock-port", type=int, default=8100)
+    parser.add_argument("--mock-ttft", type=float, default=0.3, help="模拟大模型首个token的延迟（秒）")
+    parser.add_argument("--mock-token-delay", type=float, default=0.02, help="模拟大模型每个token的延迟（秒）")
+    parser.add_argument("--backend-port", type=int, default=5099, help="--mock-llm时独立后端的端口")
+    parser.add_argument("--backend-workers", type=int, default=1, help="--mock-llm时独立后端的worker进程数")
+    args = parser.parse_args()
+
+    mock_server = None
+    backend = None
+    base_url = args.base_url
+    try:
+        if args.mock_llm:
+            from utils.mock_llm_server import run_server
+            mock_server = run_server("127.0.0.1", args.mock_port, ttft=args.mock_ttft, token_delay=args.mock_token_delay)
+            threading.Thread(target=mock_server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{args.backend_port}"
+            backend = start_backend(args.backend_port, f"http://127.0.0.1:{args.mock_port}/v1", args.backend_workers)
+            wait_ready(base_url, backend)
+
+        payload = build_payload(base_url, args.query, args.db, args.tables)
+        report = run_benchmark(base_url, payload, args.concurrency, args.requests)
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            print(format_report(report, args.concurrency, args.requests))
+    finally:
+        if backend:
+            stop_backend(backend)
+        if mock_server:
+            mock_server.shutdown()
@@ -5,12 +5,20 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from datetime import datetime, timedelta
-from utils.mock_iqiyi_video_play_logs import generate_iqiyi_data
+from utils.mock_iqiyi_video_play_logs import iter_iqiyi_play_logs
 from utils.mock_iqiyi_video_interactions import generate_iqiyi_interaction_data
 from config.constants import INITIAL_DATA_DIR
-import json
+from initial.data_files import DATA_FORMATS, write_data_file
+import argparse
 
-def generate_mock_data(num_records=3000, start_date=None, end_date=None, video_id_list=None):
+# 数据文件名前缀，文件名为 前缀 + 表名
+DATA_FILE_PREFIX = 'iqiyi_data_'
+
+# 早期交互数据的文件名与表名不一致，写入新文件时删除
+LEGACY_INTERACTION_FILE = 'iqiyi_data_video_interaction.json'
+
+def generate_mock_data(num_records=3000, start_date=None, end_date=None, video_id_list=None,
+                       data_format='json', compress=False):
     """
     统一生成爱奇艺视频播放日志和交互数据的入口函数
     
@@ -19,9 +27,11 @@ def generate_mock_data(num_records=3000, start_date=None, end_date=None, video_i
         start_date: 数据开始日期，格式'YYYY-MM-DD'，默认为当前日期前14天
         end_date: 数据结束日期，格式'YYYY-MM-DD'，默认为当前日期
         video_id_list: 视频ID列表，如果不提供则使用默认列表
+        data_format: 数据文件格式，json、jsonl或csv；jsonl和csv逐条写入播放日志，内存占用与记录数无关
+        compress: 是否gzip压缩，仅支持jsonl和csv
     
     Returns:
-        tuple: (play_logs_data, interactions_data) 包含生成的播放日志和交互数据的元组
+        tuple: (play_logs_count, interactions_count) 生成的播放日志和交互数据记录数
     """
     # 如果没有提供日期范围，使用最近两周
     if not end_date:
@@ -47,13 +57,15 @@ def generate_mock_data(num_records=3000, start_date=None, end_date=None, video_i
             5001234594, 5001234595, 5001234596, 5001234597, 5001234598
         ]
     
-    # 生成播放日志数据
-    play_logs_data = generate_iqiyi_data(
+    # 生成播放日志数据并写入文件
+    play_logs = iter_iqiyi_play_logs(
         num_records=num_records,
         start_date=start_date_str,
         end_date=end_date_str,
         video_id_list=video_id_list
     )
+    _, play_logs_count = write_data_file(INITIAL_DATA_DIR, DATA_FILE_PREFIX, 'video_play_logs', play_logs,
+                                         data_format, compress)
     
     # 生成交互数据
     interactions_data = generate_iqiyi_interaction_data(
@@ -63,14 +75,29 @@ def generate_mock_data(num_records=3000, start_date=None, end_date=None, video_i
         video_id_list=video_id_list
     )
     
-    # 保存数据到文件
-    with open(INITIAL_DATA_DIR + '/iqiyi_data_video_play_logs.json', 'w', encoding='utf-8') as f:
-        json.dump(play_logs_data, f, ensure_ascii=False, indent=2)
-    
-    with open(INITIAL_DATA_DIR + '/iqiyi_data_video_interaction.json', 'w', encoding='utf-8') as f:
-        json.dump(interactions_data, f, ensure_ascii=False, indent=2)
+    # 保存数据到文件（交互数据需按日期排序，仍在内存中生成）
+    _, interactions_count = write_data_file(INITIAL_DATA_DIR, DATA_FILE_PREFIX, 'video_interactions',
+                                            interactions_data['video_interactions'], data_format, compress)
+    legacy_path = os.path.join(INITIAL_DATA_DIR, LEGACY_INTERACTION_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
     
-    print(f"已生成 {len(play_logs_data['video_play_logs'])} 条播放日志记录")
-    print(f"已生成 {len(interactions_data['video_interactions'])} 条交互数据记录")
+    print(f"已生成 {play_logs_count} 条播放日志记录")
+    print(f"已生成 {interactions_count} 条交互数据记录")
     
-    return play_logs_data, interactions_data
\ No newline at end of file
+    return play_logs_count, interactions_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成爱奇艺视频播放日志和交互mock数据，写入initial/data目录")
+    parser.add_argument("--records", type=int, default=3000, help="每张表生成的记录数")
+    parser.add_argument("--start-date", help="数据开始日期，格式YYYY-MM-DD，默认为结束日期前14天")
+    parser.add_argument("--end-date", help="数据结束日期，格式YYYY-MM-DD，默认为当前日期")
+    parser.add_argument("--format", choices=DATA_FORMATS, default="json",
+                        help="数据文件格式，大数据量时使用jsonl或csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip压缩数据文件（仅jsonl和csv）")
+    args = parser.parse_args()
+
+    generate_mock_data(num_records=args.records, start_date=args.start_date, end_date=args.end_date,
+                       data_format=args.format, compress=args.gzip)
+    # 数据文件变化后，下次启动服务时会自动重建data.db
@@ -23,6 +23,19 @@ def generate_iqiyi_data(num_records=1000, start_date="2025-03-10", end_date="202
     Returns:
         Dictionary containing the generated data
     """
+    logs = list(iter_iqiyi_play_logs(num_records, start_date, end_date, video_id_list))
+    return {"video_play_logs": logs}
+
+def iter_iqiyi_play_logs(num_records=1000, start_date="2025-03-10", end_date="2025-03-25", video_id_list=None):
+    """
+    Generate synthetic iQiYi video play logs one record at a time, so large
+    datasets can be written to JSON Lines/CSV without holding them in memory
+    
+    Args: same as generate_iqiyi_data
+    
+    Yields:
+        Dictionary for one play log record
+    """
     if video_id_list is None:
         video_id_list = [5001234579, 5001234580, 5001234581, 5001234582, 5001234583, 
                          5001234584, 5001234585, 5001234586, 5001234587, 5001234588, 
@@ -50,7 +63,6 @@ def generate_iqiyi_data(num_records=1000, start_date="2025-03-10", end_date="202
     video_durations = {vid: random.choice([1800, 2400, 3000, 3600, 4500, 5400, 6000, 7200]) for vid in video_id_list}
     
     # Generate logs
-    logs = []
     for i in range(num_records):
         # Generate a random date within the range
         days_diff = (end_dt - start_dt).days
@@ -118,6 +130,4 @@ def generate_iqiyi_data(num_records=1000, start_date="2025-03-10", end_date="202
             "app_version": app_version,
             "dt": dt
         }
-        logs.append(log)
-    
-    return {"video_play_logs": logs}
+        yield log
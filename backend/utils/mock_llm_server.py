@@ -0,0 +1,230 @@
+"""
+本地OpenAI兼容的大模型模拟服务，用于在没有真实模型的情况下驱动SQLAgent完整流程和压测
+
+启动后通过环境变量CHATBI_LLM_BASE_URL让后端指向它（不修改config.db中的llm_base_url）：
+
+    python utils/mock_llm_server.py --ttft 0.3 --token-delay 0.02
+    CHATBI_LLM_BASE_URL=http://127.0.0.1:8100/v1 python serve.py
+
+压测时可以直接使用 utils/benchmark.py --mock-llm，自动启动模拟服务和指向它的后端进程
+
+默认行为：
+- 非流式请求（筛选数据表、生成SQL）：提示词中出现表名时返回第一个表名，否则返回一段SQL
+- 流式请求：当前问题尚未调用过工具时，返回一次tool_execute_sql_and_fetch_top_10调用，
+  SQL查询系统提示词DDL中的第一张表；已有工具结果时返回最终回答
+
+也可以通过 --script 指定JSON脚本，按当前问题已进行的工具调用轮次依次返回：
+
+    {
+        "non_stream": "video_play_logs",
+        "turns": [
+            {"tool_calls": [{"name": "tool_get_table_schema", "arguments": {"table_name": "videos"}}]},
+            {"tool_calls": [{"name": "tool_execute_sql_and_fetch_top_10", "arguments": {"sql": "SELECT 1"}}]},
+            {"content": "查询完成"}
+        ]
+    }
+"""
+import sys
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_CREATE_TABLE_PATTERN = re.compile(r"CREATE TABLE (\w+)")
+_TABLE_NAME_PATTERN = re.compile(r"表名: (\w+)")
+
+
+class MockLLMServer:
+    """模拟大模型的响应策略和流式输出节奏"""
+
+    def __init__(self, ttft: float = 0.3, token_delay: float = 0.02, chars_per_token: int = 4,
+                 script: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            ttft: 首个token的延迟（秒）
+            token_delay: 之后每个token的延迟（秒）
+            chars_per_token: 每个流式块包含的字符数
+            script: 脚本化的响应，格式见模块说明
+        """
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.chars_per_token = max(1, chars_per_token)
+        self.script = script or {}
+
+    @staticmethod
+    def _text(messages: List[Dict[str, Any]]) -> str:
+        return "\n".join(str(message.get("content") or "") for message in messages)
+
+    @staticmethod
+    def _current_turn(messages: List[Dict[str, Any]]) -> int:
+        """当前问题已进行的工具调用轮次：最后一个用户问题之后的助手消息数"""
+        last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+        return sum(1 for message in messages[last_user + 1:] if message.get("role") == "assistant")
+
+    def plan_non_stream(self, messages: List[Dict[str, Any]]) -> str:
+        if "non_stream" in self.script:
+            return self.script["non_stream"]
+        tables = _TABLE_NAME_PATTERN.findall(self._text(messages))
+        if tables:
+            return tables[0]
+        tables = _CREATE_TABLE_PATTERN.findall(self._text(messages))
+        return f"```sql\nSELECT * FROM {tables[0] if tables else 'sqlite_master'} LIMIT 10\n```"
+
+    def plan_stream(self, messages: List[Dict[str, Any]], has_tools: bool) -> Dict[str, Any]:
+        """返回本轮的响应计划：{"content": ""} 或 {"tool_calls": [{"name": "", "arguments": {}}]}"""
+        turn = self._current_turn(messages)
+        turns = self.script.get("turns")
+        if turns:
+            return turns[min(turn, len(turns) - 1)]
+        if has_tools and turn == 0:
+            tables = _CREATE_TABLE_PATTERN.findall(self._text(messages))
+            table = tables[0] if tables else "sqlite_master"
+            return {"tool_calls": [{"name": "tool_execute_sql_and_fetch_top_10",
+                                    "arguments": {"sql": f"SELECT * FROM {table} LIMIT 10"}}]}
+        return {"content": "已根据查询结果完成分析，SQL已验证可以正常执行。"}
+
+    def _pieces(self, text: str) -> List[str]:
+        return [text[i:i + self.chars_per_token] for i in range(0, len(text), self.chars_per_token)] or [""]
+
+    def stream_chunks(self, model: str, plan: Dict[str, Any]):
+        """按计划生成流式响应块，包含首token延迟和逐token延迟"""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+
+        time.sleep(self.ttft)
+        yield chunk({"role": "assistant", "content": ""})
+
+        if plan.get("tool_calls"):
+            for index, tool_call in enumerate(plan["tool_calls"]):
+                arguments = tool_call.get("arguments", {})
+                if not isinstance(arguments, str):
+                    arguments = json.dumps(arguments, ensure_ascii=False)
+                yield chunk({"tool_calls": [{
+                    "index": index,
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {"name": tool_call["name"], "arguments": ""}
+                }]})
+                for piece in self._pieces(arguments):
+                    time.sleep(self.token_delay)
+                    yield chunk({"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+            yield chunk({}, "tool_calls")
+        else:
+            for piece in self._pieces(plan.get("content", "")):
+                time.sleep(self.token_delay)
+                yield chunk({"content": piece})
+            yield chunk({}, "stop")
+
+    def completion(self, model: str, content: str) -> Dict[str, Any]:
+        """非流式响应，总延迟按首token延迟加逐token延迟计算"""
+        time.sleep(self.ttft + self.token_delay * len(self._pieces(content)))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+
+def make_handler(server: MockLLMServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"unknown path: {self.path}"}})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            model = request.get("model", "mock")
+            messages = request.get("messages", [])
+
+            if not request.get("stream"):
+                self._send_json(200, server.completion(model, server.plan_non_stream(messages)))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data: str):
+                payload = data.encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            plan = server.plan_stream(messages, bool(request.get("tools")))
+            try:
+                for chunk in server.stream_chunks(model, plan):
+                    write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                write("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端提前断开
+                self.close_connection = True
+
+    return Handler
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8100, **kwargs) -> ThreadingHTTPServer:
+    """创建模拟服务（不阻塞），调用方负责serve_forever/shutdown"""
+    httpd = ThreadingHTTPServer((host, port), make_handler(MockLLMServer(**kwargs)))
+    httpd.daemon_threads = True
+    return httpd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容的大模型模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=0.3, help="首个token的延迟（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="每个token的延迟（秒）")
+    parser.add_argument("--chars-per-token", type=int, default=4, help="每个流式块包含的字符数")
+    parser.add_argument("--script", help="脚本化响应的JSON文件路径")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    httpd = run_server(args.host, args.port, ttft=args.ttft, token_delay=args.token_delay,
+                       chars_per_token=args.chars_per_token, script=script)
+    print(f"模拟大模型服务已启动: http://{args.host}:{args.port}/v1")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
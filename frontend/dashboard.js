@@ -6,6 +6,8 @@
 // 引入Chart.js
 // 通过全局Chart变量使用（由index.html引入）
 
+import { sessionHeaders } from './session.js';
+
 // 保存当前数据
 let currentData = null;
 
@@ -18,10 +20,10 @@ async function executeSQL(sql) {
     try {
         const response = await fetch('http://localhost:5000/execute', {
             method: 'POST',
-            headers: {
+            headers: sessionHeaders({
                 'accept': 'application/json',
                 'Content-Type': 'application/json'
-            },
+            }),
             body: JSON.stringify({ sql })
         });
         
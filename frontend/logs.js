@@ -1,8 +1,11 @@
+import { logSessionId, sessionHeaders, getAdminToken } from './session.js';
+
 // 全局变量
 let logSocket = null; // Socket.IO连接
 let isLogPanelOpen = true; // 日志面板默认展开
 let autoCloseTimer = null; // 自动关闭计时器
 let lastMessageTime = null; // 最后一条消息的接收时间
+let lastLogSeq = null; // 当前会话最后收到的日志序号，重连时只回放之后的日志
 
 // DOM元素引用
 let logPanel;
@@ -39,6 +42,10 @@ function initWebSocket() {
     // 创建新的Socket.IO连接
     logSocket = io('http://172.29.83,147:5000', {
         path: '/socket.io',
+        // 优先使用WebSocket：多worker部署时服务端只允许WebSocket，长轮询的请求可能落到不同的worker；
+        // 服务端不支持WebSocket时回退到长轮询
+        transports: ['websocket', 'polling'],
+        tryAllTransports: true,
         reconnection: true,
         reconnectionDelay: 5000,
         reconnectionAttempts: Infinity
@@ -46,12 +53,18 @@ function initWebSocket() {
     
     // 连接事件
     logSocket.on('connect', () => {
+        // 订阅当前会话的日志（重连后需要重新订阅）
+        logSocket.emit('subscribe', { session_id: logSessionId, admin_token: getAdminToken(), last_seq: lastLogSeq });
         addLogMessage('系统日志', '已连接工作台');
     });
     
     // 接收日志消息事件
     logSocket.on('log', (data) => {
         try {
+            if (isDuplicateLog(data)) {
+                return;
+            }
+            
             // 更新最后一条消息的接收时间
             lastMessageTime = new Date();
             
@@ -65,7 +78,7 @@ function initWebSocket() {
             
             // 检查是否有summary字段
             if (data.summary) {
-                addLogMessage(data.type, data.message, data.summary);
+                addLogMessage(data.type, data.message, data.summary, data.truncated ? data.payload_id : null);
             } else {
                 addLogMessage(data.type, data.message);
             }
@@ -78,6 +91,10 @@ function initWebSocket() {
     // 接收流式日志消息事件
     logSocket.on('stream_log', (data) => {
         try {
+            if (isDuplicateLog(data)) {
+                return;
+            }
+            
             // 更新最后一条消息的接收时间
             lastMessageTime = new Date();
             
@@ -148,7 +165,7 @@ function closeLogPanel() {
 }
 
 // 添加日志消息到面板
-function addLogMessage(type, message, summary = null) {
+function addLogMessage(type, message, summary = null, payloadId = null) {
     // 创建日志项
     const logItem = document.createElement('div');
     logItem.className = `log-item ${type === 'ai' ? 'ai-log' : 'system-log'}`;
@@ -178,9 +195,9 @@ function addLogMessage(type, message, summary = null) {
         // 添加鼠标悬停事件
         messageContent.style.cursor = 'pointer'; // 改变鼠标样式
         
-        // 添加点击事件，复制message到剪贴板
+        // 添加点击事件，复制message到剪贴板（消息被截断时先获取完整内容）
         messageContent.addEventListener('click', () => {
-            navigator.clipboard.writeText(message).then(() => {
+            fetchFullMessage(message, payloadId).then((fullMessage) => navigator.clipboard.writeText(fullMessage)).then(() => {
                 // 可以添加一个临时提示，表示复制成功
                 const originalText = messageContent.textContent;
                 messageContent.textContent = '已复制到剪贴板!';
@@ -244,9 +261,9 @@ async function sendLog(type, message, summary = null) {
         
         const response = await fetch('http://localhost:5000/api/log', {
             method: 'POST',
-            headers: {
+            headers: sessionHeaders({
                 'Content-Type': 'application/json'
-            },
+            }),
             body: JSON.stringify(logData)
         });
         
@@ -263,6 +280,36 @@ async function sendLog(type, message, summary = null) {
     }
 }
 
+// 回放与实时推送可能重叠，按会话内序号跳过已收到的日志
+function isDuplicateLog(data) {
+    if (data.session_id !== logSessionId || typeof data.seq !== 'number') {
+        return false;
+    }
+    if (lastLogSeq !== null && data.seq <= lastLogSeq) {
+        return true;
+    }
+    lastLogSeq = data.seq;
+    return false;
+}
+
+// 获取被截断日志的完整内容，获取失败时返回截断后的内容
+async function fetchFullMessage(message, payloadId) {
+    if (!payloadId) {
+        return message;
+    }
+    try {
+        const response = await fetch(`http://localhost:5000/api/log/payload/${payloadId}`);
+        if (!response.ok) {
+            return message;
+        }
+        const data = await response.json();
+        return data.message;
+    } catch (error) {
+        console.error('获取完整日志失败:', error);
+        return message;
+    }
+}
+
 // 处理流式日志消息
 let currentStreamLogItem = null;
 let currentStreamSummary = null;
@@ -296,6 +343,12 @@ function handleStreamLog(data) {
         currentStreamSummary = data.summary;
     }
     
+    // 流式输出结束，后续token属于新的日志项
+    if (data.is_last) {
+        currentStreamLogItem = null;
+        currentStreamSummary = null;
+    }
+    
     // 滚动到底部
     logContent.scrollTop = logContent.scrollHeight;
 }
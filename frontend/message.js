@@ -1,5 +1,6 @@
 // 保存所有元数据的全局变量
 import { showToast } from './toast.js';
+import { sessionHeaders } from './session.js';
 
 let savedMetadata = {
     ddl: [],
@@ -10,6 +11,13 @@ let savedMetadata = {
 // 标记是否已经召回过元数据
 let hasFetchedMetadata = false;
 
+// 服务端会话ID，后续请求只提交新的用户问题
+const conversationId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+// 服务端会话是否已建立
+let sessionStarted = false;
+// 元数据是否在上次提交后被修改过
+let metadataDirty = true;
+
 /**
  * 处理聊天消息的方法
  * @param {string} text - 用户输入的文本
@@ -27,9 +35,7 @@ async function chat(text, schema) {
         
         // 只在第一次聊天时获取元数据
         if (!hasFetchedMetadata) {
-            await fetchAndDisplayDDL(requestBody);
-            await fetchAndDisplayFreeshot(requestBody);
-            await fetchAndDisplayTerm(requestBody);
+            await fetchAndDisplayContext(requestBody);
             hasFetchedMetadata = true;
         }
         
@@ -171,6 +177,7 @@ function createMetadataItem(item, index, type) {
     nameContent.addEventListener('blur', () => {
         // 更新保存的元数据
         savedMetadata[type][index].name = nameContent.textContent;
+        metadataDirty = true;
     });
     nameContainer.appendChild(nameContent);
     
@@ -194,6 +201,7 @@ function createMetadataItem(item, index, type) {
     content.addEventListener('blur', () => {
         // 更新保存的元数据
         savedMetadata[type][index].content = content.textContent;
+        metadataDirty = true;
     });
     contentContainer.appendChild(content);
     
@@ -208,6 +216,7 @@ function createMetadataItem(item, index, type) {
         metadataItem.remove();
         // 从保存的元数据中移除
         savedMetadata[type].splice(index, 1);
+        metadataDirty = true;
         // 更新后续元素的索引
         const items = document.querySelectorAll(`.metadata-message.${type}-message .metadata-item`);
         items.forEach((item, i) => {
@@ -343,45 +352,11 @@ function addSQLMessage(data) {
                 const sqlContent = sqlContainer.querySelector('.sql-content');
                 const sql = sqlContent.textContent.trim();
                 
-                // 获取聊天消息历史
-                const chatMessages = document.querySelectorAll('.message');
-                const messages = [];
-                
-                // 构建消息历史
-                chatMessages.forEach(msg => {
-                    if (msg.classList.contains('user-message')) {
-                        messages.push({ role: 'user', content: msg.textContent });
-                    } else if (msg.classList.contains('system-message') && !msg.classList.contains('metadata-message') && !msg.classList.contains('loading-message')) {
-                        let content = msg.textContent;
-                        // 如果是SQL消息，添加SQL内容
-                        if (msg.classList.contains('sql-message')) {
-                            const sqlContent = msg.querySelector('.sql-content');
-                            if (sqlContent) {
-                                content += '\nSQL:\n' + sqlContent.textContent;
-                            }
-                        }
-                        messages.push({ role: 'assistant', content: content });
-                    }
-                });
-                
-                // 构建请求体，与/sql-agent接口参数格式一致
-                const requestBody = {
-                    metadata: {
-                        ddl: savedMetadata.ddl,
-                        freeshot: savedMetadata.freeshot,
-                        term: savedMetadata.term
-                    },
-                    messages: messages
-                };
-                
-                // 调用/feedback_good接口
-                fetch('http://localhost:5000/feedback_good', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(requestBody)
-                });
+                // 使用服务端会话中的历史对话，会话不存在时提交完整历史
+                postWithSession('http://localhost:5000/feedback_good', {}, () => ({
+                    metadata: currentMetadata(),
+                    messages: collectChatHistory()
+                }));
                 
                 // 直接显示点赞成功提示，不等待接口返回
                 showToast('点赞成功', 'success');
@@ -429,121 +404,129 @@ function createLoadingMessage(text) {
 }
 
 /**
- * 获取并显示DDL元数据
- * @param {Object} schema - 高亮元数据
+ * 当前（可能被用户编辑过的）元数据
+ * @returns {Object} - 元数据 {ddl, freeshot, term}
  */
-async function fetchAndDisplayDDL(schema) {
-    // 创建加载中消息
-    const loadingMessage = createLoadingMessage('正在获取相关表信息');
-    document.getElementById('chatMessages').appendChild(loadingMessage);
-    document.getElementById('chatMessages').scrollTop = document.getElementById('chatMessages').scrollHeight;
+function currentMetadata() {
+    return {
+        ddl: savedMetadata.ddl,
+        freeshot: savedMetadata.freeshot,
+        term: savedMetadata.term
+    };
+}
+
+/**
+ * 从聊天界面收集完整的消息历史
+ * @param {string} [userInput] - 当前用户问题，不在历史中时追加到末尾
+ * @returns {Array} - 消息列表
+ */
+function collectChatHistory(userInput) {
+    const chatMessages = document.querySelectorAll('.message');
+    const messages = [];
+    
+    // 构建消息历史
+    chatMessages.forEach(msg => {
+        if (msg.classList.contains('user-message')) {
+            messages.push({ role: 'user', content: msg.textContent });
+        } else if (msg.classList.contains('system-message') && !msg.classList.contains('metadata-message') && !msg.classList.contains('loading-message')) {
+            let content = msg.textContent;
+            // 如果是SQL消息，添加SQL内容
+            if (msg.classList.contains('sql-message')) {
+                const sqlContent = msg.querySelector('.sql-content');
+                if (sqlContent) {
+                    content += '\nSQL:\n' + sqlContent.textContent;
+                }
+            }
+            messages.push({ role: 'assistant', content: content });
+        }
+    });
     
-    try {
-        // 发送请求获取DDL元数据
-        const response = await fetch('http://localhost:5000/ddl', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(schema)
-        });
-        
-        const data = await response.json();
-        
-        // 保存元数据
-        savedMetadata.ddl = data.metadata;
-        
-        // 移除加载中消息
-        loadingMessage.remove();
-        
-        // 添加元数据消息
-        addMetadataMessage('相关表信息', 'ddl', data.metadata);
-    } catch (error) {
-        console.error('获取DDL元数据失败:', error);
-        // 移除加载中消息
-        loadingMessage.remove();
-        // 添加错误消息
-        addMessage('获取相关表信息失败，请重试', 'system');
-        throw error;
+    // 检查是否已存在相同的用户消息，避免重复添加
+    if (userInput && !messages.some(msg => msg.role === 'user' && msg.content === userInput)) {
+        messages.push({ role: 'user', content: userInput });
     }
+    return messages;
 }
 
 /**
- * 获取并显示Freeshot元数据
- * @param {Object} schema - 高亮元数据
+ * 发送JSON POST请求
+ * @param {string} url - 接口地址
+ * @param {Object} body - 请求体
+ * @returns {Promise<Response>}
  */
-async function fetchAndDisplayFreeshot(schema) {
-    // 创建加载中消息
-    const loadingMessage = createLoadingMessage('正在获取相关示例');
-    document.getElementById('chatMessages').appendChild(loadingMessage);
-    document.getElementById('chatMessages').scrollTop = document.getElementById('chatMessages').scrollHeight;
-    
-    try {
-        // 发送请求获取Freeshot元数据
-        const response = await fetch('http://localhost:5000/freeshot', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(schema)
-        });
-        
-        const data = await response.json();
-        
-        // 保存元数据
-        savedMetadata.freeshot = data.metadata;
-        
-        // 移除加载中消息
-        loadingMessage.remove();
-        
-        // 添加元数据消息
-        addMetadataMessage('相关示例', 'freeshot', data.metadata);
-    } catch (error) {
-        console.error('获取Freeshot元数据失败:', error);
-        // 移除加载中消息
-        loadingMessage.remove();
-        // 添加错误消息
-        addMessage('获取相关示例失败，请重试', 'system');
-        throw error;
+function postJSON(url, body) {
+    return fetch(url, {
+        method: 'POST',
+        headers: sessionHeaders({
+            'Content-Type': 'application/json'
+        }),
+        body: JSON.stringify(body)
+    });
+}
+
+/**
+ * 在服务端会话中发送请求，元数据有修改时一并提交；会话不存在或已过期（404）时改为提交完整请求
+ * @param {string} url - 接口地址
+ * @param {Object} body - 会话请求体（不含conversation_id和metadata）
+ * @param {Function} buildFullRequest - 构建完整请求体的函数
+ * @returns {Promise<Response>}
+ */
+async function postWithSession(url, body, buildFullRequest) {
+    const sessionBody = { conversation_id: conversationId, ...body };
+    if (metadataDirty) {
+        sessionBody.metadata = currentMetadata();
     }
+    const response = await postJSON(url, sessionBody);
+    if (response.status !== 404) {
+        return response;
+    }
+    return postJSON(url, buildFullRequest());
 }
 
 /**
- * 获取并显示Term元数据
+ * 获取并显示上下文元数据（DDL、示例、术语），由后端并行召回
  * @param {Object} schema - 高亮元数据
  */
-async function fetchAndDisplayTerm(schema) {
+async function fetchAndDisplayContext(schema) {
     // 创建加载中消息
-    const loadingMessage = createLoadingMessage('正在获取相关术语');
+    const loadingMessage = createLoadingMessage('正在获取相关表信息、示例和术语');
     document.getElementById('chatMessages').appendChild(loadingMessage);
     document.getElementById('chatMessages').scrollTop = document.getElementById('chatMessages').scrollHeight;
     
     try {
-        // 发送请求获取Term元数据
-        const response = await fetch('http://localhost:5000/term', {
+        // 发送请求获取全部上下文元数据
+        const response = await fetch('http://localhost:5000/context', {
             method: 'POST',
-            headers: {
+            headers: sessionHeaders({
                 'Content-Type': 'application/json'
-            },
+            }),
             body: JSON.stringify(schema)
         });
         
         const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || '获取上下文失败');
+        }
         
         // 保存元数据
-        savedMetadata.term = data.metadata;
+        savedMetadata.ddl = data.metadata.ddl;
+        savedMetadata.freeshot = data.metadata.freeshot;
+        savedMetadata.term = data.metadata.term;
+        metadataDirty = true;
         
         // 移除加载中消息
         loadingMessage.remove();
         
         // 添加元数据消息
-        addMetadataMessage('相关术语', 'term', data.metadata);
+        addMetadataMessage('相关表信息', 'ddl', savedMetadata.ddl);
+        addMetadataMessage('相关示例', 'freeshot', savedMetadata.freeshot);
+        addMetadataMessage('相关术语', 'term', savedMetadata.term);
     } catch (error) {
-        console.error('获取Term元数据失败:', error);
+        console.error('获取上下文元数据失败:', error);
         // 移除加载中消息
         loadingMessage.remove();
         // 添加错误消息
-        addMessage('获取相关术语失败，请重试', 'system');
+        addMessage('获取相关表信息、示例和术语失败，请重试', 'system');
         throw error;
     }
 }
@@ -561,52 +544,20 @@ async function fetchAndDisplaySQL(schema) {
         // 获取用户输入的查询文本
         const userInput = schema.query;
         
-        // 获取聊天消息历史
-        const chatMessages = document.querySelectorAll('.message');
-        const messages = [];
-        
-        // 构建消息历史
-        chatMessages.forEach(msg => {
-            if (msg.classList.contains('user-message')) {
-                messages.push({ role: 'user', content: msg.textContent });
-            } else if (msg.classList.contains('system-message') && !msg.classList.contains('metadata-message') && !msg.classList.contains('loading-message')) {
-                let content = msg.textContent;
-                // 如果是SQL消息，添加SQL内容
-                if (msg.classList.contains('sql-message')) {
-                    const sqlContent = msg.querySelector('.sql-content');
-                    if (sqlContent) {
-                        content += '\nSQL:\n' + sqlContent.textContent;
-                    }
-                }
-                messages.push({ role: 'assistant', content: content });
-            }
+        // 首次请求提交完整历史建立会话，之后只提交新的用户问题
+        const buildFullRequest = () => ({
+            conversation_id: conversationId,
+            metadata: currentMetadata(),
+            messages: collectChatHistory(userInput)
         });
-        
-        // 检查是否已存在相同的用户消息，避免重复添加
-        const isDuplicate = messages.some(msg => 
-            msg.role === 'user' && msg.content === userInput
-        );
-        
-        if (!isDuplicate) {
-            messages.push({ role: 'user', content: userInput });
+        const response = sessionStarted
+            ? await postWithSession('http://localhost:5000/sql-agent', { message: userInput }, buildFullRequest)
+            : await postJSON('http://localhost:5000/sql-agent', buildFullRequest());
+        if (response.ok) {
+            sessionStarted = true;
+            metadataDirty = false;
         }
         
-        // 发送请求获取SQL，使用新的请求体格式
-        const response = await fetch('http://localhost:5000//sql-agent', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                metadata: {
-                    ddl: savedMetadata.ddl,
-                    freeshot: savedMetadata.freeshot,
-                    term: savedMetadata.term
-                },
-                messages: messages
-            })
-        });
-        
         const data = await response.json();
         
         // 移除加载中消息
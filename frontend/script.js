@@ -1,10 +1,12 @@
 // 导入日志模块
 import { addLogMessage, sendLog } from './logs.js';
+import { sessionHeaders } from './session.js';
 
 // 全局变量
 let currentUser = 'user1'; // 默认用户
 let highlightedItems = new Set(); // 存储自动高亮项的ID
 let manualHighlightedItems = new Set(); // 存储手动高亮项的ID
+let suggestTableScores = new Map(); // 存储suggest返回的表召回分数
 let isHidingNonHighlighted = false; // 是否隐藏非高亮项
 let suggestTimer = null; // suggest请求的定时器
 let isSending = false; // 是否正在发送消息
@@ -272,7 +274,8 @@ function collectHighlightedMetadata() {
                     const tableInfo = {
                         id,
                         table: item.querySelector('.tree-item-name').title,
-                        description: item.querySelector('.tree-item-name').textContent
+                        description: item.querySelector('.tree-item-name').textContent,
+                        score: suggestTableScores.get(id)
                     };
                     
                     // 查找或创建数据库对象
@@ -319,6 +322,7 @@ function collectHighlightedMetadata() {
                             id: tableElement.dataset.id,
                             table: tableElement.querySelector('.tree-item-name').title,
                             description: tableElement.querySelector('.tree-item-name').textContent,
+                            score: suggestTableScores.get(tableElement.dataset.id),
                             columns: []
                         };
                         if (!dbInfo.tables) dbInfo.tables = [];
@@ -357,6 +361,7 @@ function collectHighlightedMetadata() {
                             id: valueTableElement.dataset.id,
                             table: valueTableElement.querySelector('.tree-item-name').title,
                             description: valueTableElement.querySelector('.tree-item-name').textContent,
+                            score: suggestTableScores.get(valueTableElement.dataset.id),
                             columns: []
                         };
                         if (!dbInfo.tables) dbInfo.tables = [];
@@ -463,9 +468,9 @@ async function requestSuggest(text) {
     try {
         const response = await fetch('http://localhost:5000/suggest', {
             method: 'POST',
-            headers: {
+            headers: sessionHeaders({
                 'Content-Type': 'application/json'
-            },
+            }),
             body: JSON.stringify({ text })
         });
         
@@ -502,6 +507,7 @@ async function requestSuggest(text) {
 async function processSuggestResult(data) {
     // 清空高亮项集合
     highlightedItems.clear();
+    suggestTableScores.clear();
     
     // 遍历数据库
     for (const db of data) {
@@ -517,6 +523,11 @@ async function processSuggestResult(data) {
                 // 高亮表格
                 highlightItem(table.id);
                 
+                // 记录表召回分数，用于后端跳过不必要的表筛选
+                if (typeof table.score === 'number') {
+                    suggestTableScores.set(table.id, table.score);
+                }
+                
                 // 展开表格
                 await expandItem(table.id);
                 
@@ -0,0 +1,32 @@
+// 日志会话ID：请求通过X-Session-Id请求头携带，后端只把该会话的日志推送给当前页面
+// 保存在sessionStorage中，刷新页面后仍订阅同一会话
+const SESSION_STORAGE_KEY = 'chatbiLogSessionId';
+
+function createSessionId() {
+    return (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+let logSessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+if (!logSessionId) {
+    logSessionId = createSessionId();
+    sessionStorage.setItem(SESSION_STORAGE_KEY, logSessionId);
+}
+
+/**
+ * 构建带会话ID的请求头
+ * @param {Object} headers - 其他请求头
+ * @returns {Object}
+ */
+function sessionHeaders(headers = {}) {
+    return { ...headers, 'X-Session-Id': logSessionId };
+}
+
+/**
+ * 管理员令牌（localStorage中的chatbiAdminToken），有效时订阅所有会话的日志
+ * @returns {string|null}
+ */
+function getAdminToken() {
+    return localStorage.getItem('chatbiAdminToken');
+}
+
+export { logSessionId, sessionHeaders, getAdminToken };